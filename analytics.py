@@ -0,0 +1,300 @@
+# analytics.py
+"""Abstimmungsanalysen auf der Positionsmatrix: Übereinstimmung, Kohäsion und Fraktionstreue.
+
+Alle Kennzahlen sind Summen über Votes. Ein ``AnalyticsState`` hält diese
+Zähler für eine Menge von Votes (einen Filter) und kann neue Votes blockweise
+hinzunehmen, ohne die alten erneut zu verarbeiten. ``Analytics`` cacht je
+Filter einen Zustand und schreibt ihn bei einem neuen Snapshot fort; der Cache
+ist durch die Summe der Bytes begrenzt. Berechnet wird in einem eigenen
+Thread-Pool, gleichzeitige Anfragen für denselben Filter warten auf dieselbe
+Berechnung.
+
+Als "abgestimmt" zählen FOR, AGAINST und ABSTENTION; DID_NOT_VOTE und fehlende
+Einträge werden ignoriert. Die Fraktion eines Mitglieds ist seine aktuelle
+Fraktion laut members-Tabelle.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from models import POSITION_CODES
+
+# Positionscodes, die als Stimmabgabe zählen
+VOTED_CODES = (POSITION_CODES["FOR"], POSITION_CODES["AGAINST"], POSITION_CODES["ABSTENTION"])
+# Votes pro Block bei der Verarbeitung (begrenzt die temporären Matrizen)
+BLOCK_SIZE = 512
+# Obergrenze für die gecachten Zustände (Bytes, vor allem die zwei m×m-Zählermatrizen je Filter)
+ANALYTICS_CACHE_BYTES = int(os.environ.get("ANALYTICS_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Threads für die Berechnung (begrenzt die gleichzeitigen, rechenintensiven Neuaufbauten)
+ANALYTICS_WORKERS = int(os.environ.get("ANALYTICS_WORKERS", "2"))
+
+
+def count_dtype(n_votes):
+    """Kleinster Ganzzahltyp für paarweise Zähler bis ``n_votes``."""
+    return np.uint16 if n_votes <= np.iinfo(np.uint16).max else np.int32
+
+
+def member_groups(matrix):
+    """Fraktionscode je Matrixspalte ("" ohne Fraktion)."""
+    return np.array([(p.get("group") or {}).get("code") or "" for p in matrix.member_profiles], dtype=object)
+
+
+class AnalyticsState:
+    """Additive Zähler über eine Menge von Votes.
+
+    - ``agree[i, j]``: Votes, in denen i und j gleich abgestimmt haben
+    - ``shared[i, j]``: Votes, in denen beide abgestimmt haben
+    - ``ai_sum[g]`` / ``group_votes[g]``: Summe des Agreement Index je Fraktion
+      und Anzahl der Votes, in denen die Fraktion abgestimmt hat
+    - ``loyal[i]`` / ``voted[i]``: Votes mit Stimme wie die Fraktionsmehrheit
+      bzw. mit Stimmabgabe
+    """
+
+    def __init__(self, member_ids, groups, max_votes):
+        self.member_ids = member_ids
+        self.groups = groups
+        self.group_codes = sorted({g for g in groups if g})
+        group_index = {code: i for i, code in enumerate(self.group_codes)}
+        # Fraktion je Spalte als Index (-1 = ohne Fraktion)
+        self.member_group = np.array([group_index.get(g, -1) for g in groups], dtype=np.int64)
+        m, g = len(member_ids), len(self.group_codes)
+        self.vote_ids = np.zeros(0, dtype=np.int64)
+        self.facts = 0
+        # Zähler bis max_votes (Votes der Matrix); uint16 bzw. int32 statt int64
+        self.agree = np.zeros((m, m), dtype=count_dtype(max_votes))
+        self.shared = np.zeros((m, m), dtype=count_dtype(max_votes))
+        self.ai_sum = np.zeros(g, dtype=np.float64)
+        self.group_votes = np.zeros(g, dtype=np.int64)
+        self.loyal = np.zeros(m, dtype=np.int64)
+        self.voted = np.zeros(m, dtype=np.int64)
+        # Ähnlichkeits-Rangliste je Mitglied, bei Bedarf berechnet
+        self._rankings = {}
+
+    @classmethod
+    def build(cls, matrix, rows):
+        state = cls(np.asarray(matrix.member_ids), member_groups(matrix), len(matrix.vote_ids))
+        state.add(matrix, rows)
+        return state
+
+    def add(self, matrix, rows):
+        """Nimmt die Votes ``rows`` der Matrix hinzu (Spalten wie ``member_ids``)."""
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        onehot_groups = np.zeros((len(self.member_ids), len(self.group_codes)), dtype=np.float32)
+        in_group = self.member_group >= 0
+        onehot_groups[np.flatnonzero(in_group), self.member_group[in_group]] = 1
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = np.asarray(matrix.positions[rows[start:start + BLOCK_SIZE]])
+            per_code = [(block == code).astype(np.float32) for code in VOTED_CODES]
+            voted = per_code[0] + per_code[1] + per_code[2]
+
+            # Paarweise Übereinstimmung per Matrixprodukt (exakt, solange < 2^24 Votes je Block)
+            self.agree += np.rint(sum(p.T @ p for p in per_code)).astype(self.agree.dtype)
+            self.shared += np.rint(voted.T @ voted).astype(self.shared.dtype)
+
+            did_vote = voted > 0
+            self.voted += did_vote.sum(axis=0)
+            self.facts += int(np.count_nonzero(block))
+            if not self.group_codes:
+                continue
+
+            # Stimmen je Vote und Fraktion: (Block, Fraktionen) je Position
+            counts = np.stack([p @ onehot_groups for p in per_code])
+            total = counts.sum(axis=0)
+            top = counts.max(axis=0)
+            has_votes = total > 0
+            # Agreement Index (Hix/Noury/Roland): (max - (Summe - max) / 2) / Summe
+            ai = np.where(has_votes, (top - 0.5 * (total - top)) / np.maximum(total, 1), 0.0)
+            self.ai_sum += ai.sum(axis=0)
+            self.group_votes += has_votes.sum(axis=0)
+
+            # Fraktionsmehrheit je Vote (bei Gleichstand die erste Position) und Treue der Mitglieder
+            majority = np.asarray(VOTED_CODES, dtype=np.int8)[counts.argmax(axis=0)]
+            member_majority = majority[:, np.maximum(self.member_group, 0)]
+            self.loyal += ((block == member_majority) & did_vote & in_group).sum(axis=0)
+        self.vote_ids = np.union1d(self.vote_ids, np.asarray(matrix.vote_ids)[rows])
+
+    def updated(self, matrix, rows):
+        """Neuer Zustand für die Votes ``rows`` einer neueren Matrix; None, wenn neu berechnet werden muss."""
+        new_ids = np.asarray(matrix.vote_ids)[rows]
+        covered = np.isin(self.vote_ids, new_ids, assume_unique=True)
+        if not covered.all():
+            return None
+        member_ids = np.asarray(matrix.member_ids)
+        cols = np.searchsorted(member_ids, self.member_ids)
+        if (cols >= len(member_ids)).any() or not np.array_equal(member_ids[cols], self.member_ids):
+            return None
+        groups = member_groups(matrix)
+        if not np.array_equal(groups[cols], self.groups):
+            return None
+        old_rows = np.asarray(rows)[np.isin(new_ids, self.vote_ids, assume_unique=True)]
+        # Geänderte member_votes alter Votes erkennt man an der Anzahl der Einträge
+        if int(np.count_nonzero(np.asarray(matrix.positions[old_rows][:, cols]))) != self.facts:
+            return None
+
+        state = AnalyticsState(member_ids, groups, len(matrix.vote_ids))
+        state.vote_ids = self.vote_ids
+        state.facts = self.facts
+        state.agree[np.ix_(cols, cols)] = self.agree
+        state.shared[np.ix_(cols, cols)] = self.shared
+        group_pos = np.searchsorted(state.group_codes, self.group_codes)
+        state.ai_sum[group_pos] = self.ai_sum
+        state.group_votes[group_pos] = self.group_votes
+        state.loyal[cols] = self.loyal
+        state.voted[cols] = self.voted
+        state.add(matrix, np.asarray(rows)[~np.isin(new_ids, self.vote_ids, assume_unique=True)])
+        return state
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.vote_ids, self.agree, self.shared, self.ai_sum, self.group_votes,
+                                      self.loyal, self.voted, self.member_ids, self.member_group))
+
+    # --- Auswertungen ---
+
+    def agreement(self, member_ids):
+        """Übereinstimmungsraten und gemeinsame Votes für die angegebenen Mitglieder (Teilmatrix)."""
+        cols = [self.column(m_id) for m_id in member_ids]
+        cols = [c for c in cols if c is not None]
+        shared = self.shared[np.ix_(cols, cols)].astype(np.int64)
+        agree = self.agree[np.ix_(cols, cols)].astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = np.where(shared > 0, agree / np.maximum(shared, 1), np.nan)
+        return {
+            "member_ids": [int(self.member_ids[c]) for c in cols],
+            "agreement": [[None if np.isnan(r) else round(float(r), 4) for r in row] for row in rates],
+            "shared_votes": shared.tolist(),
+        }
+
+    def column(self, member_id):
+        col = int(np.searchsorted(self.member_ids, member_id))
+        if col < len(self.member_ids) and self.member_ids[col] == member_id:
+            return col
+        return None
+
+    def ranking(self, member_id):
+        """Alle anderen Mitglieder nach Übereinstimmung mit ``member_id`` sortiert (gecacht je Mitglied).
+
+        Gibt (Spalten, Raten, gemeinsame Votes, gleiche Stimmen) zurück, höchste
+        Rate zuerst, bei Gleichstand mehr gemeinsame Votes zuerst; Mitglieder
+        ohne gemeinsame Votes fehlen. None, wenn das Mitglied unbekannt ist.
+        """
+        cached = self._rankings.get(member_id)
+        if cached is not None:
+            return cached
+        col = self.column(member_id)
+        if col is None:
+            return None
+        shared = self.shared[col].astype(np.int64)
+        agree = self.agree[col].astype(np.int64)
+        rates = np.where(shared > 0, agree / np.maximum(shared, 1), -1.0)
+        order = np.lexsort((-shared, -rates))
+        order = order[(order != col) & (shared[order] > 0)]
+        result = (order, rates[order], shared[order], agree[order])
+        self._rankings[member_id] = result
+        return result
+
+    def cohesion(self):
+        """Agreement Index je Fraktion (Mittel über alle Votes, in denen die Fraktion abgestimmt hat)."""
+        members = np.bincount(self.member_group[self.member_group >= 0], minlength=len(self.group_codes))
+        return [
+            {
+                "group": code,
+                "members": int(members[g]),
+                "votes": int(self.group_votes[g]),
+                "agreement_index": round(float(self.ai_sum[g] / self.group_votes[g]), 4) if self.group_votes[g] else None,
+            }
+            for g, code in enumerate(self.group_codes)
+        ]
+
+    def loyalty(self, group=None):
+        """Anteil der Stimmen je Mitglied, die der Mehrheit der eigenen Fraktion folgen."""
+        result = []
+        for col, m_id in enumerate(self.member_ids):
+            g = self.member_group[col]
+            if g < 0 or (group and self.group_codes[g] != group):
+                continue
+            voted = int(self.voted[col])
+            result.append({
+                "member_id": int(m_id),
+                "group": self.group_codes[g],
+                "votes": voted,
+                "with_group_majority": int(self.loyal[col]),
+                "loyalty": round(int(self.loyal[col]) / voted, 4) if voted else None,
+            })
+        return result
+
+
+class Analytics:
+    """Cache der Analysezustände je Filter, fortgeschrieben bei neuen Snapshots."""
+
+    def __init__(self, max_bytes=ANALYTICS_CACHE_BYTES, workers=ANALYTICS_WORKERS):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # Filter → (Snapshot-Version, Zustand)
+        self._bytes = 0
+        self._pending = {}           # (Filter, Snapshot-Version) → laufende Berechnung
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analytics")
+
+    def state(self, snapshot, key, rows):
+        """Zustand für den Filter ``key`` (Votes ``rows`` des Snapshots); wartet auf die Berechnung."""
+        result = self._lookup(snapshot, key, rows)
+        return result if isinstance(result, AnalyticsState) else result.result()
+
+    def prefetch(self, snapshot, key, rows):
+        """Berechnet den Zustand im Hintergrund vor (z.B. den ungefilterten nach dem Start)."""
+        self._lookup(snapshot, key, rows)
+
+    def _lookup(self, snapshot, key, rows):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                version, state = cached
+                if version == snapshot.version:
+                    return state
+                if version > snapshot.version:
+                    # Request auf einem älteren Snapshot: nicht cachen
+                    return self._executor.submit(AnalyticsState.build, snapshot.matrix, rows)
+            future = self._pending.get((key, snapshot.version))
+            if future is None:
+                previous = cached[1] if cached is not None else None
+                future = self._executor.submit(self._compute, snapshot, key, rows, previous)
+                self._pending[(key, snapshot.version)] = future
+            return future
+
+    def _compute(self, snapshot, key, rows, previous):
+        try:
+            state = previous.updated(snapshot.matrix, rows) if previous is not None else None
+            if state is None:
+                state = AnalyticsState.build(snapshot.matrix, rows)
+            self._store(key, snapshot.version, state)
+            return state
+        finally:
+            with self._lock:
+                self._pending.pop((key, snapshot.version), None)
+
+    def _store(self, key, version, state):
+        with self._lock:
+            old = self._cache.get(key)
+            if old is not None:
+                if old[0] > version:
+                    return
+                self._bytes -= old[1].nbytes
+            self._cache[key] = (version, state)
+            self._cache.move_to_end(key)
+            self._bytes += state.nbytes
+            # Älteste Filter verdrängen; der gerade berechnete bleibt in jedem Fall
+            while self._bytes > self.max_bytes and len(self._cache) > 1:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def stats(self):
+        """(Einträge, Bytes) für /metrics."""
+        with self._lock:
+            return len(self._cache), self._bytes
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,379 @@
+# benchmark.py
+"""Reproduzierbare Benchmarks des Servers auf einem synthetischen Datensatz.
+
+``run`` legt ein Arbeitsverzeichnis mit einer Kopie des Codes und einem
+Datensatz aus synthetic_data.py an und misst:
+
+- Import: ``import_json_file`` wie in ``server.init_db_from_json`` (Votes/s,
+  Stimmen/s, Spitzen-RSS des Import-Prozesses)
+- Start: Zeit bis /readyz meldet, dass der Server bereit ist, einmal kalt (Snapshot wird
+  gebaut) und einmal warm (Snapshot aus shared_data/)
+- Last: p50/p90/p99-Latenz und Durchsatz je Endpunkt bei parallelen Clients,
+  danach der Spitzen-RSS aller Server-Prozesse
+
+Das Ergebnis ist JSON (``--output``); ``compare`` vergleicht zwei Ergebnisse
+und endet mit Exit-Code 1, wenn sich eine Kennzahl um mehr als
+``--threshold`` verschlechtert hat.
+
+Aufruf:
+
+    python benchmark.py run [--votes N] [--members M] [--requests R] [--concurrency C]
+                            [--workers W] [--workdir DIR] [--output results.json]
+    python benchmark.py compare ALT.json NEU.json [--threshold 0.2]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import requests
+
+import synthetic_data
+
+BASE_DIR = Path(__file__).parent
+
+DEFAULT_REQUESTS = 400
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WORKERS = 1
+WARMUP_REQUESTS = 5
+STARTUP_TIMEOUT = 600
+# Code, der ins Arbeitsverzeichnis kopiert wird (server.py liest Daten relativ zu sich selbst)
+CODE_DIRS = ("templates", "static")
+# Kennzahlen für compare: Schlüssel → True, wenn größere Werte besser sind
+COMPARE_METRICS = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "rps": True,
+    "votes_per_s": True,
+    "seconds": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(sorted_values, p):
+    """Perzentil nach dem Nearest-Rank-Verfahren."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_workdir(workdir, params):
+    """Kopiert den Code nach ``workdir`` und erzeugt dort den Datensatz (ohne votes.db)."""
+    workdir.mkdir(parents=True, exist_ok=True)
+    for path in BASE_DIR.glob("*.py"):
+        shutil.copy2(path, workdir / path.name)
+    for name in CODE_DIRS:
+        shutil.copytree(BASE_DIR / name, workdir / name, dirs_exist_ok=True)
+    for name in ("votes.db", "meps_cache.json"):
+        (workdir / name).unlink(missing_ok=True)
+    shutil.rmtree(workdir / "shared_data", ignore_errors=True)
+    return synthetic_data.write_dataset(workdir, **params)
+
+
+def measure_import(workdir):
+    """Import von vote_data.json in eine leere votes.db (läuft in einem eigenen Prozess)."""
+    from sqlalchemy import create_engine, text
+
+    from importer import import_json_file
+    from models import Base
+
+    engine = create_engine(f"sqlite:///{Path(workdir) / 'votes.db'}")
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    import_json_file(engine, Path(workdir) / "vote_data.json", progress=lambda *args: None)
+    seconds = time.perf_counter() - started
+    with engine.connect() as conn:
+        votes = conn.execute(text("SELECT COUNT(*) FROM votes")).scalar()
+        member_votes = conn.execute(text("SELECT COUNT(*) FROM member_votes")).scalar()
+    engine.dispose()
+    return {
+        "seconds": round(seconds, 3),
+        "votes": votes,
+        "member_votes": member_votes,
+        "votes_per_s": round(votes / seconds, 1),
+        "member_votes_per_s": round(member_votes / seconds, 1),
+        # ru_maxrss ist unter Linux in KiB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def process_tree(pid):
+    """PID und alle Nachfahren (über /proc, nur Linux)."""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def memory_mb(pid, field):
+    """Summe eines /proc/<pid>/status-Felds (VmRSS, VmHWM) über den Prozessbaum in MB."""
+    total = 0
+    for current in process_tree(pid):
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total / 1024, 1) if total else None
+
+
+class Server:
+    """uvicorn im Arbeitsverzeichnis als Unterprozess."""
+
+    def __init__(self, workdir, workers):
+        self.workdir = workdir
+        self.workers = workers
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+
+    def start(self):
+        """Startet den Server und gibt die Sekunden bis zur Bereitschaft (/readyz) zurück."""
+        env = dict(os.environ, MEPS_REFRESH_INTERVAL="0", PYTHONDONTWRITEBYTECODE="1")
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=self.workdir, env=env, stdout=subprocess.DEVNULL,
+        )
+        while time.perf_counter() - started < STARTUP_TIMEOUT:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server beendet mit Code {self.process.returncode}")
+            try:
+                if requests.get(self.base_url + "/readyz", timeout=5).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError("Server nicht rechtzeitig gestartet")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+def scenarios(dataset, seed):
+    """Endpunkt → Liste von URLs (Parameter reihum, damit nicht nur ein Cache-Eintrag getroffen wird)."""
+    rng = random.Random(seed)
+    members = [synthetic_data.FIRST_MEMBER_ID + i for i in range(dataset["members"])]
+    vote_ids = [synthetic_data.FIRST_VOTE_ID + i for i in range(dataset["votes"])]
+    geo = [label for _, label in synthetic_data.GEO_AREAS[:dataset["geo_areas"]]] or ["Ukraine"]
+    last_names = sorted({name for name in synthetic_data.LAST_NAMES})
+
+    def date_range():
+        start = synthetic_data.START_DATE + timedelta(days=rng.randint(0, 365))
+        end = start + timedelta(days=rng.randint(30, 180))
+        return f"start_date={start:%d.%m.%Y}&end_date={end:%d.%m.%Y}"
+
+    n = 50
+    return {
+        "votes_html": ["/votes/html"],
+        "votes_html_member": [f"/votes/html?member_id={rng.choice(members)}" for _ in range(n)],
+        "votes_html_geo": [f"/votes/html?geo={rng.choice(geo)}" for _ in range(n)],
+        "votes_html_dates": [f"/votes/html?{date_range()}" for _ in range(n)],
+        "votes_html_member_geo_dates": [f"/votes/html?member_id={rng.choice(members)}&geo={rng.choice(geo)}&{date_range()}"
+                                        for _ in range(n)],
+        "votes_html_show_all": ["/votes/html?show_all=true"],
+        "vote_detail": [f"/votes/detail/{rng.choice(vote_ids)}" for _ in range(n)],
+        "members": ["/members"],
+        "members_search": [f"/members/search?last_name={rng.choice(last_names)[:3]}" for _ in range(n)],
+    }
+
+
+def load_test(base_url, urls, total, concurrency):
+    """Führt ``total`` Anfragen über ``concurrency`` Threads aus; gibt Latenz- und Durchsatzwerte zurück."""
+    local = threading.local()
+
+    def fetch(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + urls[i % len(urls)], timeout=60)
+            ok = response.status_code == 200
+            size = len(response.content)
+        except requests.RequestException:
+            ok, size = False, 0
+        return time.perf_counter() - started, ok, size
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(fetch, range(min(WARMUP_REQUESTS, total))))
+        started = time.perf_counter()
+        results = list(pool.map(fetch, range(total)))
+        wall = time.perf_counter() - started
+    latencies = sorted(r[0] * 1000 for r in results)
+    return {
+        "requests": total,
+        "errors": sum(1 for r in results if not r[1]),
+        "rps": round(total / wall, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "mean_bytes": round(sum(r[2] for r in results) / len(results)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    params = {
+        "n_votes": args.votes, "n_members": args.members, "n_groups": args.groups,
+        "n_countries": args.countries, "n_geo_areas": args.geo_areas, "seed": args.seed,
+    }
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="htv-bench-"))
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+        },
+    }
+    print(f"Arbeitsverzeichnis: {workdir}", file=sys.stderr)
+    dataset = prepare_workdir(workdir, params)
+    dataset.update(groups=args.groups, countries=args.countries, geo_areas=args.geo_areas, seed=args.seed)
+    results["dataset"] = dataset
+
+    print("Import ...", file=sys.stderr)
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        results["import"] = pool.apply(measure_import, (str(workdir),))
+
+    print("Start (kalt/warm) ...", file=sys.stderr)
+    server = Server(workdir, args.workers)
+    try:
+        cold = server.start()
+        server.stop()
+        warm = server.start()
+        results["startup"] = {
+            "cold_seconds": round(cold, 3),
+            "warm_seconds": round(warm, 3),
+            "rss_mb": memory_mb(server.process.pid, "VmRSS"),
+        }
+        results["endpoints"] = {}
+        for name, urls in scenarios(dataset, args.seed).items():
+            print(f"Last: {name} ...", file=sys.stderr)
+            results["endpoints"][name] = load_test(server.base_url, urls, args.requests, args.concurrency)
+        results["server"] = {"peak_rss_mb": memory_mb(server.process.pid, "VmHWM")}
+    finally:
+        server.stop()
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+def flatten(results, prefix=""):
+    """Verschachteltes Ergebnis → {"endpoints.members.p99_ms": Wert, ...} (nur Zahlen)."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(args):
+    old = flatten(json.loads(Path(args.old).read_text(encoding="utf-8")))
+    new = flatten(json.loads(Path(args.new).read_text(encoding="utf-8")))
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        if key.startswith(("meta.", "dataset.")):
+            continue
+        metric = key.rsplit(".", 1)[1]
+        higher_is_better = next((better for name, better in COMPARE_METRICS.items() if metric.endswith(name)), None)
+        if higher_is_better is None or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif -worse > args.threshold:
+            flag = "  besser"
+        print(f"{key:55} {old[key]:>12} → {new[key]:>12} ({change:+.1%}){flag}")
+    if regressions:
+        print(f"{regressions} Kennzahl(en) um mehr als {args.threshold:.0%} verschlechtert.")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks auf einem synthetischen Datensatz.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Datensatz erzeugen, Server starten und messen")
+    run_parser.add_argument("--votes", type=int, default=synthetic_data.DEFAULT_VOTES, help="Anzahl Votes")
+    run_parser.add_argument("--members", type=int, default=synthetic_data.DEFAULT_MEMBERS, help="Anzahl MEPs")
+    run_parser.add_argument("--groups", type=int, default=synthetic_data.DEFAULT_GROUPS, help="Anzahl Fraktionen")
+    run_parser.add_argument("--countries", type=int, default=synthetic_data.DEFAULT_COUNTRIES, help="Anzahl Länder")
+    run_parser.add_argument("--geo-areas", type=int, default=synthetic_data.DEFAULT_GEO_AREAS, help="Anzahl Geo-Areas")
+    run_parser.add_argument("--seed", type=int, default=synthetic_data.DEFAULT_SEED, help="Startwert für Daten und URLs")
+    run_parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Anfragen je Endpunkt")
+    run_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Parallele Clients")
+    run_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="uvicorn-Worker")
+    run_parser.add_argument("--workdir", help="Arbeitsverzeichnis (bleibt erhalten; sonst temporär)")
+    run_parser.add_argument("--output", help="Ergebnis zusätzlich in diese JSON-Datei schreiben")
+
+    compare_parser = commands.add_parser("compare", help="Zwei Ergebnisse vergleichen")
+    compare_parser.add_argument("old", help="Basis-Ergebnis (JSON)")
+    compare_parser.add_argument("new", help="Neues Ergebnis (JSON)")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Erlaubte Verschlechterung (0.2 = 20 %%)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
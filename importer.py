@@ -0,0 +1,315 @@
+# importer.py
+"""Streamender Import von vote_data.json in die SQLite-DB.
+
+Die JSON-Datei wird Vote für Vote gelesen (mit ijson, falls installiert,
+sonst mit einem eigenen inkrementellen Decoder). Die Zeilen werden gesammelt
+und batchweise per ``executemany`` über SQLAlchemy Core in kurzen
+Transaktionen geschrieben. Der Speicherbedarf hängt damit nur von der
+Batchgröße ab, nicht von der Dateigröße. Erst nach dem letzten Batch wird der
+Import in import_runs als abgeschlossen vermerkt; fehlt der Eintrag, setzt der
+nächste Start den Import fort.
+"""
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Vote, Stats, ByGroup, ByCountry, Member, MemberVote, IngestEvent, POSITION_CODES
+from rollups import add_rollups, rollup_rows
+
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
+
+# Votes pro Transaktion
+BATCH_SIZE = 200
+# Lesegröße für den eingebauten Decoder
+READ_CHUNK_SIZE = 1 << 20
+# Aufbewahrungsdauer der Ingest-Ereignisse in Sekunden
+INGEST_EVENT_RETENTION = 86400
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    """Liefert die Elemente eines JSON-Arrays einzeln, ohne die Datei komplett zu laden."""
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item", use_float=True)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        eof = False
+
+        def skip(chars):
+            nonlocal pos
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in chars):
+                pos += 1
+
+        skip("")
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path} enthält kein JSON-Array")
+        pos += 1
+        while True:
+            skip(",")
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Element unvollständig: Rest behalten und nachladen
+                more = f.read(chunk_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
+
+
+def member_row(m):
+    """Flache Zeile für die members-Tabelle aus einem verschachtelten Member-Dict."""
+    country = m.get("country") or {}
+    group = m.get("group") or {}
+    return {
+        "id": m.get("id"),
+        "first_name": m.get("first_name", ""),
+        "last_name": m.get("last_name", ""),
+        "date_of_birth": m.get("date_of_birth", ""),
+        "country_code": country.get("code", ""),
+        "country_iso_alpha_2": country.get("iso_alpha_2", ""),
+        "country_label": country.get("label", ""),
+        "group_code": group.get("code", ""),
+        "group_label": group.get("label", ""),
+        "group_short_label": group.get("short_label", ""),
+        "photo_url": m.get("photo_url", ""),
+        "thumb_url": m.get("thumb_url", ""),
+        "email": m.get("email", ""),
+        "facebook": m.get("facebook", ""),
+        "twitter": m.get("twitter", ""),
+    }
+
+
+def vote_rows(item):
+    """Zerlegt einen Vote-Datensatz in Zeilen für votes, stats, stats_by_group/-country, members und member_votes."""
+    vote_id = int(item.get("id"))
+    s_data = item.get("stats", {})
+    total = s_data.get("total", {})
+    # Stats steht 1:1 zum Vote; die Vote-ID dient als Stats-ID, damit
+    # ByGroup/ByCountry ohne Rückfrage an die DB verknüpft werden können.
+    rows = {
+        "votes": [{
+            "id": vote_id,
+            "timestamp": item.get("timestamp"),
+            "display_title": item.get("display_title"),
+            "description": item.get("description", ""),
+            "reference": item.get("reference", ""),
+            "geo_areas": ", ".join(area.get("label", "") for area in item.get("geo_areas", [])),
+            "position": item.get("result", "UNKNOWN"),
+            "raw_json": json.dumps(
+                {k: v for k, v in item.items() if k != "member_votes"}, ensure_ascii=False
+            ),
+        }],
+        "stats": [{
+            "id": vote_id,
+            "vote_id": vote_id,
+            "total_for": total.get("FOR", 0),
+            "total_against": total.get("AGAINST", 0),
+            "total_abstention": total.get("ABSTENTION", 0),
+            "total_did_not_vote": total.get("DID_NOT_VOTE", 0),
+        }],
+        "stats_by_group": [],
+        "stats_by_country": [],
+        "members": [],
+        "member_votes": [],
+    }
+    for grp_entry in s_data.get("by_group", []):
+        grp = grp_entry.get("group", {})
+        st = grp_entry.get("stats", {})
+        rows["stats_by_group"].append({
+            "stats_id": vote_id,
+            "group_code": grp.get("code", ""),
+            "group_label": grp.get("label", ""),
+            "group_short_label": grp.get("short_label", ""),
+            "for_count": st.get("FOR", 0),
+            "against_count": st.get("AGAINST", 0),
+            "abstention_count": st.get("ABSTENTION", 0),
+            "did_not_vote_count": st.get("DID_NOT_VOTE", 0),
+        })
+    for ctry_entry in s_data.get("by_country", []):
+        ctry = ctry_entry.get("country", {})
+        st = ctry_entry.get("stats", {})
+        rows["stats_by_country"].append({
+            "stats_id": vote_id,
+            "country_code": ctry.get("code", ""),
+            "country_iso_alpha_2": ctry.get("iso_alpha_2", ""),
+            "country_label": ctry.get("label", ""),
+            "for_count": st.get("FOR", 0),
+            "against_count": st.get("AGAINST", 0),
+            "abstention_count": st.get("ABSTENTION", 0),
+            "did_not_vote_count": st.get("DID_NOT_VOTE", 0),
+        })
+    for mv_entry in item.get("member_votes", []):
+        m = mv_entry.get("member", {})
+        rows["members"].append(member_row(m))
+        rows["member_votes"].append({
+            "vote_id": vote_id,
+            "member_id": m.get("id"),
+            "position_code": POSITION_CODES.get(mv_entry.get("position"), 0),
+        })
+    return rows
+
+
+# Reihenfolge der Inserts (Fremdschlüssel zuerst)
+TABLES = [
+    ("votes", Vote.__table__),
+    ("stats", Stats.__table__),
+    ("stats_by_group", ByGroup.__table__),
+    ("stats_by_country", ByCountry.__table__),
+    ("members", Member.__table__),
+    ("member_votes", MemberVote.__table__),
+]
+
+
+def upsert_members(conn, rows):
+    """Legt Mitglieder an bzw. aktualisiert deren Profil (INSERT ... ON CONFLICT DO UPDATE)."""
+    table = Member.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name != "id"},
+    )
+    conn.execute(stmt, rows)
+
+
+def batch_rows(items):
+    """Zeilen aller Tabellen für eine Liste von Vote-Datensätzen (ohne DB-Zugriff, auch in Worker-Prozessen)."""
+    batch = {name: [] for name, _ in TABLES}
+    for item in items:
+        for name, rows in vote_rows(item).items():
+            batch[name].extend(rows)
+    # Jedes Mitglied nur einmal pro Batch; das zuletzt gesehene Profil gewinnt
+    batch["members"] = list({row["id"]: row for row in batch["members"]}.values())
+    return batch
+
+
+def write_batch(conn, items):
+    """Schreibt eine Liste von Vote-Datensätzen per executemany in die offene Verbindung."""
+    write_rows(conn, batch_rows(items))
+
+
+def write_rows(conn, batch):
+    """Schreibt die Zeilen aus ``batch_rows`` samt Rollups und Ingest-Ereignis."""
+    for name, table in TABLES:
+        if not batch[name]:
+            continue
+        if name == "members":
+            upsert_members(conn, batch[name])
+        else:
+            conn.execute(table.insert(), batch[name])
+    # Tages-/Monatssummen je Fraktion und Land in derselben Transaktion fortschreiben
+    add_rollups(conn, rollup_rows(batch))
+    # Laufende Server über die neuen Votes informieren (siehe live_updates.py)
+    if batch["votes"]:
+        now = time.time()
+        conn.execute(IngestEvent.__table__.insert(), {
+            "created_at": now,
+            "vote_ids": json.dumps([row["id"] for row in batch["votes"]]),
+        })
+        conn.execute(text("DELETE FROM ingest_events WHERE created_at < :cutoff"),
+                     {"cutoff": now - INGEST_EVENT_RETENTION})
+
+
+def delete_votes(conn, vote_ids):
+    """Entfernt Votes samt Statistiken und Stimmen (Rollups müssen danach neu aufgebaut werden)."""
+    vote_ids = list(vote_ids)
+    for start in range(0, len(vote_ids), 500):
+        chunk = vote_ids[start:start + 500]
+        conn.execute(MemberVote.__table__.delete().where(MemberVote.__table__.c.vote_id.in_(chunk)))
+        conn.execute(ByGroup.__table__.delete().where(ByGroup.__table__.c.stats_id.in_(chunk)))
+        conn.execute(ByCountry.__table__.delete().where(ByCountry.__table__.c.stats_id.in_(chunk)))
+        conn.execute(Stats.__table__.delete().where(Stats.__table__.c.vote_id.in_(chunk)))
+        conn.execute(Vote.__table__.delete().where(Vote.__table__.c.id.in_(chunk)))
+
+
+@contextmanager
+def bulk_load(engine):
+    """Verbindung mit Einstellungen für große Importe; danach wieder normales fsync."""
+    with engine.connect() as conn:
+        # Während des Bulk-Loads: WAL, kein fsync pro Commit, temporäre Daten im RAM
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+        conn.exec_driver_sql("PRAGMA cache_size=-65536")
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+            conn.commit()
+
+
+def import_votes(engine, items, batch_size=BATCH_SIZE, progress=print):
+    """Importiert Vote-Datensätze aus einem Iterator in Batches; gibt die Anzahl zurück."""
+    started = time.time()
+    count = 0
+    with bulk_load(engine) as conn:
+        pending = []
+        for item in items:
+            pending.append(item)
+            if len(pending) >= batch_size:
+                write_batch(conn, pending)
+                conn.commit()
+                count += len(pending)
+                pending = []
+                if progress:
+                    elapsed = time.time() - started
+                    progress(f"Import: {count} Votes ({count / elapsed:.0f}/s)")
+        if pending:
+            write_batch(conn, pending)
+            conn.commit()
+            count += len(pending)
+    if progress:
+        progress(f"Import abgeschlossen: {count} Votes in {time.time() - started:.1f}s")
+    return count
+
+
+def import_json_file(engine, path, batch_size=BATCH_SIZE, progress=print):
+    """Importiert eine vote_data.json streamend in die DB und vermerkt den Abschluss in import_runs.
+
+    Ein abgebrochener Import wird fortgesetzt: Votes, die schon in der DB liegen
+    (jeder Batch ist eine Transaktion), werden übersprungen.
+    """
+    with engine.connect() as conn:
+        done = {row[0] for row in conn.execute(text("SELECT id FROM votes"))}
+    items = (item for item in iter_json_array(path) if int(item["id"]) not in done)
+    count = import_votes(engine, items, batch_size=batch_size, progress=progress)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT OR REPLACE INTO import_runs (source, votes, completed_at) "
+                          "VALUES (:source, :votes, :completed_at)"),
+                     {"source": Path(path).name, "votes": count, "completed_at": time.time()})
+    return count
+
+
+def import_completed(engine, source):
+    """True, wenn der Import der Quelldatei ``source`` vollständig durchgelaufen ist."""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM import_runs WHERE source = :source"),
+                            {"source": source}).first() is not None
+
+
+def db_is_empty(engine):
+    """True, wenn noch kein Vote in der DB liegt."""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM votes LIMIT 1")).first() is None
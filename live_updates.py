@@ -0,0 +1,173 @@
+# live_updates.py
+"""Live-Benachrichtigung über neu importierte Votes per Socket.IO.
+
+Ereignisweg: ``importer.write_batch`` schreibt zu jedem Batch eine Zeile in
+ingest_events (gleiche Transaktion wie die Votes). Jeder Server-Worker fragt
+die Tabelle in kurzen Abständen nach neuen Ereignissen ab, lädt dann seinen
+Snapshot neu und sendet kompakte Deltas an die Socket.IO-Clients, die mit ihm
+verbunden sind. Die Tabelle dient damit als lokaler Pub/Sub-Kanal: Jeder
+Worker liest alle Ereignisse, jeder Client bekommt jedes Delta genau einmal.
+
+Clients abonnieren per ``subscribe`` mit ``{"member_id": …, "geo": "…"}``
+genau einen Filter: Raum "member:<id>", sonst "geo:<Label>" je Label, sonst
+"all". Bei mehreren Geo-Labels kann ein Vote mehrfach ankommen; der Client
+entfernt Duplikate über die Vote-ID.
+"""
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from sqlalchemy import text
+
+from models import POSITION_NAMES
+
+# Abfrageintervall für neue Ingest-Ereignisse in Sekunden (0 = keine Live-Updates)
+LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", "2"))
+BASE_DIR = Path(__file__).parent
+
+# Socket.IO-Client für die Seite: selbst gehostet, wenn static/socket.io.min.js vorhanden ist,
+# sonst vom CDN (Client 4.x spricht das Protokoll von python-socketio 5)
+SOCKETIO_CLIENT_CDN_URL = "https://cdn.socket.io/4.7.5/socket.io.min.js"
+SOCKETIO_CLIENT_URL = os.environ.get("SOCKETIO_CLIENT_URL") or (
+    "/static/socket.io.min.js" if (BASE_DIR / "static" / "socket.io.min.js").exists() else SOCKETIO_CLIENT_CDN_URL
+)
+# Polls, die auf einen noch fehlenden Vote im Snapshot gewartet wird, bevor das Ereignis übersprungen wird
+LIVE_MAX_RETRIES = int(os.environ.get("LIVE_MAX_RETRIES", "5"))
+# Felder einer Vote-Zusammenfassung im Delta
+DELTA_FIELDS = ("id", "timestamp", "display_title", "reference", "result", "geo_areas", "chart_data")
+
+
+def latest_event_id(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT MAX(id) FROM ingest_events")).scalar() or 0
+
+
+def events_after(engine, event_id):
+    """Ereignisse nach ``event_id`` als Liste von (id, [Vote-IDs])."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT id, vote_ids FROM ingest_events WHERE id > :id ORDER BY id"), {"id": event_id}
+        ).fetchall()
+    return [(event_id, json.loads(vote_ids)) for event_id, vote_ids in rows]
+
+
+def vote_ids_in_db(engine, vote_ids):
+    """Die Vote-IDs aus ``vote_ids``, die (noch) in der DB liegen."""
+    params = {f"id{i}": v for i, v in enumerate(vote_ids)}
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT id FROM votes WHERE id IN ({', '.join(':' + k for k in params)})"), params)
+        return {row[0] for row in rows}
+
+
+def rooms_for(member_id=None, geo=None):
+    """Räume für einen Filter wie auf /votes/html: Mitglied vor Geo-Labels vor "all"."""
+    if member_id:
+        return {f"member:{int(member_id)}"}
+    rooms = {f"geo:{label.strip()}" for label in (geo or "").split(",") if label.strip()}
+    return rooms or {"all"}
+
+
+class LiveUpdates:
+    """Verteilt neue Votes an abonnierte Socket.IO-Räume; eine Instanz je Worker."""
+
+    def __init__(self, engine, snapshots, socket_manager, interval=LIVE_POLL_INTERVAL):
+        self.engine = engine
+        self.snapshots = snapshots
+        self.sio = socket_manager
+        self.interval = interval
+        # sid → abonnierte Räume
+        self.subscriptions = {}
+        self.last_event_id = None
+        # Polls, in denen das nächste Ereignis auf fehlende Votes im Snapshot gewartet hat
+        self.retries = 0
+        self._task = None
+        socket_manager.on("subscribe")(self.subscribe)
+        socket_manager.on("disconnect")(self.disconnect)
+
+    async def subscribe(self, sid, data=None):
+        data = data if isinstance(data, dict) else {}
+        try:
+            rooms = rooms_for(data.get("member_id"), data.get("geo"))
+        except (TypeError, ValueError):
+            return {"error": "ungültiger Filter"}
+        for room in self.subscriptions.get(sid, set()) - rooms:
+            await self.sio.leave_room(sid, room)
+        for room in rooms:
+            await self.sio.enter_room(sid, room)
+        self.subscriptions[sid] = rooms
+        return {"rooms": sorted(rooms)}
+
+    async def disconnect(self, sid, *args):
+        self.subscriptions.pop(sid, None)
+
+    def deltas(self, snapshot, vote_ids):
+        """(Raum, Payload) für alle abonnierten Räume, die von den neuen Votes betroffen sind."""
+        matrix = snapshot.matrix
+        rows = [row for row in (matrix.vote_index.get(v) for v in vote_ids) if row is not None]
+        if not rows:
+            return []
+        summaries = {row: {f: matrix.votes[row][f] for f in DELTA_FIELDS} for row in rows}
+        active = set().union(*self.subscriptions.values()) if self.subscriptions else set()
+        result = []
+        for room in sorted(active):
+            if room == "all":
+                result.append((room, {"votes": list(summaries.values()), "total_votes": len(matrix.votes)}))
+            elif room.startswith("member:"):
+                member_id = int(room.split(":", 1)[1])
+                positions = matrix.positions_of(member_id)
+                votes = [dict(summaries[row], position=POSITION_NAMES.get(int(positions[row])))
+                         for row in rows if positions[row]]
+                if votes:
+                    result.append((room, {"votes": votes, "total_member_votes": matrix.vote_count(member_id)}))
+            elif room.startswith("geo:"):
+                label = room.split(":", 1)[1]
+                votes = [s for s in summaries.values() if any(ga.get("label") == label for ga in s["geo_areas"])]
+                if votes:
+                    result.append((room, {"votes": votes, "total_votes": len(matrix.geo_index.get(label, ()))}))
+        return result
+
+    async def poll_once(self):
+        """Prüft auf neue Ingest-Ereignisse und sendet die Deltas; gibt die Anzahl neuer Votes zurück."""
+        events = await asyncio.to_thread(events_after, self.engine, self.last_event_id)
+        if not events:
+            return 0
+        await asyncio.to_thread(self.snapshots.reload)
+        snapshot = self.snapshots.current
+        index = snapshot.matrix.vote_index
+        vote_ids = []
+        for event_id, ids in events:
+            missing = [v for v in ids if v not in index]
+            if missing:
+                # Gelöschte bzw. ersetzte Votes kommen nicht mehr; auf die übrigen (z.B. Reload
+                # fehlgeschlagen) wird einige Polls gewartet, dann wird das Ereignis übersprungen
+                waiting = await asyncio.to_thread(vote_ids_in_db, self.engine, missing)
+                if waiting:
+                    self.retries += 1
+                    if self.retries <= LIVE_MAX_RETRIES:
+                        break
+                    print(f"Live-Update: Ereignis {event_id} übersprungen, Votes {sorted(waiting)} fehlen im Snapshot")
+            self.retries = 0
+            vote_ids.extend(v for v in ids if v in index)
+            self.last_event_id = event_id
+        for room, payload in self.deltas(snapshot, vote_ids):
+            await self.sio.emit("new_votes", payload, room=room)
+        return len(vote_ids)
+
+    async def run(self):
+        self.last_event_id = await asyncio.to_thread(latest_event_id, self.engine)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"Live-Update fehlgeschlagen: {e}")
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
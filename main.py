@@ -1,139 +1,256 @@
-import requests
-import time
+"""Harvester: lädt neue Abstimmungen von howtheyvote.eu und speichert sie in votes.db.
+
+Die Detail-Abrufe laufen parallel in einem Thread-Pool über eine gemeinsame
+requests-Session (Keep-Alive-Verbindungspool). Ein Token-Bucket begrenzt die
+Anfragerate, fehlgeschlagene Anfragen werden mit exponentiellem Backoff
+wiederholt. Neue Votes werden batchweise als Shards an den NDJSON-Datensatz
+angehängt (siehe vote_dataset.py) und von dort in die DB importiert.
+
+Aufruf:
+
+    python main.py [--base-url URL] [--concurrency N] [--rate R] [--batch-size B] [--dataset-dir DIR]
+
+Mit ``--base-url`` lässt sich der Harvester gegen einen lokalen Stand-in-Server
+mit vorbereiteten howtheyvote.eu-Antworten testen (tests/stand_in_server.py,
+Tests in tests/test_harvester.py). Es sind höchstens
+``concurrency * IN_FLIGHT_PER_WORKER`` Abrufe gleichzeitig offen.
+"""
+import argparse
+import random
 import re
-import json
-from fastapi import FastAPI
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-import datetime
-import sqlite3
 
-app = FastAPI()
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, text
+
+from migrate_db import ensure_schema
+from vote_dataset import DATASET_DIR, append_votes, import_dataset, known_vote_ids
+
 BASE_DIR = Path(__file__).parent
 
 # Pfad zur Datenbank
 DB_PATH = BASE_DIR / 'votes.db'
 
-# Verbinde mit der Datenbank
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
-# Tabelle erstellen, falls nicht vorhanden
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS votes (
-    id INTEGER PRIMARY KEY,
-    timestamp TEXT,
-    display_title TEXT NOT NULL
-)
-''')
-conn.commit()
-
-# Lade alle bereits vorhandenen IDs aus der Datenbank
-cursor.execute('SELECT id FROM votes')
-existing_ids = {row[0] for row in cursor.fetchall()}
-
-# Neue IDs sammeln
-vote_ids = set()
-
-# HTML-Seiten durchgehen, aber abbrechen, wenn eine Seite keine neuen IDs liefert
-for page in range(1, 100):
-    html_url = f'https://howtheyvote.eu/votes?sort=relevance&page={page}'
-    html_response = requests.get(html_url)
-
-    if html_response.status_code != 200:
-        print(f'Seite {page} konnte nicht geladen werden (Status {html_response.status_code}).')
-        break
-
-    matches = re.findall(r'/votes/(\d{6})', html_response.text)
-    if not matches:
-        print(f'Keine IDs auf Seite {page}.')
-        break
-
-    # Filtere nur neue IDs
-    new_ids_on_page = [vote_id for vote_id in matches if int(vote_id) not in existing_ids]
-
-    if not new_ids_on_page:
-        print(f'Nur bekannte IDs auf Seite {page}, Abbruch.')
-        break
-
-    print(f'Seite {page}: {len(new_ids_on_page)} neue IDs gefunden.')
-    vote_ids.update(new_ids_on_page)
-
-# IDs sortieren für konsistente Verarbeitung (optional)
-vote_ids = sorted(vote_ids, key=int, reverse=True)
-
-# Abstimmungen abrufen und speichern
-results = []
-
-# Update logic to check for new vote IDs and download only those
-cursor.execute('SELECT id FROM votes')
-existing_ids = {row[0] for row in cursor.fetchall()}
-
-# Filter out already existing vote IDs
-new_vote_ids = [vote_id for vote_id in vote_ids if int(vote_id) not in existing_ids]
-
-# Process only new votes
-for vote_id in new_vote_ids:
-    url = f'https://howtheyvote.eu/api/votes/{vote_id}'
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        data = response.json()
-
-        # Update description if necessary
-        description = data.get('description')
-        if description:
-            description = description.replace('Proposition de résolution (ensemble du texte)', 'Motions for resolutions')
-            data['description'] = description
-
-        # Save complete vote data
-        results.append(data)
-        cursor.execute(
-            'INSERT INTO votes (id, timestamp, display_title, raw_json) VALUES (?, ?, ?, ?)',
-            (vote_id, data.get('timestamp'), data.get('display_title'), json.dumps(data))
-        )
-        conn.commit()
-
-        print(f'Abstimmung {vote_id} verarbeitet.')
-    else:
-        print(f'Abstimmung {vote_id} nicht gefunden.')
-
-    time.sleep(0.01)  # Reduce server load
-
-conn.close()
-
-# JSON-Datei für Webzugriff erzeugen
-output_path = BASE_DIR / 'vote_data.json'
-with open(output_path, 'w', encoding='utf-8') as f:
-    json.dump(results, f, ensure_ascii=False, indent=2)
-
-# API-Endpunkte wie gehabt
-@app.get("/members")
-def get_all_members():
-    with open(BASE_DIR / 'vote_data.json', encoding="utf-8") as f:
-        data = json.load(f)
-
-    members = {}
-    for vote in data:
-        for member_vote in vote.get("member_votes", []):
-            member = member_vote.get("member", {})
-            member_id = member.get("id")
-            if member_id not in members:
-                members[member_id] = {
-                    "id": member_id,
-                    "last_name": member.get("last_name"),
-                    "faction": member.get("faction")
-                }
-
-    return list(members.values())
-
-@app.get("/votes/sorted")
-def get_sorted_votes(order: str = "desc"):
-    with open(BASE_DIR / 'vote_data.json', encoding="utf-8") as f:
-        data = json.load(f)
-
-    if order == "asc":
-        sorted_votes = sorted(data, key=lambda x: datetime.datetime.fromisoformat(x['timestamp']))
-    else:
-        sorted_votes = sorted(data, key=lambda x: datetime.datetime.fromisoformat(x['timestamp']), reverse=True)
-
-    return sorted_votes
\ No newline at end of file
+DEFAULT_BASE_URL = 'https://howtheyvote.eu'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0        # Anfragen pro Sekunde
+DEFAULT_BATCH_SIZE = 500   # Votes pro Anhang an den Datensatz
+DEFAULT_RETRIES = 5
+IN_FLIGHT_PER_WORKER = 4   # offene Abrufe je Thread (begrenzt den Speicher)
+MAX_LISTING_PAGES = 100
+REQUEST_TIMEOUT = 30
+
+# Statuscodes, bei denen ein erneuter Versuch sinnvoll ist
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket: im Mittel ``rate`` Anfragen pro Sekunde, Spitzen bis ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(concurrency):
+    """requests-Session mit Verbindungspool, groß genug für alle Worker-Threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch(session, bucket, url, retries=DEFAULT_RETRIES, backoff=0.5):
+    """GET mit Ratenbegrenzung und exponentiellem Backoff; gibt die Response oder None (404) zurück."""
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            error = e
+        else:
+            if response.status_code == 404:
+                return None
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return response
+            error = requests.HTTPError(f'Status {response.status_code}', response=response)
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit() and attempt < retries:
+                time.sleep(int(retry_after))
+                continue
+        if attempt == retries:
+            raise error
+        # Exponentieller Backoff mit Jitter
+        time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def existing_vote_ids(engine):
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text('SELECT id FROM votes'))}
+
+
+def collect_new_ids(session, bucket, base_url, existing_ids, max_pages=MAX_LISTING_PAGES):
+    """Geht die Listenseiten durch, bis eine Seite keine neuen IDs mehr liefert."""
+    vote_ids = set()
+    for page in range(1, max_pages):
+        html_url = f'{base_url}/votes?sort=relevance&page={page}'
+        try:
+            html_response = fetch(session, bucket, html_url)
+        except requests.RequestException as e:
+            print(f'Seite {page} konnte nicht geladen werden ({e}).')
+            break
+        if html_response is None:
+            print(f'Seite {page} nicht gefunden.')
+            break
+
+        matches = re.findall(r'/votes/(\d{6})', html_response.text)
+        if not matches:
+            print(f'Keine IDs auf Seite {page}.')
+            break
+
+        # Filtere nur neue IDs
+        new_ids_on_page = [vote_id for vote_id in matches if int(vote_id) not in existing_ids]
+
+        if not new_ids_on_page:
+            print(f'Nur bekannte IDs auf Seite {page}, Abbruch.')
+            break
+
+        print(f'Seite {page}: {len(new_ids_on_page)} neue IDs gefunden.')
+        vote_ids.update(new_ids_on_page)
+
+    # IDs sortieren für konsistente Verarbeitung
+    return sorted(vote_ids, key=int, reverse=True)
+
+
+def fetch_vote(session, bucket, base_url, vote_id):
+    """Lädt einen Vote über die API und bereinigt die Beschreibung (None, wenn nicht gefunden)."""
+    response = fetch(session, bucket, f'{base_url}/api/votes/{vote_id}')
+    if response is None:
+        return None
+    data = response.json()
+
+    # Update description if necessary
+    description = data.get('description')
+    if description:
+        description = description.replace('Proposition de résolution (ensemble du texte)', 'Motions for resolutions')
+        data['description'] = description
+    return data
+
+
+def harvest(engine, base_url=DEFAULT_BASE_URL, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+            batch_size=DEFAULT_BATCH_SIZE, max_pages=MAX_LISTING_PAGES, dataset_dir=DATASET_DIR):
+    """Lädt alle neuen Votes parallel, hängt sie batchweise an den Datensatz an und importiert sie; gibt die Anzahl zurück."""
+    session = make_session(concurrency)
+    bucket = TokenBucket(rate, burst=concurrency)
+
+    # Votes im Datensatz, aber (noch) nicht in der DB, nicht erneut laden
+    existing_ids = existing_vote_ids(engine) | known_vote_ids(dataset_dir)
+    vote_ids = collect_new_ids(session, bucket, base_url, existing_ids, max_pages=max_pages)
+    new_vote_ids = [vote_id for vote_id in vote_ids if int(vote_id) not in existing_ids]
+    print(f'{len(new_vote_ids)} neue Abstimmungen zu laden.')
+
+    count = 0
+    pending = []
+
+    def flush():
+        # Schreiben nur im Haupt-Thread: SQLite erlaubt einen Schreiber zur Zeit
+        if pending:
+            shards = append_votes(pending, dataset_dir)
+            import_dataset(engine, dataset_dir, workers=1, progress=None)
+            print(f'{len(pending)} Abstimmungen gespeichert ({len(shards)} Shards).')
+            pending.clear()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        remaining = iter(new_vote_ids)
+        futures = {}
+
+        def submit_next():
+            vote_id = next(remaining, None)
+            if vote_id is not None:
+                futures[executor.submit(fetch_vote, session, bucket, base_url, vote_id)] = vote_id
+
+        # Nur ein begrenztes Fenster offener Abrufe; erledigte Futures (samt JSON) werden sofort freigegeben
+        for _ in range(concurrency * IN_FLIGHT_PER_WORKER):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                vote_id = futures.pop(future)
+                submit_next()
+                try:
+                    data = future.result()
+                except requests.RequestException as e:
+                    print(f'Abstimmung {vote_id} fehlgeschlagen: {e}')
+                    continue
+                if data is None:
+                    print(f'Abstimmung {vote_id} nicht gefunden.')
+                    continue
+                count += 1
+                pending.append(data)
+                if len(pending) >= batch_size:
+                    flush()
+    flush()
+    # Auch Shards importieren, die bei einem abgebrochenen Lauf nur angehängt wurden
+    import_dataset(engine, dataset_dir, workers=1, progress=None)
+    session.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lädt neue Abstimmungen von howtheyvote.eu in votes.db.')
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help='Basis-URL (z.B. lokaler Stand-in-Server)')
+    parser.add_argument('--db', default=str(DB_PATH), help='Pfad zur SQLite-DB')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallele Anfragen')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='Max. Anfragen pro Sekunde (0 = unbegrenzt)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Votes pro Anhang an den Datensatz')
+    parser.add_argument('--max-pages', type=int, default=MAX_LISTING_PAGES, help='Max. Listenseiten')
+    parser.add_argument('--dataset-dir', default=str(DATASET_DIR), help='Verzeichnis des NDJSON-Datensatzes')
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    # Tabellen erstellen bzw. ein altes Schema migrieren (wie die Startphase "schema" von server.py)
+    try:
+        ensure_schema(engine)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    started = time.time()
+    count = harvest(
+        engine,
+        base_url=args.base_url.rstrip('/'),
+        concurrency=args.concurrency,
+        rate=args.rate,
+        batch_size=args.batch_size,
+        max_pages=args.max_pages,
+        dataset_dir=Path(args.dataset_dir),
+    )
+    engine.dispose()
+    print(f'{count} Abstimmungen in {time.time() - started:.1f}s verarbeitet.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+# mep_registry.py
+"""Verzeichnis der aktuellen MEPs aus der XML-Liste des Europäischen Parlaments.
+
+Beim Start wird nur der vorgeparste JSON-Cache (meps_cache.json) gelesen; das
+blockiert nie auf das Netz. Ein Hintergrund-Thread holt die XML-Liste im
+eingestellten Intervall per bedingtem GET (ETag / If-Modified-Since), parst
+sie in einem Durchgang und tauscht den Datenstand atomar aus. Ist die Quelle
+nicht erreichbar, bleibt der alte Stand aktiv.
+
+Für Tests lässt sich die Quelle per ``MEPS_XML_URL`` auf einen lokalen
+Stand-in-Server umstellen.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).parent
+
+MEPS_XML_URL = os.environ.get("MEPS_XML_URL", "https://www.europarl.europa.eu/meps/en/full-list/xml")
+# Aktualisierungsintervall in Sekunden (0 = keine Aktualisierung im Hintergrund)
+MEPS_REFRESH_INTERVAL = float(os.environ.get("MEPS_REFRESH_INTERVAL", "86400"))
+MEPS_CACHE_PATH = BASE_DIR / "meps_cache.json"
+# Alter XML-Cache früherer Versionen; wird einmalig übernommen
+LEGACY_XML_CACHE_PATH = BASE_DIR / "meps_cache.xml"
+REQUEST_TIMEOUT = 30
+
+# XML-Element → Schlüssel im MEP-Dict
+MEP_FIELDS = {
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "fullName": "full_name",
+    "country": "country",
+    "politicalGroup": "political_group",
+    "birthDate": "birth_date",
+    "url": "url",
+}
+
+
+def parse_meps_xml(data):
+    """Parst die XML-Liste in einem Durchgang zu einer Liste von MEP-Dicts."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    meps = []
+    for _, elem in ET.iterparse(io.BytesIO(data), events=("end",)):
+        if elem.tag != "mep":
+            continue
+        mep_id = elem.findtext("id")
+        if mep_id:
+            mep = {"id": int(mep_id)}
+            for tag, key in MEP_FIELDS.items():
+                mep[key] = elem.findtext(tag, "")
+            meps.append(mep)
+        elem.clear()
+    return meps
+
+
+class MepData:
+    """Unveränderlicher Datenstand: IDs, sortierte Dropdown-Liste und Details je MEP.
+
+    ``version`` ist eine Prüfsumme über die MEP-Liste; sie ändert sich nur mit
+    dem Inhalt, nicht mit dem Zeitpunkt des Abrufs. ``generation`` zählt die
+    Inhaltswechsel im Prozess hoch und ist damit (anders als die Prüfsumme)
+    geordnet; der Antwort-Cache verwirft seine Einträge, wenn sie steigt.
+    """
+
+    def __init__(self, meps, etag=None, last_modified=None, fetched_at=0.0, generation=0):
+        self.meps = meps
+        self.version = hashlib.sha256(json.dumps(meps, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.generation = generation
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.ids = frozenset(m["id"] for m in meps)
+        self.meps_list = sorted(({"id": m["id"], "name": m["full_name"]} for m in meps), key=lambda x: x["name"])
+        self.info = {m["id"]: {k: v for k, v in m.items() if k != "id"} for m in meps}
+
+    def to_json(self):
+        return {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "meps": self.meps,
+        }
+
+
+class MepRegistry:
+    """Hält den aktuellen MEP-Datenstand und aktualisiert ihn im Hintergrund."""
+
+    def __init__(self, url=MEPS_XML_URL, cache_path=MEPS_CACHE_PATH, interval=MEPS_REFRESH_INTERVAL,
+                 legacy_xml_path=LEGACY_XML_CACHE_PATH, load=True):
+        self.url = url
+        self.cache_path = Path(cache_path)
+        self.legacy_xml_path = Path(legacy_xml_path) if legacy_xml_path else None
+        self.interval = interval
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Mit load=False bleibt die Liste leer, bis ``load()`` aufgerufen wird (z.B. als Startphase)
+        self.current = self.load_cache() if load else MepData([])
+
+    def load(self):
+        """Übernimmt den Stand aus dem Cache."""
+        with self._lock:
+            self._swap(self.load_cache())
+
+    def _swap(self, data):
+        """Setzt ``data`` als aktuellen Stand; True, wenn sich der Inhalt geändert hat (neue Generation)."""
+        current = self.current
+        changed = data.version != current.version
+        data.generation = current.generation + 1 if changed else current.generation
+        # Atomarer Austausch wie beim Vote-Snapshot
+        self.current = data
+        return changed
+
+    def load_cache(self):
+        """Liest den vorgeparsten Cache; ohne Cache ggf. einmalig die alte meps_cache.xml."""
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            return MepData(cached["meps"], cached.get("etag"), cached.get("last_modified"),
+                           cached.get("fetched_at", 0.0))
+        except (OSError, ValueError, KeyError):
+            pass
+        if self.legacy_xml_path is not None and self.legacy_xml_path.exists():
+            try:
+                data = MepData(parse_meps_xml(self.legacy_xml_path.read_bytes()),
+                               fetched_at=self.legacy_xml_path.stat().st_mtime)
+            except (OSError, ET.ParseError) as e:
+                print(f"{self.legacy_xml_path} nicht lesbar: {e}")
+            else:
+                self._write_cache(data)
+                return data
+        return MepData([])
+
+    def _write_cache(self, data):
+        tmp = self.cache_path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data.to_json(), f, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"MEP-Cache konnte nicht geschrieben werden: {e}")
+
+    def refresh(self):
+        """Bedingter Abruf der XML-Liste; True, wenn sich der Datenstand geändert hat.
+
+        Netz- und Parserfehler werden geloggt, der alte Stand bleibt aktiv.
+        """
+        with self._lock:
+            current = self.current
+            headers = {}
+            if current.etag:
+                headers["If-None-Match"] = current.etag
+            if current.last_modified:
+                headers["If-Modified-Since"] = current.last_modified
+            try:
+                response = self.session.get(self.url, headers=headers, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 304:
+                    data = MepData(current.meps, current.etag, current.last_modified, time.time())
+                    self._swap(data)
+                    self._write_cache(data)
+                    return False
+                response.raise_for_status()
+                meps = parse_meps_xml(response.content)
+            except (requests.RequestException, ET.ParseError) as e:
+                print(f"MEP-Liste konnte nicht aktualisiert werden ({e}); verwende Stand vom "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(current.fetched_at))}.")
+                return False
+            data = MepData(meps, response.headers.get("ETag"), response.headers.get("Last-Modified"), time.time())
+            changed = self._swap(data)
+            self._write_cache(data)
+            if not changed:
+                return False
+            print(f"MEP-Liste aktualisiert: {len(meps)} MEPs")
+            return True
+
+    def _watch(self):
+        # Erster Abruf sofort, wenn der Cache fehlt oder älter als das Intervall ist
+        wait = max(0.0, self.current.fetched_at + self.interval - time.time())
+        while not self._stop.wait(wait):
+            self.refresh()
+            wait = self.interval
+
+    def start(self):
+        """Startet die Aktualisierung im Hintergrund."""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="mep-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,313 @@
+# metrics.py
+"""Messung je Request: Phasen-Zeiten, Server-Timing-Header, Prometheus-Metriken und Profile langsamer Requests.
+
+``TimingMiddleware`` (äußerste Middleware) legt je HTTP-Request ein Dict für
+Phasen-Zeiten in einer ContextVar ab. Code im Request misst Abschnitte mit
+``span("name")``; das funktioniert auch in synchronen Routen, weil der
+Threadpool den Kontext übernimmt. Die Phasen und die Gesamtzeit gehen als
+``Server-Timing``-Header an den Client und als Histogramme bzw. Summen in
+``Metrics``. Die Zeit in ``GZipMiddleware`` misst ``CompressionMarker``
+(direkt innerhalb von GZip): Er stempelt jede Nachricht der App, die äußere
+Middleware zieht den Stempel beim Eintreffen ab.
+
+Die Metriken gelten je Worker-Prozess; Prometheus fragt bei mehreren Workern
+jeweils den antwortenden Worker ab (Label ``pid``).
+
+Profile: Mit ``PROFILE_SLOW_MS`` > 0 nimmt ``SlowRequestProfiler`` während
+eines Anteils (``PROFILE_SAMPLE_RATE``) der Requests Stack-Samples aller
+Threads (alle ``PROFILE_INTERVAL_MS``) und schreibt sie für Requests über der
+Schwelle im "folded"-Format (flamegraph.pl, speedscope) nach ``PROFILE_DIR``.
+Bei parallelen Requests enthält ein Profil auch deren Stacks.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+
+BASE_DIR = Path(__file__).parent
+
+# Histogramm-Grenzen für Request-Latenzen (Sekunden)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Schwelle für Profile in Millisekunden (0 = aus)
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "1"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", BASE_DIR / "profiles"))
+# Dateien, in denen wartende Threads stehen (Threadpool, Event-Loop); solche Samples werden verworfen
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+# Phasen-Zeiten des laufenden Requests: Name → Sekunden
+_timings = ContextVar("request_timings", default=None)
+# Interner Schlüssel für den Zeitstempel des CompressionMarker
+_SENT_AT = "_sent_at"
+
+
+@contextmanager
+def span(name):
+    """Misst einen Abschnitt des laufenden Requests (mehrfache Aufrufe werden summiert)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def server_timing(timings, total):
+    """Wert des Server-Timing-Headers (Millisekunden)."""
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items() if not name.startswith("_")]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def process_rss_bytes():
+    """Aktueller RSS des Prozesses (Linux: /proc, sonst Spitzenwert aus getrusage)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics:
+    """Request-Zähler, Latenz-Histogramme und Phasen-Summen je Route; Ausgabe im Prometheus-Textformat."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # (Methode, Route, Status) → Anzahl
+        self._requests = Counter()
+        # (Methode, Route) → [Anzahl je Bucket ..., +Inf], Summe
+        self._latency = {}
+        self._latency_sum = Counter()
+        # (Route, Phase) → Summe, Anzahl
+        self._phase_sum = Counter()
+        self._phase_count = Counter()
+        # Name → (Hilfe, Typ, Funktion → Wert oder [(Labels, Wert)])
+        self._collectors = {}
+
+    def register(self, name, help_text, collect, kind="gauge"):
+        """Metrik, deren Wert beim Abruf von /metrics über ``collect()`` bestimmt wird."""
+        self._collectors[name] = (help_text, kind, collect)
+
+    def observe(self, method, route, status, seconds, timings):
+        with self._lock:
+            self._requests[(method, route, status)] += 1
+            counts = self._latency.get((method, route))
+            if counts is None:
+                counts = self._latency[(method, route)] = [0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._latency_sum[(method, route)] += seconds
+            for phase, phase_seconds in timings.items():
+                if not phase.startswith("_"):
+                    self._phase_sum[(route, phase)] += phase_seconds
+                    self._phase_count[(route, phase)] += 1
+
+    def render(self):
+        """Alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+        pid = os.getpid()
+        lines = []
+        with self._lock:
+            lines += ["# HELP http_requests_total HTTP-Requests je Route und Status",
+                      "# TYPE http_requests_total counter"]
+            for (method, route, status), count in sorted(self._requests.items()):
+                labels = format_labels({"method": method, "route": route, "status": status, "pid": pid})
+                lines.append(f"http_requests_total{labels} {count}")
+
+            lines += ["# HELP http_request_duration_seconds Dauer der Requests je Route",
+                      "# TYPE http_request_duration_seconds histogram"]
+            for (method, route), counts in sorted(self._latency.items()):
+                base = {"method": method, "route": route, "pid": pid}
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"http_request_duration_seconds_bucket{format_labels({**base, 'le': bound})} {count}")
+                lines.append(f"http_request_duration_seconds_bucket{format_labels({**base, 'le': '+Inf'})} {counts[-1]}")
+                lines.append(f"http_request_duration_seconds_sum{format_labels(base)} {self._latency_sum[(method, route)]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{format_labels(base)} {counts[-1]}")
+
+            lines += ["# HELP http_request_phase_seconds Zeit je Phase (filter, search, render, compress) und Route",
+                      "# TYPE http_request_phase_seconds summary"]
+            for (route, phase), total in sorted(self._phase_sum.items()):
+                labels = format_labels({"route": route, "phase": phase, "pid": pid})
+                lines.append(f"http_request_phase_seconds_sum{labels} {total:.6f}")
+                lines.append(f"http_request_phase_seconds_count{labels} {self._phase_count[(route, phase)]}")
+
+        collectors = dict(self._collectors)
+        collectors["process_resident_memory_bytes"] = ("Aktueller RSS des Prozesses", "gauge", process_rss_bytes)
+        collectors["process_start_time_seconds"] = ("Startzeit des Prozesses (Unix-Zeit)", "gauge",
+                                                    lambda: self.started_at)
+        for name, (help_text, kind, collect) in collectors.items():
+            try:
+                value = collect()
+            except Exception as e:
+                lines.append(f"# {name}: {e}")
+                continue
+            samples = value if isinstance(value, list) else [({}, value)]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, sample in samples:
+                if sample is not None:
+                    lines.append(f"{name}{format_labels({**labels, 'pid': pid})} {format_value(sample)}")
+        return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    """Stack-Sampling während ausgewählter Requests; Profile langsamer Requests landen auf der Platte."""
+
+    def __init__(self, slow_ms=PROFILE_SLOW_MS, sample_rate=PROFILE_SAMPLE_RATE,
+                 interval_ms=PROFILE_INTERVAL_MS, directory=PROFILE_DIR):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.directory = Path(directory)
+        self._active = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.slow_ms > 0
+
+    def begin(self):
+        """Startet das Sampling für einen Request; None, wenn er nicht ausgewählt wurde."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        samples = Counter()
+        with self._lock:
+            self._active.append(samples)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def end(self, samples, method, path, seconds):
+        if samples is None:
+            return
+        with self._lock:
+            self._active.remove(samples)
+        if seconds * 1000 < self.slow_ms or not samples:
+            return
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:80] or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(seconds * 1000)}ms-{method}-{slug}.folded"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / name, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Profil {name} nicht geschrieben: {e}")
+
+    def _sample(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+            for ident, frame in sys._current_frames().items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                folded = ";".join(reversed(stack))
+                for samples in active:
+                    samples[folded] += 1
+            time.sleep(self.interval)
+
+
+class CompressionMarker:
+    """ASGI-Middleware direkt innerhalb von GZipMiddleware: stempelt jede Antwort-Nachricht der App."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def marked_send(message):
+            timings = _timings.get()
+            if timings is not None and message["type"] == "http.response.body":
+                timings[_SENT_AT] = time.perf_counter()
+            await send(message)
+
+        await self.app(scope, receive, marked_send)
+
+
+class TimingMiddleware:
+    """Äußerste ASGI-Middleware: Phasen-Zeiten, Server-Timing-Header, Metriken und Profile je Request."""
+
+    def __init__(self, app, metrics, profiler=None):
+        self.app = app
+        self.metrics = metrics
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = {}
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        samples = self.profiler.begin() if self.profiler is not None else None
+
+        def take_compression():
+            sent_at = timings.pop(_SENT_AT, None)
+            if sent_at is not None:
+                timings["compress"] = timings.get("compress", 0.0) + time.perf_counter() - sent_at
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                take_compression()
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, time.perf_counter() - started))
+            elif message["type"] == "http.response.body":
+                take_compression()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            seconds = time.perf_counter() - started
+            _timings.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "other"
+            self.metrics.observe(scope["method"], route, status, seconds, timings)
+            if samples is not None:
+                self.profiler.end(samples, scope["method"], scope["path"], seconds)
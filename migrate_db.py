@@ -0,0 +1,201 @@
+# migrate_db.py
+"""Migration vom alten auf das normalisierte Schema.
+
+Altes Schema: jede member_votes-Zeile enthält das komplette Mitgliederprofil,
+und raw_json enthält zusätzlich alle member_votes. Neues Schema: Dimensionstabelle
+``members`` plus schlanke Faktentabelle ``member_votes(vote_id, member_id, position_code)``;
+raw_json ohne member_votes.
+
+Der Server (Startphase "schema"), main.py und ``vote_dataset.py import`` rufen
+``ensure_schema`` vor dem ersten Schreiben auf. Aufruf (offline, optional mit
+Speicherbericht für den In-Memory-Stand):
+
+    python migrate_db.py [--memory]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from importer import member_row, upsert_members
+from models import Base, POSITION_CODES
+
+BASE_DIR = Path(__file__).resolve().parent
+DB_PATH = BASE_DIR / "votes.db"
+
+# Votes pro Transaktion beim Bereinigen von raw_json
+BATCH_SIZE = 200
+
+POSITION_CASE_SQL = "CASE position " + " ".join(
+    f"WHEN '{name}' THEN {code}" for name, code in POSITION_CODES.items()
+) + " ELSE 0 END"
+
+MEMBER_COLUMNS = [
+    "first_name", "last_name", "date_of_birth", "country_code", "country_iso_alpha_2",
+    "country_label", "group_code", "group_label", "group_short_label", "photo_url",
+    "thumb_url", "email", "facebook", "twitter",
+]
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()]
+
+
+def needs_migration(engine):
+    """True, wenn member_votes noch im alten Format (mit Profilspalten) vorliegt."""
+    with engine.connect() as conn:
+        return "first_name" in table_columns(conn, "member_votes")
+
+
+def ensure_schema(engine, progress=print):
+    """Legt fehlende Tabellen an und migriert ein altes member_votes-Schema (Server, Harvester, Import)."""
+    with engine.connect() as conn:
+        columns = table_columns(conn, "votes")
+    if columns and "raw_json" not in columns:
+        raise RuntimeError(f"{engine.url.database}: votes ohne raw_json (sehr altes Schema) lässt sich nicht "
+                           f"migrieren; server.py legt die Tabellen beim Start neu an.")
+    if needs_migration(engine):
+        migrate_legacy_schema(engine, progress=progress)
+    Base.metadata.create_all(bind=engine)
+
+
+def migrate_legacy_schema(engine, progress=print):
+    """Überführt eine DB im alten Schema in members + schlanke member_votes."""
+    started = time.time()
+    with engine.begin() as conn:
+        if "first_name" in table_columns(conn, "member_votes"):
+            conn.execute(text("ALTER TABLE member_votes RENAME TO member_votes_legacy"))
+            # Alte Indexnamen freigeben, damit create_all die neuen anlegen kann
+            for (index_name,) in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='member_votes_legacy' "
+                "AND name NOT LIKE 'sqlite_autoindex%'"
+            )).fetchall():
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            Base.metadata.create_all(bind=conn)
+
+            # Profil aus der jeweils letzten Zeile eines Mitglieds übernehmen
+            cols = ", ".join(MEMBER_COLUMNS)
+            conn.execute(text(
+                f"INSERT OR REPLACE INTO members (id, {cols}) "
+                f"SELECT member_id, {cols} FROM member_votes_legacy "
+                f"WHERE id IN (SELECT MAX(id) FROM member_votes_legacy "
+                f"WHERE member_id IS NOT NULL GROUP BY member_id)"
+            ))
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO member_votes (vote_id, member_id, position_code) "
+                f"SELECT vote_id, member_id, {POSITION_CASE_SQL} FROM member_votes_legacy "
+                f"WHERE member_id IS NOT NULL"
+            ))
+            conn.execute(text("DROP TABLE member_votes_legacy"))
+        Base.metadata.create_all(bind=conn)
+    if progress:
+        progress(f"Migration: member_votes normalisiert ({time.time() - started:.1f}s)")
+
+    strip_member_votes_from_raw_json(engine, progress=progress)
+
+    # Freigewordenen Platz zurückgeben
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    if progress:
+        progress(f"Migration abgeschlossen ({time.time() - started:.1f}s)")
+
+
+def strip_member_votes_from_raw_json(engine, progress=print):
+    """Entfernt member_votes aus raw_json; fehlende Einträge werden vorher in die Tabellen übernommen."""
+    with engine.connect() as conn:
+        vote_ids = [row[0] for row in conn.execute(
+            text("SELECT id FROM votes WHERE raw_json LIKE '%\"member_votes\"%'")
+        )]
+    for start in range(0, len(vote_ids), BATCH_SIZE):
+        chunk = vote_ids[start:start + BATCH_SIZE]
+        with engine.begin() as conn:
+            placeholders = ", ".join(str(int(v)) for v in chunk)
+            rows = conn.execute(text(f"SELECT id, raw_json FROM votes WHERE id IN ({placeholders})")).fetchall()
+            members, facts, updates = {}, [], []
+            for vote_id, raw in rows:
+                item = json.loads(raw)
+                for mv in item.pop("member_votes", None) or []:
+                    m = mv.get("member", {})
+                    if m.get("id") is None:
+                        continue
+                    members[m["id"]] = member_row(m)
+                    facts.append({
+                        "vote_id": vote_id,
+                        "member_id": m["id"],
+                        "position_code": POSITION_CODES.get(mv.get("position"), 0),
+                    })
+                updates.append({"id": vote_id, "raw_json": json.dumps(item, ensure_ascii=False)})
+            if members:
+                upsert_members(conn, list(members.values()))
+            if facts:
+                conn.execute(text(
+                    "INSERT OR IGNORE INTO member_votes (vote_id, member_id, position_code) "
+                    "VALUES (:vote_id, :member_id, :position_code)"
+                ), facts)
+            conn.execute(text("UPDATE votes SET raw_json = :raw_json WHERE id = :id"), updates)
+        if progress:
+            progress(f"Migration: raw_json bereinigt ({min(start + BATCH_SIZE, len(vote_ids))}/{len(vote_ids)})")
+
+
+def db_report(engine):
+    """Dateigröße und Zeilenzahlen der wichtigsten Tabellen."""
+    report = {"db_bytes": Path(engine.url.database).stat().st_size}
+    with engine.connect() as conn:
+        tables = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type='table'"))}
+        for table in ("votes", "members", "member_votes"):
+            if table in tables:
+                report[f"{table}_rows"] = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    return report
+
+
+def measure_memory(load):
+    """Führt load() aus und gibt (Ergebnis, belegte Bytes laut tracemalloc) zurück."""
+    tracemalloc.start()
+    try:
+        result = load()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def load_legacy_votes(engine):
+    """In-Memory-Stand wie vor der Migration: raw_json inklusive aller member_votes."""
+    with engine.connect() as conn:
+        return [json.loads(raw) for (raw,) in conn.execute(text("SELECT raw_json FROM votes"))]
+
+
+def load_normalized_state(engine):
+    """In-Memory-Stand nach der Migration, wie ihn server.py beim Start aufbaut."""
+    from vote_store import VoteMatrix, load_members, load_vote_summaries, load_member_positions
+
+    members = load_members(engine)
+    votes = load_vote_summaries(engine)
+    return VoteMatrix(votes, members, load_member_positions(engine))
+
+
+if __name__ == "__main__":
+
+    with_memory = "--memory" in sys.argv
+    engine = create_engine(f"sqlite:///{DB_PATH}")
+
+    if not needs_migration(engine):
+        print("DB ist bereits im normalisierten Schema.")
+        sys.exit(0)
+
+    before = db_report(engine)
+    if with_memory:
+        _, before["ram_bytes"] = measure_memory(lambda: load_legacy_votes(engine))
+
+    migrate_legacy_schema(engine)
+
+    after = db_report(engine)
+    if with_memory:
+        _, after["ram_bytes"] = measure_memory(lambda: load_normalized_state(engine))
+
+    print(f"{'':20}{'vorher':>16}{'nachher':>16}")
+    for key in sorted(set(before) | set(after)):
+        print(f"{key:20}{before.get(key, '-'):>16}{after.get(key, '-'):>16}")
@@ -1,11 +1,15 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Float, Integer, SmallInteger, String, Text, ForeignKey, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import json
 
 Base = declarative_base()
 
+# Kodierung der Stimmen in member_votes.position_code
+POSITION_CODES = {"FOR": 1, "AGAINST": 2, "ABSTENTION": 3, "DID_NOT_VOTE": 4}
+POSITION_NAMES = {code: name for name, code in POSITION_CODES.items()}
+
 class Vote(Base):
     __tablename__ = "votes"
 
@@ -18,7 +22,8 @@ class Vote(Base):
     geo_areas = Column(Text)       # kommagetrennte Labels
     position = Column(String)
 
-    # Neu: JSON-Blob mit dem kompletten Roh-Datensatz
+    # JSON-Blob mit dem Roh-Datensatz; member_votes liegen normalisiert in
+    # den Tabellen members/member_votes und sind hier nicht enthalten
     raw_json = Column(Text, nullable=False)
 
     # Beziehungen zu Statistiken und Member-Votes
@@ -82,15 +87,11 @@ class ByCountry(Base):
     did_not_vote_count = Column(Integer, nullable=False)
 
 
-class MemberVote(Base):
-    __tablename__ = "member_votes"
-    id = Column(Integer, primary_key=True, index=True)
+class Member(Base):
+    """Dimensionstabelle: ein Eintrag pro Abgeordnetem (zuletzt importiertes Profil)."""
+    __tablename__ = "members"
+    id = Column(Integer, primary_key=True)  # Mitglieds-ID von howtheyvote.eu
 
-    vote_id = Column(Integer, ForeignKey("votes.id", ondelete="CASCADE"))
-    vote = relationship("Vote", back_populates="member_votes")
-
-    # Informationen zum Mitglied (eine flache Kopie der JSON-Struktur)
-    member_id = Column(Integer, nullable=False)
     first_name = Column(String)
     last_name = Column(String)
     date_of_birth = Column(String)
@@ -106,4 +107,113 @@ class MemberVote(Base):
     facebook = Column(String)
     twitter = Column(String)
 
-    position = Column(String)  # z. B. "FOR", "AGAINST", etc.
\ No newline at end of file
+    member_votes = relationship("MemberVote", back_populates="member")
+
+
+class MemberVote(Base):
+    """Faktentabelle: eine schlanke Zeile pro (Vote, Mitglied) mit kodierter Position."""
+    __tablename__ = "member_votes"
+    __table_args__ = (
+        # Zugriff "alle Votes eines Mitglieds"; (vote_id, member_id) deckt der Primärschlüssel ab
+        Index("ix_member_votes_member_vote", "member_id", "vote_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    vote_id = Column(Integer, ForeignKey("votes.id", ondelete="CASCADE"), primary_key=True)
+    member_id = Column(Integer, ForeignKey("members.id"), primary_key=True)
+    position_code = Column(SmallInteger, nullable=False)  # siehe POSITION_CODES
+
+    vote = relationship("Vote", back_populates="member_votes")
+    member = relationship("Member", back_populates="member_votes")
+
+
+class Rollup(Base):
+    """Vorberechnete Summen je Zeitraum (Tag/Monat) und Fraktion bzw. Land; beim Import fortgeschrieben."""
+    __tablename__ = "rollups"
+
+    period = Column(String, primary_key=True)        # "day" oder "month"
+    period_start = Column(String, primary_key=True)  # JJJJ-MM-TT bzw. JJJJ-MM
+    dimension = Column(String, primary_key=True)     # "group" oder "country"
+    code = Column(String, primary_key=True)          # Fraktions- bzw. Ländercode
+    label = Column(String)
+
+    votes = Column(Integer, nullable=False)               # Votes mit Eintrag für Fraktion/Land
+    for_count = Column(Integer, nullable=False)
+    against_count = Column(Integer, nullable=False)
+    abstention_count = Column(Integer, nullable=False)
+    did_not_vote_count = Column(Integer, nullable=False)
+    decided_votes = Column(Integer, nullable=False)       # Votes mit ADOPTED/REJECTED und klarer Mehrheit FOR/AGAINST
+    with_result_votes = Column(Integer, nullable=False)   # davon: Mehrheit entsprach dem Ergebnis
+
+
+class IngestEvent(Base):
+    """Ereignis "neue Votes gespeichert"; dient den Server-Workern als einfacher Pub/Sub-Kanal."""
+    __tablename__ = "ingest_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(Float, nullable=False)  # Unix-Zeit
+    vote_ids = Column(Text, nullable=False)     # JSON-Liste der neuen Vote-IDs
+
+
+class DatasetShard(Base):
+    """Bereits importierter Shard des NDJSON-Datensatzes (siehe vote_dataset.py)."""
+    __tablename__ = "dataset_shards"
+
+    file = Column(String, primary_key=True)       # Dateiname im Datensatz-Verzeichnis
+    sha256 = Column(String, nullable=False)
+    votes = Column(Integer, nullable=False)
+    vote_ids = Column(Text, nullable=False)       # JSON-Liste der Vote-IDs
+    imported_at = Column(Float, nullable=False)   # Unix-Zeit
+
+
+class ImportRun(Base):
+    """Abgeschlossener Import einer Quelldatei; wird erst nach dem letzten Batch geschrieben."""
+    __tablename__ = "import_runs"
+
+    source = Column(String, primary_key=True)       # Dateiname, z.B. "vote_data.json"
+    votes = Column(Integer, nullable=False)         # in diesem Lauf importierte Votes
+    completed_at = Column(Float, nullable=False)    # Unix-Zeit
+
+
+class DataGeneration(Base):
+    """Änderungszähler der DB (genau eine Zeile); Trigger zählen ihn in derselben Transaktion hoch."""
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)
+    epoch = Column(String, nullable=False)        # Zufallskennung; neu, wenn die Tabelle neu angelegt wird
+    generation = Column(Integer, nullable=False)  # jede Zeilenänderung in GENERATION_TABLES
+    rewrites = Column(Integer, nullable=False)    # davon UPDATE/DELETE an bestehenden Votes
+
+
+# Tabellen, deren Inhalt der Snapshot (snapshot.py) abbildet, und ob UPDATE/DELETE als Umschreiben zählt.
+# Mitglieder werden bei jedem Snapshot vollständig neu geladen und zählen daher nur als Änderung.
+GENERATION_TABLES = {
+    "votes": True,
+    "stats": True,
+    "stats_by_group": True,
+    "stats_by_country": True,
+    "member_votes": True,
+    "members": False,
+}
+# INSERT-Trigger nur hier: die übrigen Zeilen kommen mit ihrem Vote (ein Trigger je Stimme kostet beim
+# Import spürbar); neue Stimmen zu alten Votes erkennt snapshot.db_state an der Zeilenzahl
+GENERATION_INSERT_TABLES = ("votes", "members")
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_generation_triggers(target, connection, **kw):
+    """Legt Zählerzeile und Trigger an (idempotent, läuft bei jedem create_all)."""
+    connection.exec_driver_sql(
+        "INSERT OR IGNORE INTO data_generation (id, epoch, generation, rewrites) "
+        "VALUES (1, lower(hex(randomblob(8))), 0, 0)"
+    )
+    for table, rewrite in GENERATION_TABLES.items():
+        operations = ("INSERT", "UPDATE", "DELETE") if table in GENERATION_INSERT_TABLES else ("UPDATE", "DELETE")
+        for operation in operations:
+            counters = "generation = generation + 1"
+            if rewrite and operation != "INSERT":
+                counters += ", rewrites = rewrites + 1"
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_generation AFTER {operation} ON {table} "
+                f"BEGIN UPDATE data_generation SET {counters} WHERE id = 1; END"
+            )
@@ -0,0 +1,131 @@
+# response_cache.py
+"""Cache für fertig gerenderte Antworten (HTML-Listen, JSON, Detailseiten).
+
+Die Daten ändern sich nur beim Neuladen des Snapshots, deshalb wird jede
+Antwort einmal gerendert, gzip-komprimiert und unter (Route, normalisierte
+Parameter) abgelegt. Ein neuer Datenstand leert den Cache vollständig. Der
+ETag ist ein Hash über den unkomprimierten Body und damit über alle Worker
+hinweg gleich; passende ``If-None-Match``-Anfragen bekommen ein 304.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from metrics import span
+
+# Obergrenze für die komprimierten Bodies im Cache (Bytes)
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+# max-age für Browser und Proxies; danach wird per ETag revalidiert
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", "30"))
+GZIP_LEVEL = 6
+
+
+class CachedBody:
+    """Komprimierter Body einer Antwort samt ETag und Content-Type."""
+    __slots__ = ("body", "etag", "content_type")
+
+    def __init__(self, body, etag, content_type):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+
+
+def etag_matches(if_none_match, etag):
+    """Prüft einen If-None-Match-Header (Liste, schwache ETags, ``*``) gegen einen ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """LRU-Cache für komprimierte Antworten, begrenzt durch die Summe der Bytes.
+
+    ``version`` muss mit jedem neuen Datenstand steigen (Zahl oder Tupel aus Zahlen):
+    nur eine größere Version leert den Cache, Requests mit älterer Version füllen ihn nicht.
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES, max_age=RESPONSE_CACHE_MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.version = None
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, version, key):
+        with self._lock:
+            if self.version is None or version > self.version:
+                # Neuer Datenstand: alle Einträge verwerfen
+                self._cache.clear()
+                self._bytes = 0
+                self.version = version
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return cached
+
+    def stats(self):
+        """(Einträge, Bytes) des Caches."""
+        with self._lock:
+            return len(self._cache), self._bytes
+
+    def _store(self, version, key, entry):
+        size = len(entry.body)
+        with self._lock:
+            # Requests auf einem älteren Snapshot dürfen den Cache nicht füllen
+            if version != self.version or key in self._cache or size > self.max_bytes:
+                return
+            self._cache[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._bytes -= len(old.body)
+
+    def respond(self, request, version, key, render):
+        """Antwort aus dem Cache bzw. über ``render()`` (→ Response); nur 200er werden gecacht."""
+        entry = self._lookup(version, key)
+        if entry is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+            body = response.body
+            with span("compress"):
+                compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            entry = CachedBody(
+                compressed,
+                '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+                response.headers.get("content-type"),
+            )
+            self._store(version, key, entry)
+        return self.build_response(request, entry)
+
+    def build_response(self, request, entry):
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        headers["Content-Type"] = entry.content_type
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.body, headers=headers)
+        with span("decompress"):
+            body = gzip.decompress(entry.body)
+        return Response(body, headers=headers)
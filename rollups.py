@@ -0,0 +1,149 @@
+# rollups.py
+"""Zeitreihen je Fraktion und Land: vorberechnete Tages- und Monatssummen in der Tabelle rollups.
+
+Beim Import (``importer.write_batch``) werden die Summen eines Batches per
+``INSERT ... ON CONFLICT DO UPDATE`` auf die bestehenden Zeilen addiert; es
+wird also nie über alle Votes neu aggregiert. ``rebuild_rollups`` baut die
+Tabelle einmalig aus stats_by_group/stats_by_country auf (z.B. für eine
+bestehende DB).
+
+"Mit dem Ergebnis" heißt: Das Ergebnis war ADOPTED und die Fraktion (bzw.
+das Land) stimmte mehrheitlich FOR, oder REJECTED und mehrheitlich AGAINST.
+Votes ohne eindeutiges Ergebnis oder mit Gleichstand FOR/AGAINST zählen
+nicht als entschieden.
+"""
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Rollup
+
+# Zeitraum → Länge des Präfixes von timestamp (JJJJ-MM-TT bzw. JJJJ-MM)
+PERIODS = {"day": 10, "month": 7}
+DIMENSIONS = ("group", "country")
+COUNT_COLUMNS = ("votes", "for_count", "against_count", "abstention_count", "did_not_vote_count",
+                 "decided_votes", "with_result_votes")
+
+
+def sided_with_result(result, for_count, against_count):
+    """(entschieden, mit dem Ergebnis) als 0/1 für eine Fraktion bzw. ein Land in einem Vote."""
+    if result not in ("ADOPTED", "REJECTED") or for_count == against_count:
+        return 0, 0
+    majority = "ADOPTED" if for_count > against_count else "REJECTED"
+    return 1, int(majority == result)
+
+
+def rollup_rows(rows):
+    """Rollup-Zeilen aus den Zeilen eines Batches (siehe importer.vote_rows), bereits summiert."""
+    votes = {row["id"]: row for row in rows["votes"]}
+    sources = [
+        ("group", rows["stats_by_group"], "group_code", "group_label"),
+        ("country", rows["stats_by_country"], "country_code", "country_label"),
+    ]
+    totals = {}
+    for dimension, entries, code_key, label_key in sources:
+        for entry in entries:
+            vote = votes.get(entry["stats_id"])
+            if vote is None or not vote["timestamp"]:
+                continue
+            decided, with_result = sided_with_result(vote["position"], entry["for_count"], entry["against_count"])
+            counts = (1, entry["for_count"], entry["against_count"], entry["abstention_count"],
+                      entry["did_not_vote_count"], decided, with_result)
+            for period, length in PERIODS.items():
+                key = (period, vote["timestamp"][:length], dimension, entry[code_key] or "")
+                row = totals.get(key)
+                if row is None:
+                    row = totals[key] = dict(zip(("period", "period_start", "dimension", "code"), key),
+                                             label=entry[label_key] or "", **dict.fromkeys(COUNT_COLUMNS, 0))
+                for column, value in zip(COUNT_COLUMNS, counts):
+                    row[column] += value
+    return list(totals.values())
+
+
+def add_rollups(conn, rows):
+    """Addiert Rollup-Zeilen auf die bestehenden Summen."""
+    if not rows:
+        return
+    table = Rollup.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.period, table.c.period_start, table.c.dimension, table.c.code],
+        set_={"label": stmt.excluded.label,
+              **{c: table.c[c] + stmt.excluded[c] for c in COUNT_COLUMNS}},
+    )
+    conn.execute(stmt, rows)
+
+
+REBUILD_SQL = """
+    INSERT INTO rollups (period, period_start, dimension, code, label, votes, for_count, against_count,
+                         abstention_count, did_not_vote_count, decided_votes, with_result_votes)
+    SELECT :period, substr(v.timestamp, 1, :length), :dimension, ifnull(b.{code}, ''), max(ifnull(b.{label}, '')),
+           count(*), sum(b.for_count), sum(b.against_count), sum(b.abstention_count), sum(b.did_not_vote_count),
+           sum(v.position IN ('ADOPTED', 'REJECTED') AND b.for_count != b.against_count),
+           sum((v.position = 'ADOPTED' AND b.for_count > b.against_count)
+               OR (v.position = 'REJECTED' AND b.against_count > b.for_count))
+    FROM {table} b JOIN stats s ON s.id = b.stats_id JOIN votes v ON v.id = s.vote_id
+    WHERE v.timestamp IS NOT NULL AND v.timestamp != ''
+    GROUP BY 2, 4
+"""
+
+
+def rebuild_rollups(engine):
+    """Baut die Tabelle rollups vollständig aus stats_by_group/stats_by_country neu auf."""
+    sources = {
+        "group": ("stats_by_group", "group_code", "group_label"),
+        "country": ("stats_by_country", "country_code", "country_label"),
+    }
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM rollups"))
+        for dimension, (table, code, label) in sources.items():
+            sql = text(REBUILD_SQL.format(table=table, code=code, label=label))
+            for period, length in PERIODS.items():
+                conn.execute(sql, {"period": period, "length": length, "dimension": dimension})
+
+
+def rollups_missing(engine):
+    """True, wenn Votes vorhanden sind, die Tabelle rollups aber leer ist."""
+    with engine.connect() as conn:
+        has_votes = conn.execute(text("SELECT 1 FROM votes LIMIT 1")).first() is not None
+        has_rollups = conn.execute(text("SELECT 1 FROM rollups LIMIT 1")).first() is not None
+    return has_votes and not has_rollups
+
+
+def query_rollups(engine, dimension, period, start=None, end=None, codes=None):
+    """Rollups im Zeitraum [start, end] (Präfixe wie period_start), sortiert nach Code und Zeitraum.
+
+    Verglichen wird auf der kürzeren Länge: ``end="2024-05"`` schließt alle Tage
+    im Mai ein, ``start="2024-05-15"`` bei Monaten den Mai.
+    """
+    sql = "SELECT * FROM rollups WHERE dimension = :dimension AND period = :period"
+    params = {"dimension": dimension, "period": period}
+    if start:
+        sql += " AND period_start >= substr(:start, 1, length(period_start))"
+        params["start"] = start
+    if end:
+        sql += " AND substr(period_start, 1, length(:end)) <= :end"
+        params["end"] = end
+    if codes:
+        names = [f"code_{i}" for i in range(len(codes))]
+        sql += f" AND code IN ({', '.join(':' + n for n in names)})"
+        params.update(zip(names, codes))
+    sql += " ORDER BY code, period_start"
+    result = []
+    with engine.connect() as conn:
+        for row in conn.execute(text(sql), params).mappings():
+            cast = row["for_count"] + row["against_count"] + row["abstention_count"]
+            eligible = cast + row["did_not_vote_count"]
+            result.append({
+                "period_start": row["period_start"],
+                "code": row["code"],
+                "label": row["label"],
+                "votes": row["votes"],
+                "FOR": row["for_count"],
+                "AGAINST": row["against_count"],
+                "ABSTENTION": row["abstention_count"],
+                "DID_NOT_VOTE": row["did_not_vote_count"],
+                "participation_rate": round(cast / eligible, 4) if eligible else None,
+                "with_result_share": (round(row["with_result_votes"] / row["decided_votes"], 4)
+                                      if row["decided_votes"] else None),
+            })
+    return result
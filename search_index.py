@@ -0,0 +1,142 @@
+# search_index.py
+"""Invertierter Volltextindex über Titel, Beschreibung, Referenz und Geo-Gebiete der Votes.
+
+Der Index wird beim Laden der Daten einmalig aufgebaut. Suchanfragen werden
+tokenisiert; jedes Token muss (als Wort oder Wortanfang) in einem Vote vorkommen.
+Die Treffer werden nach einem TF-IDF-artigen Score mit Feldgewichtung sortiert.
+"""
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+# Gewichtung der Felder beim Ranking
+FIELD_WEIGHTS = {
+    "display_title": 3.0,
+    "reference": 2.0,
+    "geo_areas": 2.0,
+    "description": 1.0,
+}
+# Treffer über einen Wortanfang zählen weniger als ein exakter Worttreffer
+PREFIX_FACTOR = 0.5
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Zerlegt Text in kleingeschriebene Tokens ohne Akzente."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return TOKEN_RE.findall(text)
+
+
+def vote_field_texts(vote):
+    """Liefert (Feldname, Text)-Paare eines Votes für die Indexierung."""
+    geo = " ".join(ga.get("label", "") for ga in vote.get("geo_areas", []) or [])
+    return [
+        ("display_title", vote.get("display_title") or ""),
+        ("reference", vote.get("reference") or ""),
+        ("geo_areas", geo),
+        ("description", vote.get("description") or ""),
+    ]
+
+
+class PostingsTable:
+    """Postings im CSR-Format (z.B. aus dem Binär-Snapshot); liefert je Term ein Dict wie der gebaute Index."""
+
+    def __init__(self, vocabulary, indptr, doc_ids, weights):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __getitem__(self, term):
+        pos = bisect_left(self.vocabulary, term)
+        if pos == len(self.vocabulary) or self.vocabulary[pos] != term:
+            raise KeyError(term)
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        return dict(zip(self.doc_ids[start:end].tolist(), self.weights[start:end].tolist()))
+
+
+class SearchIndex:
+    """Invertierter Index: Token → {vote_idx: gewichtete Häufigkeit}."""
+
+    def __init__(self, votes):
+        self.votes = votes
+        self.postings = {}
+        for idx, vote in enumerate(votes):
+            for field, text_value in vote_field_texts(vote):
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text_value):
+                    entry = self.postings.setdefault(token, {})
+                    entry[idx] = entry.get(idx, 0.0) + weight
+        # Sortiertes Vokabular für die Präfixsuche per Binärsuche
+        self.vocabulary = sorted(self.postings)
+
+    @classmethod
+    def from_arrays(cls, votes, vocabulary, indptr, doc_ids, weights):
+        """Index aus den Arrays von ``to_arrays`` (ohne erneutes Tokenisieren)."""
+        index = cls.__new__(cls)
+        index.votes = votes
+        index.vocabulary = vocabulary
+        index.postings = PostingsTable(vocabulary, indptr, doc_ids, weights)
+        return index
+
+    def to_arrays(self):
+        """Postings als CSR-Arrays: indptr (je Term), doc_ids und weights; Terme in Vokabular-Reihenfolge."""
+        lengths = [len(self.postings[term]) for term in self.vocabulary]
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        doc_ids = np.empty(indptr[-1], dtype=np.int32)
+        # Gewichte sind Summen ganzzahliger Feldgewichte und damit in float32 exakt
+        weights = np.empty(indptr[-1], dtype=np.float32)
+        for pos, term in enumerate(self.vocabulary):
+            entry = self.postings[term]
+            doc_ids[indptr[pos]:indptr[pos + 1]] = list(entry.keys())
+            weights[indptr[pos]:indptr[pos + 1]] = list(entry.values())
+        return indptr, doc_ids, weights
+
+    def _prefix_terms(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(prefix):
+            end += 1
+        return self.vocabulary[start:end]
+
+    def _token_scores(self, token):
+        """Score-Beiträge eines Query-Tokens je Vote (exakt und per Präfix)."""
+        n_votes = len(self.votes) or 1
+        scores = {}
+        for term in self._prefix_terms(token):
+            postings = self.postings[term]
+            idf = math.log(1 + n_votes / len(postings))
+            factor = idf if term == token else idf * PREFIX_FACTOR
+            for idx, tf in postings.items():
+                score = tf * factor
+                if score > scores.get(idx, 0.0):
+                    scores[idx] = score
+        return scores
+
+    def search(self, query):
+        """Gibt die Indizes aller passenden Votes zurück, bester Treffer zuerst."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        total = None
+        # Seltene Tokens zuerst, damit die Schnittmenge schnell klein wird
+        for token_scores in sorted((self._token_scores(t) for t in set(tokens)), key=len):
+            if total is None:
+                total = dict(token_scores)
+            else:
+                total = {idx: score + token_scores[idx] for idx, score in total.items() if idx in token_scores}
+            if not total:
+                return []
+        # Bei gleichem Score neuere Votes (höherer Index) zuerst
+        return sorted(total, key=lambda idx: (-total[idx], -idx))
@@ -1,17 +1,28 @@
 from fastapi import FastAPI, Request, BackgroundTasks, Query
-from fastapi.responses import HTMLResponse, ORJSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, PlainTextResponse
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-from models import Base, Vote, Stats, ByGroup, ByCountry, MemberVote
+from models import Base, Vote
+import numpy as np
+from vote_store import VoteView, POSITION_NAMES
+from snapshot import SnapshotManager
+from mep_registry import MepRegistry
+from response_cache import ResponseCache
+from analytics import Analytics
+from live_updates import SOCKETIO_CLIENT_URL, LiveUpdates
+from metrics import CompressionMarker, Metrics, SlowRequestProfiler, TimingMiddleware, span
+from rollups import query_rollups, rebuild_rollups, rollups_missing
+from startup import ReadinessGate, Startup
+import hmac
 import json
 import os
 import urllib.parse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET
 import requests
 import time
+from contextlib import asynccontextmanager
 from fastapi_socketio import SocketManager
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -37,7 +48,9 @@ LANG_TEXTS = {
         'shown_of': 'Zeige {shown} von {total}',
         'age': 'Alter',
         'of': 'von',
-        'my_position': 'Meine Stimme'
+        'my_position': 'Meine Stimme',
+        'new_votes': 'Neue Abstimmungen',
+        'reload': 'Neu laden'
     },
     'en': {
         'for_label': 'For',
@@ -56,14 +69,36 @@ LANG_TEXTS = {
         'page': 'Page',
         'shown_of': 'Showing {shown} of {total}',
         'of': 'of',
-        'my_position': 'My vote'
+        'my_position': 'My vote',
+        'new_votes': 'New votes',
+        'reload': 'Reload'
     }
 }
 
 # Basis-Verzeichnis ermitteln
 BASE_DIR = Path(__file__).resolve().parent
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    """Startphasen im Hintergrund (Port ist sofort offen, /readyz meldet das Ende), danach die Watcher."""
+    def on_ready():
+        SNAPSHOTS.start_watcher()
+        MEPS.start()
+        LIVE_UPDATES.start()
+        # Ungefilterter Analysezustand (u.a. für /similar) im Hintergrund vorberechnen
+        ANALYTICS.prefetch(SNAPSHOTS.current, *analytics_filter(SNAPSHOTS.current, None, None, None))
+
+    task = STARTUP.start(on_ready)
+    yield
+    task.cancel()
+    SNAPSHOTS.stop_watcher()
+    MEPS.stop()
+    LIVE_UPDATES.stop()
+    ANALYTICS.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 # Static-Files (z.B. CSS, JS) unter /static verfügbar machen
 app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
 
@@ -85,161 +120,97 @@ def raw_json_missing():
     return "raw_json" not in existing_columns
 
 # -----------------------------------
-# 3) Tabellen anlegen bzw. migrieren
+# 3) Tabellen anlegen bzw. migrieren (Startphase "schema")
 # -----------------------------------
-# Wenn Tabelle "votes" existiert, aber raw_json fehlt → alle Tabellen droppen und neu anlegen
-if raw_json_missing():
-    Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+def prepare_schema():
+    from migrate_db import ensure_schema
+
+    # Wenn Tabelle "votes" existiert, aber raw_json fehlt → alle Tabellen droppen und neu anlegen
+    if raw_json_missing():
+        Base.metadata.drop_all(bind=engine)
+    # Fehlende Tabellen anlegen; altes member_votes-Schema (Profil je Zeile) → members + schlanke Faktentabelle
+    ensure_schema(engine)
 
 # ---------------------------------------------------------
-# 4) Bei erstem Start oder nach Migration: aus JSON in die SQL-DB migrieren
+# 4) Neue Shards des Datensatzes bzw. bei erstem Start vote_data.json in die SQL-DB importieren (Startphase "import")
 # ---------------------------------------------------------
 def init_db_from_json():
-    session = SessionLocal()
-    existing = session.query(Vote).first()
-    if existing:
-        session.close()
+    """Importiert neue Shards aus dataset/ (siehe vote_dataset.py); ohne Datensatz vote_data.json, bis sie vollständig in der DB ist."""
+    from importer import import_completed, import_json_file, db_is_empty
+    from vote_dataset import DATASET_DIR, has_dataset, import_dataset
+
+    if has_dataset(DATASET_DIR):
+        import_dataset(engine, DATASET_DIR)
         return
+    path = BASE_DIR / "vote_data.json"
+    if import_completed(engine, path.name):
+        return
+    # Votes nur aus dem Harvester, keine JSON-Datei: nichts zu importieren
+    if not path.exists() and not db_is_empty(engine):
+        return
+    # Erster Start oder abgebrochener Import: fortsetzen (vorhandene Votes werden übersprungen)
+    import_json_file(engine, path)
+
 
-    data_path = BASE_DIR / "vote_data.json"
-    with open(data_path, 'r', encoding='utf-8') as f:
-        vote_list = json.load(f)
-
-    for item in vote_list:
-        vote_id = int(item.get("id"))
-        # 1) Vote-Objekt anlegen (Basis-Felder)
-        v = Vote(
-            id=vote_id,
-            timestamp=item.get("timestamp"),
-            display_title=item.get("display_title"),
-            description=item.get("description", ""),
-            reference=item.get("reference", ""),
-            geo_areas=", ".join(area.get("label", "") for area in item.get("geo_areas", [])),
-            position=item.get("result", "UNKNOWN"),
-            raw_json=json.dumps(item, ensure_ascii=False)
-        )
-        session.add(v)
-        session.flush()
-
-        # 2) Stats anlegen
-        s_data = item.get("stats", {})
-        total = s_data.get("total", {})
-        stats = Stats(
-            vote_id=v.id,
-            total_for=total.get("FOR", 0),
-            total_against=total.get("AGAINST", 0),
-            total_abstention=total.get("ABSTENTION", 0),
-            total_did_not_vote=total.get("DID_NOT_VOTE", 0),
-        )
-        session.add(stats)
-        session.flush()
-
-        # 2a) ByGroup
-        for grp_entry in s_data.get("by_group", []):
-            grp = grp_entry.get("group", {})
-            st = grp_entry.get("stats", {})
-            bg = ByGroup(
-                stats_id=stats.id,
-                group_code=grp.get("code", ""),
-                group_label=grp.get("label", ""),
-                group_short_label=grp.get("short_label", ""),
-                for_count=st.get("FOR", 0),
-                against_count=st.get("AGAINST", 0),
-                abstention_count=st.get("ABSTENTION", 0),
-                did_not_vote_count=st.get("DID_NOT_VOTE", 0)
-            )
-            session.add(bg)
-
-        # 2b) ByCountry
-        for ctry_entry in s_data.get("by_country", []):
-            ctry = ctry_entry.get("country", {})
-            st = ctry_entry.get("stats", {})
-            bc = ByCountry(
-                stats_id=stats.id,
-                country_code=ctry.get("code", ""),
-                country_iso_alpha_2=ctry.get("iso_alpha_2", ""),
-                country_label=ctry.get("label", ""),
-                for_count=st.get("FOR", 0),
-                against_count=st.get("AGAINST", 0),
-                abstention_count=st.get("ABSTENTION", 0),
-                did_not_vote_count=st.get("DID_NOT_VOTE", 0)
-            )
-            session.add(bc)
-
-        # 3) MemberVotes
-        for mv_entry in item.get("member_votes", []):
-            m = mv_entry.get("member", {})
-            mv = MemberVote(
-                vote_id=v.id,
-                member_id=m.get("id"),
-                first_name=m.get("first_name", ""),
-                last_name=m.get("last_name", ""),
-                date_of_birth=m.get("date_of_birth", ""),
-                country_code=m.get("country", {}).get("code", ""),
-                country_iso_alpha_2=m.get("country", {}).get("iso_alpha_2", ""),
-                country_label=m.get("country", {}).get("label", ""),
-                group_code=m.get("group", {}).get("code", ""),
-                group_label=m.get("group", {}).get("label", ""),
-                group_short_label=m.get("group", {}).get("short_label", ""),
-                photo_url=m.get("photo_url", ""),
-                thumb_url=m.get("thumb_url", ""),
-                email=m.get("email", ""),
-                facebook=m.get("facebook", ""),
-                twitter=m.get("twitter", ""),
-                position=mv_entry.get("position", "")
-            )
-            session.add(mv)
-
-    session.commit()
-    session.close()
-
-# Einmalig ausführen
-init_db_from_json()
+def ensure_rollups():
+    """Bestehende DB ohne Tages-/Monatssummen: einmalig aus den Statistiken aufbauen."""
+    if rollups_missing(engine):
+        rebuild_rollups(engine)
 
 # ---------------------------------------------------------
-# 5) Daten aus DB in-memory laden (VOTE_DATA_LIST)
+# 5) Daten aus DB in-memory laden (versionierter Snapshot mit Hot-Reload; Startphase "snapshot")
 # ---------------------------------------------------------
-session = SessionLocal()
-vote_rows = session.query(Vote).all()
-VOTE_DATA_LIST = [json.loads(v.raw_json) for v in vote_rows]
-for vote in VOTE_DATA_LIST:
-    vote['chart_data'] = vote.get('stats', {}).get('total', {})
-session.close()
+# Jeder Request holt sich einmal SNAPSHOTS.current und arbeitet nur darauf.
+# Ändert sich votes.db (z.B. nach main.py), baut der Watcher im Hintergrund
+# einen neuen Snapshot und tauscht ihn atomar aus – ohne Neustart.
+SNAPSHOTS = SnapshotManager(engine)
 
 # ---------------------------------------------------------
-# 6) MEP-Daten mit Caching laden (bleibt wie vorher)
+# 6) MEP-Daten aus dem vorgeparsten Cache (Aktualisierung im Hintergrund; Startphase "meps")
 # ---------------------------------------------------------
-cache_path = BASE_DIR / 'meps_cache.xml'
-if cache_path.exists() and time.time() - cache_path.stat().st_mtime < 86400:
-    xml_data = cache_path.read_text(encoding='utf-8')
-else:
-    xml_data = requests.get("https://www.europarl.europa.eu/meps/en/full-list/xml").text
-    cache_path.write_text(xml_data, encoding='utf-8')
-
-root = ET.fromstring(xml_data)
-MEPS_IDS = {int(m.find('id').text) for m in root.findall('mep')}
-MEPS_LIST = sorted(
-    [{'id': int(m.find('id').text), 'name': m.findtext('fullName', '')}
-     for m in root.findall('mep')],
-    key=lambda x: x['name']
-)
-MEPS_INFO = {
-    int(m.find('id').text): {
-        'first_name': m.findtext('firstName', ''),
-        'last_name': m.findtext('lastName', ''),
-        'full_name': m.findtext('fullName', ''),
-        'country': m.findtext('country', ''),
-        'political_group': m.findtext('politicalGroup', ''),
-        'birth_date': m.findtext('birthDate', ''),
-        'url': m.findtext('url', '')
-    }
-    for m in root.findall('mep')
-}
+MEPS = MepRegistry(load=False)
+
+# Startphasen: Snapshot und Rollups brauchen die importierte DB, die MEP-Liste ist unabhängig
+STARTUP = Startup()
+STARTUP.add("schema", prepare_schema)
+STARTUP.add("import", init_db_from_json, after=["schema"])
+STARTUP.add("rollups", ensure_rollups, after=["import"])
+STARTUP.add("snapshot", SNAPSHOTS.reload, after=["import"])
+STARTUP.add("meps", MEPS.load)
 
 templates = Jinja2Templates(directory="templates")
 socket_manager = SocketManager(app=app)
+# Neue Votes per Socket.IO an abonnierte Clients (siehe live_updates.py)
+LIVE_UPDATES = LiveUpdates(engine, SNAPSHOTS, socket_manager)
+# Reihenfolge: TimingMiddleware außen, CompressionMarker innerhalb von GZip (siehe metrics.py)
+METRICS = Metrics()
+app.add_middleware(CompressionMarker)
 app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Bis zum Ende der Startphasen nur Health-Checks, Metriken und statische Dateien
+app.add_middleware(ReadinessGate, startup=STARTUP)
+app.add_middleware(TimingMiddleware, metrics=METRICS, profiler=SlowRequestProfiler())
+
+
+# Gerenderte Antworten je Datenstand (siehe response_cache.py)
+RESPONSE_CACHE = ResponseCache()
+
+
+def template_response(name, context):
+    """TemplateResponse mit gemessener Render-Zeit (Phase "render")."""
+    with span("render"):
+        return templates.TemplateResponse(name, context)
+
+
+def cache_version(snapshot):
+    """Datenstand, von dem die gecachten Antworten abhängen: Vote-Snapshot und MEP-Liste.
+
+    Beide Teile sind aufsteigende Zähler, damit der Cache ältere von neueren Ständen unterscheiden kann.
+    """
+    return (snapshot.version, MEPS.current.generation)
+
+
+# Votes pro Block im show_all-Modus (erste Seite und jedes nachgeladene Fragment)
+SHOW_ALL_CHUNK = int(os.environ.get("SHOW_ALL_CHUNK", "50"))
 
 
 # -----------------------------------
@@ -248,20 +219,49 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return template_response("index.html", {"request": request})
 
 
 @app.get("/votes")
-def get_votes(query: str = None, page: int = 1, page_size: int = 50):
-    """Gibt paginierte Votes-Liste basierend auf optionaler Suche zurück."""
-    data = VOTE_DATA_LIST
-    if query:
-        data = [v for v in data if query.lower() in v.get("display_title", "").lower()]
-    total_votes = len(data)
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated_votes = data[start:end]
-    return {"total_votes": total_votes, "votes": paginated_votes}
+def get_votes(request: Request, query: str = None, page: int = 1, page_size: int = 50):
+    """Gibt paginierte Votes-Liste basierend auf optionaler Suche zurück (nach Relevanz sortiert)."""
+    snapshot = SNAPSHOTS.current
+
+    def render():
+        index = snapshot.search_index
+        data = index.votes
+        if query:
+            data = [data[i] for i in index.search(query)]
+        total_votes = len(data)
+        start = (page - 1) * page_size
+        end = start + page_size
+        paginated_votes = data[start:end]
+        return ORJSONResponse({"total_votes": total_votes, "votes": paginated_votes})
+
+    key = ("/votes", query or "", page, page_size)
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, render)
+
+
+@app.get("/votes/sorted")
+def get_sorted_votes(order: str = "desc",
+                     start_date: str = Query(None, description="YYYY-MM-DD"),
+                     end_date: str = Query(None, description="YYYY-MM-DD"),
+                     page: int = 1,
+                     page_size: int = Query(0, description="0 = alle Votes ohne Pagination")):
+    """Gibt Votes zeitlich sortiert zurück (asc/desc), optional eingeschränkt auf einen Datumsbereich."""
+    matrix = SNAPSHOTS.current.matrix
+    lo, hi = matrix.time_slice(start_date, end_date)
+    # Pagination als Slice direkt auf dem zeitlich sortierten Index
+    if page_size > 0:
+        offset = (max(page, 1) - 1) * page_size
+        if order == "asc":
+            lo, hi = min(lo + offset, hi), min(lo + offset + page_size, hi)
+        else:
+            lo, hi = max(hi - offset - page_size, lo), max(hi - offset, lo)
+    rows = matrix.time_order[lo:hi]
+    if order != "asc":
+        rows = rows[::-1]
+    return [matrix.votes[i] for i in rows]
 
 
 @app.get("/votes/html", response_class=HTMLResponse)
@@ -275,139 +275,169 @@ def get_votes_html(request: Request,
                    member_id: int = Query(0),
                    show_all: bool = Query(False, description="If true, show all votes ohne Pagination."),
                    lang: str = Query('de', pattern='^(de|en)$')):
-    all_votes = VOTE_DATA_LIST.copy()
-
-    # --- Helpers ---
-    def parse_ddmmyyyy(date_str):
-        if not date_str:
-            return None
-        try:
-            date_str = date_str.replace('.', '-')
-            d = time.strptime(date_str, "%d-%m-%Y")
-            return time.strftime("%Y-%m-%d", d)
-        except Exception:
-            return None
-
-    def calculate_age(birthdate_str):
-        try:
-            bd = datetime.strptime(birthdate_str, "%Y-%m-%d").date()
-            today = date.today()
-            return today.year - bd.year - ((today.month, today.day) < (bd.month, bd.day))
-        except Exception:
-            return None
-
-    # 1) Erzeuge Liste aller Mitglieder für Dropdown
-    members_dict = {}
-    for vote in VOTE_DATA_LIST:
-        for mv in vote.get("member_votes", []):
-            m = mv.get("member", {})
-            m_id = m.get("id")
-            if m_id not in members_dict:
-                full_name = f"{m.get('first_name','')} {m.get('last_name','')}"
-                members_dict[m_id] = full_name
-    members = [{"id": mid, "name": members_dict[mid]} for mid in sorted(members_dict.keys(), key=lambda x: members_dict[x])]
+    # Ein konsistenter Datenstand für den gesamten Request
+    snapshot = SNAPSHOTS.current
+    # Schlüssel aus den validierten Parametern: Reihenfolge, unbekannte und leere Parameter spielen keine Rolle
+    key = ("/votes/html", page, page_size, query or "", geo or "", start_date or "", end_date or "",
+           member_id or 0, show_all, lang)
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, lambda: render_votes_html(
+        request, snapshot, page, page_size, query, geo, start_date, end_date, member_id, show_all, lang))
+
+
+def parse_ddmmyyyy(date_str):
+    """TT.MM.JJJJ bzw. TT-MM-JJJJ → JJJJ-MM-TT (None bei ungültigem Datum)."""
+    if not date_str:
+        return None
+    try:
+        date_str = date_str.replace('.', '-')
+        d = time.strptime(date_str, "%d-%m-%Y")
+        return time.strftime("%Y-%m-%d", d)
+    except Exception:
+        return None
+
+
+def filter_rows(snapshot, geo, start_date, end_date, member_id):
+    """Aufsteigend sortierte Zeilenindizes aller Votes, die zu den Filtern passen.
+
+    Jeder Filter liefert ein sortiertes Array, die Filter werden per
+    Schnittmenge kombiniert. Die geteilten Vote-Dicts bleiben unverändert.
+    """
+    matrix = snapshot.matrix
+    filters = []
+
+    # Filter nach Abgeordneten (sortierte Vote-Indizes aus der Spalte der geteilten Matrix)
+    if member_id:
+        with span("filter_member"):
+            filters.append(matrix.vote_indexes_of(member_id))
+
+    # Filter nach geo_areas (kommaseparierte Liste)
+    if geo:
+        with span("filter_geo"):
+            filters.append(matrix.rows_with_geo(g.strip() for g in geo.split(",")))
+
+    # Filter nach Datum (Binärsuche im zeitlich sortierten Index)
+    sd = parse_ddmmyyyy(start_date)
+    ed = parse_ddmmyyyy(end_date)
+    if sd or ed:
+        with span("filter_date"):
+            filters.append(matrix.rows_in_date_range(sd, ed))
+
+    if not filters:
+        return np.arange(len(matrix.votes))
+    indexes = filters[0]
+    with span("filter_intersect"):
+        for rows in filters[1:]:
+            indexes = np.intersect1d(indexes, rows, assume_unique=True)
+    return indexes
+
+
+def ranked_rows(snapshot, query, indexes):
+    """Treffer der Volltextsuche innerhalb von ``indexes``, nach Relevanz sortiert."""
+    with span("search"):
+        hits = np.asarray(snapshot.search_index.search(query), dtype=np.int64)
+        return hits[np.isin(hits, indexes)]
+
+
+def vote_views(snapshot, rows, member_id):
+    """Request-lokale Sichten für die angezeigten Votes, ggf. mit Position des Mitglieds."""
+    votes = snapshot.matrix.votes
+    if member_id:
+        member_positions = snapshot.matrix.positions_of(member_id)
+        return [VoteView(votes[i], POSITION_NAMES.get(int(member_positions[i]))) for i in rows]
+    return [VoteView(votes[i]) for i in rows]
+
+
+def encode_cursor(key):
+    timestamp, vote_id = key
+    return f"{timestamp}|{vote_id}"
+
+
+def decode_cursor(cursor):
+    """Cursor "timestamp|id" → (timestamp, id); None bei ungültigem Cursor."""
+    timestamp, _, vote_id = (cursor or "").rpartition("|")
+    if not timestamp or not vote_id.isdigit():
+        return None
+    return timestamp, int(vote_id)
+
+
+def fragment_url(query, geo, start_date, end_date, member_id, lang, cursor=None, offset=None):
+    """URL des nächsten Blocks für das Nachladen im show_all-Modus."""
+    params = {"query": query, "geo": geo, "start_date": start_date, "end_date": end_date,
+              "member_id": member_id or None, "lang": lang, "cursor": cursor, "offset": offset}
+    return "/votes/fragment?" + urllib.parse.urlencode({k: v for k, v in params.items() if v})
+
+
+def render_votes_html(request, snapshot, page, page_size, query, geo, start_date, end_date, member_id, show_all, lang):
+    """Filtert, paginiert und rendert die Vote-Liste für einen Snapshot.
+
+    Mit ``show_all`` wird nur der erste Block gerendert; die übrigen Votes lädt
+    die Seite beim Scrollen über /votes/fragment nach.
+    """
+    registry = snapshot.registry
+    matrix = snapshot.matrix
+
+    # 1) Liste aller Mitglieder für Dropdown (vorberechnet)
+    members = registry.members
 
     selected_member_id = member_id or 0
     sel_member_info = None
     sel_member_name = ""
 
-    # 2) Wenn ein Mitglied ausgewählt ist, suche dessen Daten (erstes Vorkommen)
+    # 2) Wenn ein Mitglied ausgewählt ist, dessen Profil aus dem Verzeichnis holen
     if selected_member_id:
-        member_data = None
-        for vote in VOTE_DATA_LIST:
-            for mv in vote.get("member_votes", []):
-                m = mv.get("member", {})
-                if m.get("id") == selected_member_id:
-                    member_data = m
-                    break
-            if member_data:
-                break
-        if member_data:
-            # Foto und Land/Fraktion aus member_data
-            photo_url = member_data.get("photo_url", "")
-            country = member_data.get("country", {}).get("label", "")
-            group = member_data.get("group", {}).get("short_label", "")
-            dob = member_data.get("date_of_birth", "")
-            age = calculate_age(dob)
-            sel_member_info = {
-                "photo_url": photo_url,
-                "country": country,
-                "group": group,
-                "age": age,
-            }
-            sel_member_name = f"{member_data.get('first_name','')} {member_data.get('last_name','')}"
-
-        # 3) Setze für jede Abstimmung die Position des ausgewählten Mitglieds
-        for v in all_votes:
-            user_pos = None
-            for mv in v.get("member_votes", []):
-                if mv.get("member", {}).get("id") == selected_member_id:
-                    user_pos = mv.get("position", "")
-                    break
-            v["position"] = user_pos  # Überschreibt das vorherige Ergebnis-Feld
-    # End if selected_member_id
-
-    # Erzeuge Liste aller Länder für Geo-Filter (einmalig aus Rohdaten)
-    geo_labels = set()
-    for v in VOTE_DATA_LIST:
-        for ga in v.get('geo_areas', []):
-            label = ga.get('label')
-            if label:
-                geo_labels.add(label)
-    geo_options = [{'code': lbl, 'label': lbl} for lbl in sorted(geo_labels)]
-
-    # 4) Filter nach geo_areas (kommaseparierte Liste)
-    if geo:
-        geos = geo.split(",")
-        all_votes = [
-            v for v in all_votes
-            if any(g.strip() in [ga.get('label', '') for ga in v.get('geo_areas', [])] for g in geos)
-        ]
-
-    # 5) Filter nach Datum
-    if start_date:
-        sd = parse_ddmmyyyy(start_date)
-        all_votes = [v for v in all_votes if v.get("timestamp", "").split("T")[0] >= sd]
-    if end_date:
-        ed = parse_ddmmyyyy(end_date)
-        all_votes = [v for v in all_votes if v.get("timestamp", "").split("T")[0] <= ed]
-
-    # 6) Filter nach Abgeordneten
-    if selected_member_id:
-        filtered = []
-        for vote in all_votes:
-            for mv in vote.get("member_votes", []):
-                if mv.get("member", {}).get("id") == selected_member_id:
-                    filtered.append(vote)
-                    break
-        all_votes = filtered
-
-    # 7) Optional Suche im Titel/Text
+        sel_member_info = registry.member_info(selected_member_id)
+        if sel_member_info:
+            sel_member_name = registry.profiles[selected_member_id]["name"]
+
+    # Liste aller Geo-Labels für den Filter (vorberechnet)
+    geo_options = matrix.geo_options
+
+    # 3) Filter nach Mitglied, Geo und Datum
+    indexes = filter_rows(snapshot, geo, start_date, end_date, selected_member_id)
+
+    # 4) Optional Volltextsuche; Treffer nach Relevanz sortiert
+    ranked = False
     if query:
-        all_votes = [v for v in all_votes if query.lower() in v.get("display_title", "").lower()]
+        indexes = ranked_rows(snapshot, query, indexes)
+        ranked = True
 
-    # 8) Berechne Pagination
-    total_votes = len(all_votes)
+    # 5) Berechne Pagination
+    total_votes = len(indexes)
     total_pages = (total_votes + page_size - 1) // page_size if page_size else 1
     last_page = total_pages
-    if not show_all:
+    next_url = None
+    if show_all:
+        # Erster Block; der Rest wird per Cursor nachgeladen
+        if ranked:
+            if len(indexes) > SHOW_ALL_CHUNK:
+                next_url = fragment_url(query, geo, start_date, end_date, selected_member_id, lang,
+                                        offset=SHOW_ALL_CHUNK)
+            indexes = indexes[:SHOW_ALL_CHUNK]
+        else:
+            indexes, next_key = matrix.newest_first(indexes, limit=SHOW_ALL_CHUNK)
+            if next_key is not None:
+                next_url = fragment_url(query, geo, start_date, end_date, selected_member_id, lang,
+                                        cursor=encode_cursor(next_key))
+        # Das Template zeigt die Liste umgekehrt an
+        indexes = indexes[::-1]
+    else:
         start = (page - 1) * page_size
         end = start + page_size
-        all_votes = all_votes[start:end]
+        indexes = indexes[start:end]
+        if ranked:
+            # Das Template zeigt die Liste umgekehrt an; bester Treffer soll oben stehen
+            indexes = indexes[::-1]
 
-    # 9) Wie viele Stimmen hat das Mitglied insgesamt (unabhängig von Filter)?
-    total_member_votes = 0
-    if selected_member_id:
-        for v in VOTE_DATA_LIST:
-            for mv in v.get("member_votes", []):
-                if mv.get("member", {}).get("id") == selected_member_id:
-                    total_member_votes += 1
-                    break
+    # Request-lokale Sichten nur für die angezeigte Seite
+    all_votes = vote_views(snapshot, indexes, selected_member_id)
+
+    # 6) Wie viele Stimmen hat das Mitglied insgesamt (unabhängig von Filter)?
+    total_member_votes = registry.vote_counts.get(selected_member_id, 0)
 
     # Bereitstellung der Übersetzungstexte
     texts = LANG_TEXTS.get(lang, LANG_TEXTS['de'])
 
-    return templates.TemplateResponse("votes.html", {
+    return template_response("votes.html", {
         "request": request,
         "votes": all_votes,
         "page": page,
@@ -425,82 +455,401 @@ def get_votes_html(request: Request,
         "members": members,
         "show_all": show_all,
         "lang": lang,
-        "MEPS_LIST": MEPS_LIST,
+        "MEPS_LIST": MEPS.current.meps_list,
         "total_member_votes": total_member_votes,
         "texts": texts,
-        "geo_options": geo_options
+        "geo_options": geo_options,
+        "next_url": next_url,
+        "live_client_url": SOCKETIO_CLIENT_URL if LIVE_UPDATES.interval > 0 else "",
     })
 
 
-@app.get("/votes/detail/{vote_id}", response_class=HTMLResponse)
-def get_vote_detail(request: Request, vote_id: int, lang: str = Query('de', pattern='^(de|en)$')):
-    """Detailseite für einen einzelnen Vote."""
-    vote = next((v for v in VOTE_DATA_LIST if int(v.get("id", 0)) == vote_id), None)
-    if not vote:
-        return {"error": "Vote nicht gefunden."}
+@app.get("/votes/fragment", response_class=HTMLResponse)
+def get_votes_fragment(request: Request,
+                       query: str = None,
+                       geo: str = Query(None),
+                       start_date: str = Query(None),
+                       end_date: str = Query(None),
+                       member_id: int = Query(0),
+                       cursor: str = Query(None, description="timestamp|id des zuletzt angezeigten Votes"),
+                       offset: int = Query(0, ge=0, description="Position in der Trefferliste (nur mit query)"),
+                       lang: str = Query('de', pattern='^(de|en)$')):
+    """Nächster Block Vote-Karten für das Nachladen im show_all-Modus (HTML-Fragment).
+
+    Ohne Suchbegriff sind die Votes nach (timestamp, id) absteigend sortiert
+    und der Cursor ist der Schlüssel des letzten angezeigten Votes. Mit
+    Suchbegriff gilt die Relevanz-Reihenfolge, fortgesetzt ab ``offset``.
+    """
+    snapshot = SNAPSHOTS.current
+    before = None
+    if not query and cursor is not None:
+        before = decode_cursor(cursor)
+        if before is None:
+            return JSONResponse({"error": "Ungültiger Cursor."}, status_code=400)
+
+    def render():
+        indexes = filter_rows(snapshot, geo, start_date, end_date, member_id)
+        next_url = None
+        if query:
+            indexes = ranked_rows(snapshot, query, indexes)
+            if len(indexes) > offset + SHOW_ALL_CHUNK:
+                next_url = fragment_url(query, geo, start_date, end_date, member_id, lang,
+                                        offset=offset + SHOW_ALL_CHUNK)
+            indexes = indexes[offset:offset + SHOW_ALL_CHUNK]
+        else:
+            indexes, next_key = snapshot.matrix.newest_first(indexes, before=before, limit=SHOW_ALL_CHUNK)
+            if next_key is not None:
+                next_url = fragment_url(query, geo, start_date, end_date, member_id, lang,
+                                        cursor=encode_cursor(next_key))
+        return template_response("vote_cards.html", {
+            "request": request,
+            "votes": vote_views(snapshot, indexes, member_id),
+            "query": query or "",
+            "start_date": start_date or "",
+            "end_date": end_date or "",
+            "selected_member_id": member_id or 0,
+            "show_all": True,
+            "lang": lang,
+            "texts": LANG_TEXTS.get(lang, LANG_TEXTS['de']),
+            "next_url": next_url,
+        })
 
-    stats = vote.get("stats", {})
-    by_group = stats.get("by_group", [])
+    key = ("/votes/fragment", query or "", geo or "", start_date or "", end_date or "", member_id or 0,
+           before if not query else offset, lang)
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, render)
 
-    # Ensure by_group contains required attributes with fallback values
-    for group in by_group:
-        group.setdefault("for_count", 0)
-        group.setdefault("against_count", 0)
-        group.setdefault("abstention_count", 0)
-        group.setdefault("did_not_vote_count", 0)
 
-    by_country = stats.get("by_country", [])
-    member_votes = vote.get("member_votes", [])
+@app.get("/votes/detail/{vote_id}", response_class=HTMLResponse)
+def get_vote_detail(request: Request, vote_id: int, lang: str = Query('de', pattern='^(de|en)$')):
+    """Detailseite für einen einzelnen Vote (vorberechneter Payload aus dem Detail-Cache)."""
+    snapshot = SNAPSHOTS.current
+
+    def render():
+        detail = snapshot.detail_store.get(vote_id)
+        if not detail:
+            return JSONResponse({"error": "Vote nicht gefunden."}, status_code=404)
+
+        return template_response("detail.html", {
+            "request": request,
+            "vote": detail["vote"],
+            "by_group": detail["by_group"],
+            "by_country": detail["by_country"],
+            "member_votes": detail["member_votes"],
+            "lang": lang,
+            "texts": LANG_TEXTS.get(lang, LANG_TEXTS['de']),
+            "vote_groups": detail["by_group"]
+        })
 
-    return templates.TemplateResponse("detail.html", {
-        "request": request,
-        "vote": vote,
-        "by_group": by_group,
-        "by_country": by_country,
-        "member_votes": member_votes,
-        "lang": lang,
-        "texts": LANG_TEXTS.get(lang, LANG_TEXTS['de']),
-        "vote_groups": by_group or []
-    })
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), ("/votes/detail", vote_id, lang), render)
 
 
 @app.get("/votes/search")
 def search_votes(q: str = Query(..., min_length=1)):
-    """Suche nach Votes basierend auf Titel."""
-    data = VOTE_DATA_LIST
-    results = [v for v in data if q.lower() in v.get("display_title", "").lower()]
-    return results
+    """Volltextsuche nach Votes (Titel, Beschreibung, Referenz, Geo-Gebiete), nach Relevanz sortiert."""
+    index = SNAPSHOTS.current.search_index
+    return ORJSONResponse([index.votes[i] for i in index.search(q)])
 
 
 @app.get("/members/search")
 def search_members(last_name: str = Query(..., min_length=1)):
     """Suche nach Abgeordneten basierend auf ihrem Nachnamen."""
-    data = VOTE_DATA_LIST
-    members = []
-    for vote in data:
-        for mv in vote.get("member_votes", []):
-            member = mv.get("member", {})
-            if last_name.lower() in member.get("last_name", "").lower():
-                members.append(member)
-    return members
+    return SNAPSHOTS.current.registry.search_by_last_name(last_name)
 
 
 @app.get("/members")
 def get_all_members():
     """Gibt eine Liste aller Abgeordneten zurück."""
-    data = VOTE_DATA_LIST
-    members_dict = {}
-    for vote in data:
-        for mv in vote.get("member_votes", []):
-            m = mv.get("member", {})
-            members_dict[m.get("id")] = {
-                "id": m.get("id"),
-                "first_name": m.get("first_name"),
-                "last_name": m.get("last_name"),
-                "country": m.get("country", {}).get("label"),
-                "group": m.get("group", {}).get("short_label")
+    return SNAPSHOTS.current.registry.member_summaries
+
+
+# -----------------------------------
+# 8) JSON-API v1: schlanke Listen mit Feldauswahl
+# -----------------------------------
+API_VERSION = 1
+# Felder einer Vote-Zusammenfassung; "position" nur mit member_id, "member_votes" nur auf Anfrage
+API_FIELDS = ["id", "timestamp", "display_title", "description", "reference", "result", "geo_areas",
+              "chart_data", "position", "member_votes"]
+API_DEFAULT_FIELDS = ["id", "timestamp", "display_title", "reference", "result", "geo_areas", "chart_data"]
+API_MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields):
+    """fields=a,b,c → Liste gültiger Felder (Standard: Zusammenfassung); None bei unbekannten Feldern."""
+    if not fields:
+        return API_DEFAULT_FIELDS
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    if any(f not in API_FIELDS for f in selected):
+        return None
+    return selected
+
+
+def api_vote(matrix, row, fields, member_positions=None):
+    """Projektion eines Votes auf ``fields``.
+
+    Positionen werden kompakt als Codes (siehe ``position_codes`` in der
+    Antwort) übertragen; member_votes als parallele Listen von Mitglieder-IDs
+    und Codes, direkt aus der Positionsmatrix.
+    """
+    summary = matrix.votes[int(row)]
+    item = {}
+    for field in fields:
+        if field == "position":
+            item["position"] = int(member_positions[row]) if member_positions is not None else None
+        elif field == "member_votes":
+            positions = matrix.positions[row]
+            cols = np.flatnonzero(positions)
+            item["member_votes"] = {
+                "member_ids": matrix.member_ids[cols].tolist(),
+                "positions": positions[cols].tolist(),
             }
-    return list(members_dict.values())
+        else:
+            item[field] = summary[field]
+    return item
+
+
+def api_error(message, status_code=400):
+    return ORJSONResponse({"api_version": API_VERSION, "error": message}, status_code=status_code)
+
+
+@app.get("/api/v1/votes")
+def api_votes(request: Request,
+              query: str = None,
+              geo: str = Query(None),
+              start_date: str = Query(None, description="TT.MM.JJJJ"),
+              end_date: str = Query(None, description="TT.MM.JJJJ"),
+              member_id: int = Query(0),
+              fields: str = Query(None, description="Kommaseparierte Felder, z.B. id,display_title,member_votes"),
+              page: int = Query(1, ge=1),
+              page_size: int = Query(50, ge=1, le=API_MAX_PAGE_SIZE)):
+    """Vote-Liste: ohne Suchbegriff neueste zuerst, mit Suchbegriff nach Relevanz; mit Gesamtzahl."""
+    selected = parse_fields(fields)
+    if selected is None:
+        return api_error(f"Unbekanntes Feld; erlaubt: {', '.join(API_FIELDS)}")
+    snapshot = SNAPSHOTS.current
+
+    def render():
+        matrix = snapshot.matrix
+        indexes = filter_rows(snapshot, geo, start_date, end_date, member_id)
+        if query:
+            indexes = ranked_rows(snapshot, query, indexes)
+        else:
+            indexes = indexes[np.argsort(-matrix.time_rank[indexes])]
+        start = (page - 1) * page_size
+        rows = indexes[start:start + page_size]
+        member_positions = matrix.positions_of(member_id) if member_id else None
+        return ORJSONResponse({
+            "api_version": API_VERSION,
+            "total": len(indexes),
+            "page": page,
+            "page_size": page_size,
+            "fields": selected,
+            "position_codes": POSITION_NAMES,
+            "data": [api_vote(matrix, row, selected, member_positions) for row in rows],
+        })
+
+    key = ("/api/v1/votes", query or "", geo or "", start_date or "", end_date or "", member_id or 0,
+           tuple(selected), page, page_size)
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, render)
+
+
+@app.get("/api/v1/votes/{vote_id}")
+def api_vote_detail(request: Request, vote_id: int,
+                    fields: str = Query(None, description="Kommaseparierte Felder, z.B. id,member_votes"),
+                    member_id: int = Query(0)):
+    """Ein einzelner Vote mit Feldauswahl (gleiche Felder wie die Liste)."""
+    selected = parse_fields(fields)
+    if selected is None:
+        return api_error(f"Unbekanntes Feld; erlaubt: {', '.join(API_FIELDS)}")
+    snapshot = SNAPSHOTS.current
+    row = snapshot.matrix.vote_index.get(vote_id)
+    if row is None:
+        return api_error("Vote nicht gefunden.", status_code=404)
+
+    def render():
+        matrix = snapshot.matrix
+        member_positions = matrix.positions_of(member_id) if member_id else None
+        return ORJSONResponse({
+            "api_version": API_VERSION,
+            "fields": selected,
+            "position_codes": POSITION_NAMES,
+            "data": api_vote(matrix, row, selected, member_positions),
+        })
+
+    key = ("/api/v1/votes/{id}", vote_id, tuple(selected), member_id or 0)
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, render)
+
+
+# -----------------------------------
+# 9) Analysen: Übereinstimmung, Kohäsion, Fraktionstreue
+# -----------------------------------
+ANALYTICS = Analytics()
+API_MAX_AGREEMENT_MEMBERS = 200
+
+
+def analytics_filter(snapshot, geo, start_date, end_date):
+    """Cache-Schlüssel und Zeilen für den Geo-/Datumsfilter (gleiche Filter wie /votes/html)."""
+    labels = tuple(sorted({g.strip() for g in geo.split(",") if g.strip()})) if geo else ()
+    key = (labels, parse_ddmmyyyy(start_date), parse_ddmmyyyy(end_date))
+    return key, filter_rows(snapshot, ",".join(labels), start_date, end_date, 0)
+
+
+def analytics_state(snapshot, geo, start_date, end_date):
+    """Analysezustand für die Votes im Geo-/Datumsfilter."""
+    return ANALYTICS.state(snapshot, *analytics_filter(snapshot, geo, start_date, end_date))
+
+
+@app.get("/api/v1/analytics/agreement")
+def api_agreement(member_ids: str = Query(..., description="Kommaseparierte Mitglieder-IDs"),
+                  geo: str = Query(None),
+                  start_date: str = Query(None, description="TT.MM.JJJJ"),
+                  end_date: str = Query(None, description="TT.MM.JJJJ")):
+    """Paarweise Übereinstimmungsraten (gleiche Position / gemeinsame Votes) der angegebenen Mitglieder."""
+    try:
+        ids = [int(m) for m in member_ids.split(",") if m.strip()]
+    except ValueError:
+        return api_error("member_ids muss eine Liste von Zahlen sein.")
+    if not ids or len(ids) > API_MAX_AGREEMENT_MEMBERS:
+        return api_error(f"1 bis {API_MAX_AGREEMENT_MEMBERS} member_ids erlaubt.")
+    state = analytics_state(SNAPSHOTS.current, geo, start_date, end_date)
+    return ORJSONResponse({"api_version": API_VERSION, "votes": len(state.vote_ids), **state.agreement(ids)})
+
+
+@app.get("/api/v1/analytics/cohesion")
+def api_cohesion(geo: str = Query(None),
+                 start_date: str = Query(None, description="TT.MM.JJJJ"),
+                 end_date: str = Query(None, description="TT.MM.JJJJ")):
+    """Agreement Index je Fraktion."""
+    state = analytics_state(SNAPSHOTS.current, geo, start_date, end_date)
+    return ORJSONResponse({"api_version": API_VERSION, "votes": len(state.vote_ids), "groups": state.cohesion()})
+
+
+@app.get("/api/v1/analytics/loyalty")
+def api_loyalty(group: str = Query(None, description="Fraktionscode, z.B. EPP"),
+                geo: str = Query(None),
+                start_date: str = Query(None, description="TT.MM.JJJJ"),
+                end_date: str = Query(None, description="TT.MM.JJJJ")):
+    """Anteil der Stimmen je Mitglied, die der Mehrheit der eigenen Fraktion folgen."""
+    state = analytics_state(SNAPSHOTS.current, geo, start_date, end_date)
+    members = state.loyalty(group)
+    return ORJSONResponse({"api_version": API_VERSION, "votes": len(state.vote_ids), "total": len(members),
+                           "members": members})
+
+
+@app.get("/api/v1/members/{member_id}/similar")
+def api_similar_members(member_id: int,
+                        k: int = Query(10, ge=1, le=100),
+                        group: str = Query(None, description="Nur Mitglieder dieser Fraktion (Code)"),
+                        country: str = Query(None, description="Nur Mitglieder dieses Landes (Code oder ISO-Alpha-2)"),
+                        other_groups: bool = Query(False, description="Nur Mitglieder anderer Fraktionen"),
+                        min_overlap: int = Query(10, ge=1, description="Mindestzahl gemeinsamer Votes")):
+    """Die k Mitglieder mit dem ähnlichsten Abstimmungsverhalten (Anteil gleicher Stimmen bei gemeinsamen Votes)."""
+    snapshot = SNAPSHOTS.current
+    state = analytics_state(snapshot, None, None, None)
+    ranking = state.ranking(member_id)
+    if ranking is None:
+        return api_error("Mitglied nicht gefunden.", status_code=404)
+    raw_members = snapshot.registry.raw_members
+    own_group = (raw_members[member_id].get("group") or {}).get("code")
+    cols, rates, shared, agree = ranking
+    similar = []
+    for col, rate, overlap, agreed in zip(cols.tolist(), rates.tolist(), shared.tolist(), agree.tolist()):
+        if overlap < min_overlap:
+            continue
+        other_id = int(state.member_ids[col])
+        other = raw_members.get(other_id) or {}
+        other_group = (other.get("group") or {}).get("code")
+        other_country = other.get("country") or {}
+        if (group and other_group != group) \
+                or (country and country not in (other_country.get("code"), other_country.get("iso_alpha_2"))) \
+                or (other_groups and other_group == own_group):
+            continue
+        similar.append({
+            "member_id": other_id,
+            "name": snapshot.registry.profiles[other_id]["name"] if other_id in snapshot.registry else "",
+            "group": other_group,
+            "country": other_country.get("code"),
+            "similarity": round(rate, 4),
+            "overlap": overlap,
+            "agreed": agreed,
+        })
+        if len(similar) == k:
+            break
+    return ORJSONResponse({"api_version": API_VERSION, "member_id": member_id, "votes": len(state.vote_ids),
+                           "similar": similar})
+
+
+@app.get("/api/v1/rollups")
+def api_rollups(request: Request,
+                dimension: str = Query("group", pattern="^(group|country)$"),
+                period: str = Query("month", pattern="^(day|month)$"),
+                start: str = Query(None, description="JJJJ-MM bzw. JJJJ-MM-TT (inklusive)"),
+                end: str = Query(None, description="JJJJ-MM bzw. JJJJ-MM-TT (inklusive)"),
+                codes: str = Query(None, description="Kommaseparierte Fraktions- bzw. Ländercodes")):
+    """Zeitreihe je Fraktion bzw. Land: Stimmen, Beteiligung und Anteil der Votes mit dem Ergebnis."""
+    snapshot = SNAPSHOTS.current
+    code_list = sorted({c.strip() for c in codes.split(",") if c.strip()}) if codes else []
+
+    def render():
+        rows = query_rollups(engine, dimension, period, start, end, code_list)
+        return ORJSONResponse({"api_version": API_VERSION, "dimension": dimension, "period": period,
+                               "total": len(rows), "data": rows})
+
+    key = ("/api/v1/rollups", dimension, period, start or "", end or "", tuple(code_list))
+    return RESPONSE_CACHE.respond(request, cache_version(snapshot), key, render)
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: der Prozess antwortet; 503 nach einem fehlgeschlagenen Start (Neustart nötig)."""
+    if STARTUP.error:
+        return JSONResponse({"status": "failed", "error": STARTUP.error}, status_code=503)
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 erst, wenn alle Startphasen (u.a. der Datenstand) fertig sind; mit Dauer je Phase."""
+    return JSONResponse(STARTUP.status(), status_code=200 if STARTUP.ready else 503)
+
+
+@app.post("/admin/reload")
+def admin_reload(request: Request, force: bool = False):
+    """Lädt neue Votes sofort in einen neuen Snapshot (statt auf den Watcher zu warten).
+
+    Nur mit gesetztem ADMIN_TOKEN erreichbar; er muss im Header ``X-Admin-Token`` mitgeschickt werden.
+    """
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        return JSONResponse({"error": "Nicht autorisiert."}, status_code=403)
+    reloaded = SNAPSHOTS.reload(force=force)
+    snapshot = SNAPSHOTS.current
+    return {"reloaded": reloaded, "version": snapshot.version, "votes": len(snapshot.votes)}
+
+
+# Kennzahlen des Datenstands und der Caches für /metrics (siehe metrics.py)
+METRICS.register("htv_response_cache_hits_total", "Treffer im Antwort-Cache", lambda: RESPONSE_CACHE.hits, "counter")
+METRICS.register("htv_response_cache_misses_total", "Fehlgriffe im Antwort-Cache", lambda: RESPONSE_CACHE.misses, "counter")
+METRICS.register("htv_response_cache_hit_ratio", "Trefferquote des Antwort-Caches seit dem Start",
+                 lambda: RESPONSE_CACHE.hits / max(1, RESPONSE_CACHE.hits + RESPONSE_CACHE.misses))
+METRICS.register("htv_response_cache_entries", "Einträge im Antwort-Cache", lambda: RESPONSE_CACHE.stats()[0])
+METRICS.register("htv_response_cache_bytes", "Komprimierte Bytes im Antwort-Cache", lambda: RESPONSE_CACHE.stats()[1])
+METRICS.register("htv_analytics_cache_entries", "Filter im Analyse-Cache", lambda: ANALYTICS.stats()[0])
+METRICS.register("htv_analytics_cache_bytes", "Bytes im Analyse-Cache", lambda: ANALYTICS.stats()[1])
+METRICS.register("htv_snapshot_version", "Version des geladenen Snapshots", lambda: SNAPSHOTS.current.version)
+METRICS.register("htv_dataset_votes", "Votes im geladenen Snapshot", lambda: len(SNAPSHOTS.current.votes))
+METRICS.register("htv_dataset_members", "Mitglieder in der Positionsmatrix", lambda: len(SNAPSHOTS.current.matrix.member_ids))
+METRICS.register("htv_dataset_member_votes", "Namentliche Stimmen im geladenen Snapshot",
+                 lambda: int(SNAPSHOTS.current.matrix.member_vote_counts.sum()))
+METRICS.register("htv_dataset_positions_bytes", "Größe der Positionsmatrix in Bytes",
+                 lambda: SNAPSHOTS.current.matrix.positions.nbytes)
+METRICS.register("htv_meps", "MEPs in der aktuellen Liste", lambda: len(MEPS.current.meps_list))
+METRICS.register("htv_live_subscriptions", "Socket.IO-Clients mit Live-Abonnement", lambda: len(LIVE_UPDATES.subscriptions))
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Metriken dieses Worker-Prozesses im Prometheus-Textformat."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/scrape_document")
@@ -0,0 +1,225 @@
+# shared_data.py
+"""Binärer, speicherabgebildeter Datenstand: schneller Start und gemeinsam genutzt von allen Workern.
+
+Die großen, nur lesend genutzten Teile eines Snapshots (Positionsmatrix,
+Vote-IDs, zeitliche Reihenfolge, Vote-Zusammenfassungen als Stringtabellen,
+Postings des Volltextindex) werden als .npy-Dateien in ein Verzeichnis je
+DB-Stand geschrieben (Schlüssel: Epoche und Änderungszähler von votes.db,
+siehe snapshot.snapshot_key). Jeder Worker bindet sie per
+``np.load(mmap_mode="r")`` ein; das Betriebssystem hält die Seiten nur einmal
+im Page-Cache, egal wie viele Worker sie lesen. Da die Dateien einen Neustart
+überdauern, entfällt beim nächsten Start das Parsen der Votes aus der DB.
+
+Ablauf: Der erste Worker, der einen neuen DB-Stand sieht, baut die Dateien
+unter einer Dateisperre in ein temporäres Verzeichnis und benennt es atomar
+um. Alle anderen Worker warten auf die Sperre und binden dann nur noch ein.
+Unlesbare oder veraltete Dateien werden verworfen und neu gebaut. Offline
+bauen: ``python snapshot.py build``.
+"""
+import fcntl
+import json
+import operator
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from search_index import SearchIndex
+
+BASE_DIR = Path(__file__).parent
+
+# Ablageort der Dateien (am besten auf tmpfs, z.B. /dev/shm/eu-votes)
+SHARED_DATA_DIR = Path(os.environ.get("SHARED_DATA_DIR", BASE_DIR / "shared_data"))
+# 0 = jeder Worker hält seine eigene Kopie im Speicher
+SHARED_DATA = os.environ.get("SHARED_DATA", "1") != "0"
+
+# Textspalten der Zusammenfassungen; result und geo_areas werden als JSON abgelegt
+TEXT_FIELDS = ["timestamp", "display_title", "description", "reference"]
+JSON_FIELDS = ["result", "geo_areas"]
+CHART_KEYS = ["FOR", "AGAINST", "ABSTENTION", "DID_NOT_VOTE"]
+# Bei Änderungen am Dateiformat erhöhen; alte Verzeichnisse werden dann neu gebaut
+FORMAT_VERSION = 1
+
+
+class StringTable:
+    """Stringspalte als UTF-8-Blob plus Offsets; Einträge werden erst beim Zugriff dekodiert."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @staticmethod
+    def encode(values):
+        """Liefert (offsets, blob) für eine Liste von Strings."""
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return offsets, blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+class VoteSummaries:
+    """Sequenz der Vote-Zusammenfassungen über speicherabgebildete Spalten.
+
+    Verhält sich wie die Liste aus ``load_vote_summaries``; jeder Zugriff baut
+    ein frisches Dict, die Spalten selbst werden nie kopiert.
+    """
+
+    def __init__(self, vote_ids, totals, tables):
+        self.vote_ids = vote_ids
+        self.totals = totals
+        self.tables = tables
+
+    def __len__(self):
+        return len(self.vote_ids)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._summary(i) for i in range(*idx.indices(len(self)))]
+        idx = operator.index(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self._summary(idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self._summary(idx)
+
+    def _summary(self, idx):
+        summary = {"id": int(self.vote_ids[idx])}
+        for field in TEXT_FIELDS:
+            summary[field] = self.tables[field][idx]
+        summary["result"] = json.loads(self.tables["result"][idx])
+        summary["geo_areas"] = json.loads(self.tables["geo_areas"][idx])
+        summary["chart_data"] = dict(zip(CHART_KEYS, self.totals[idx].tolist()))
+        return summary
+
+    def geo_areas_column(self):
+        """Nur die Geo-Gebiete aller Votes (für den Geo-Index, ohne die übrigen Felder zu dekodieren)."""
+        table = self.tables["geo_areas"]
+        return (json.loads(table[idx]) for idx in range(len(self)))
+
+
+def write_dataset(directory, matrix, search_index):
+    """Schreibt Arrays und Stringtabellen einer VoteMatrix samt Volltextindex als .npy-Dateien nach ``directory``."""
+    directory = Path(directory)
+    arrays = {
+        "vote_ids": np.asarray(matrix.vote_ids, dtype=np.int64),
+        "member_ids": np.asarray(matrix.member_ids, dtype=np.int64),
+        "positions": np.ascontiguousarray(matrix.positions, dtype=np.int8),
+        "time_order": np.asarray(matrix.time_order, dtype=np.int64),
+        "sorted_dates": np.asarray(matrix.sorted_dates, dtype="S10"),
+        "totals": np.asarray(
+            [[vote["chart_data"][key] for key in CHART_KEYS] for vote in matrix.votes], dtype=np.int32
+        ).reshape(len(matrix.votes), len(CHART_KEYS)),
+    }
+    columns = {field: [vote[field] for vote in matrix.votes] for field in TEXT_FIELDS}
+    for field in JSON_FIELDS:
+        columns[field] = [json.dumps(vote[field], ensure_ascii=False) for vote in matrix.votes]
+    for field, values in columns.items():
+        arrays[f"{field}.offsets"], arrays[f"{field}.blob"] = StringTable.encode(values)
+    # Vokabular: Tokens enthalten nur Wortzeichen, daher reicht ein Zeilenumbruch als Trenner
+    arrays["search.vocabulary"] = np.frombuffer("\n".join(search_index.vocabulary).encode("utf-8"), dtype=np.uint8)
+    arrays["search.indptr"], arrays["search.doc_ids"], arrays["search.weights"] = search_index.to_arrays()
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", array, allow_pickle=False)
+    # meta.json zuletzt: ein Verzeichnis ohne sie gilt als unvollständig
+    with open(directory / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"format": FORMAT_VERSION, "votes": len(matrix.votes), "members": len(matrix.member_ids)}, f)
+
+
+def open_dataset(directory):
+    """Bindet einen geschriebenen Datenstand ein; liefert die Arrays, die Zusammenfassungen und den Volltextindex."""
+    directory = Path(directory)
+    with open(directory / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{directory}: Format {meta.get('format')} statt {FORMAT_VERSION}")
+
+    def load(name):
+        return np.load(directory / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+
+    tables = {
+        field: StringTable(load(f"{field}.offsets"), load(f"{field}.blob"))
+        for field in TEXT_FIELDS + JSON_FIELDS
+    }
+    vote_ids = load("vote_ids")
+    if len(vote_ids) != meta["votes"]:
+        raise ValueError(f"{directory}: unvollständig")
+    votes = VoteSummaries(vote_ids, load("totals"), tables)
+    vocabulary_blob = load("search.vocabulary").tobytes().decode("utf-8")
+    return {
+        "votes": votes,
+        "vote_ids": vote_ids,
+        "member_ids": load("member_ids"),
+        "positions": load("positions"),
+        "time_order": load("time_order"),
+        "sorted_dates": load("sorted_dates"),
+        "search_index": SearchIndex.from_arrays(
+            votes,
+            vocabulary_blob.split("\n") if vocabulary_blob else [],
+            load("search.indptr"),
+            load("search.doc_ids"),
+            load("search.weights"),
+        ),
+    }
+
+
+@contextmanager
+def _build_lock(root):
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _remove_old_versions(root, keep):
+    # Unter Linux bleiben bereits eingebundene Dateien gültig, auch wenn sie gelöscht werden
+    for path in root.iterdir():
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def shared_dataset(key, build, root=SHARED_DATA_DIR):
+    """Gibt den eingebundenen Datenstand zu ``key`` zurück.
+
+    Fehlt er oder ist er unlesbar, wird er mit ``build()`` (→ VoteMatrix,
+    SearchIndex) neu gebaut.
+    """
+    root = Path(root)
+    target = root / key
+    try:
+        return open_dataset(target)
+    except (OSError, ValueError) as e:
+        if target.exists():
+            print(f"Binär-Snapshot {target} unbrauchbar ({e}), wird neu gebaut.")
+    with _build_lock(root):
+        # Ein anderer Worker kann ihn inzwischen gebaut haben
+        try:
+            return open_dataset(target)
+        except (OSError, ValueError):
+            shutil.rmtree(target, ignore_errors=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=root))
+        try:
+            write_dataset(tmp, *build())
+            os.rename(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        _remove_old_versions(root, keep=key)
+    return open_dataset(target)
@@ -0,0 +1,182 @@
+# snapshot.py
+"""Versionierter, unveränderlicher Datenstand des Servers mit Hot-Reload.
+
+Ein ``DataSnapshot`` bündelt alles, was die Routen brauchen: Vote-Zusammenfassungen,
+Positionsmatrix, Mitgliederverzeichnis, Volltextindex und Detail-Cache. Der
+``SnapshotManager`` baut bei Änderungen an votes.db im Hintergrund einen neuen
+Snapshot und tauscht ihn mit einer einzigen Zuweisung aus. Laufende Requests
+arbeiten auf ihrem alten Snapshot weiter. Änderungen erkennt der Watcher am
+Zähler in data_generation, den Trigger in jeder Schreibtransaktion hochzählen.
+Kamen seit dem Vorgänger nur Votes hinzu, werden nur diese aus der DB gelesen;
+nach UPDATE/DELETE wird der Snapshot vollständig neu aufgebaut.
+Die großen Arrays liegen in speicherabgebildeten Dateien, die sich alle
+uvicorn-Worker teilen (siehe shared_data.py).
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from search_index import SearchIndex
+from shared_data import FORMAT_VERSION, SHARED_DATA, SHARED_DATA_DIR, shared_dataset
+from vote_store import (
+    VoteMatrix, MemberRegistry, VoteDetailStore,
+    load_members, load_vote_summaries, load_member_positions,
+)
+
+# Prüfintervall des Hintergrund-Watchers in Sekunden (0 = kein Watcher)
+RELOAD_INTERVAL = float(os.environ.get("RELOAD_INTERVAL", "30"))
+
+
+def db_state(engine):
+    """Änderungsstand von votes.db: (Epoche, Generation, Umschreibungen, Anzahl Stimmen), siehe models.DataGeneration."""
+    with engine.connect() as conn:
+        epoch, generation, rewrites = conn.execute(
+            text("SELECT epoch, generation, rewrites FROM data_generation WHERE id = 1")).one()
+        facts = conn.execute(text("SELECT COUNT(*) FROM member_votes")).scalar()
+    return (epoch, generation, rewrites, facts)
+
+
+def appended_only(old, new):
+    """True, wenn sich zwischen zwei Ständen nur neue Zeilen ergeben haben (kein UPDATE/DELETE, gleiche DB)."""
+    return old[0] == new[0] and old[2] == new[2]
+
+
+def snapshot_key(state):
+    """Schlüssel des Binär-Snapshots (siehe shared_data.py) zu einem ``db_state``.
+
+    Jede Zeilenänderung zählt die Generation hoch (Trigger, siehe models.py), die
+    Epoche ändert sich mit einer neu angelegten DB; gleicher Schlüssel heißt also
+    gleicher Inhalt.
+    """
+    digest = hashlib.sha256(f"{FORMAT_VERSION}:{':'.join(map(str, state))}".encode())
+    return digest.hexdigest()[:20]
+
+
+class DataSnapshot:
+    """Unveränderlicher Datenstand; wird nach dem Aufbau nicht mehr verändert."""
+
+    def __init__(self, version, state, matrix, search_index, detail_store):
+        self.version = version
+        self.db_state = state
+        self.loaded_at = time.time()
+        self.matrix = matrix
+        self.votes = matrix.votes
+        self.registry = MemberRegistry(matrix)
+        self.search_index = search_index
+        self.detail_store = detail_store
+
+
+def build_snapshot(engine, previous=None, version=1):
+    """Baut einen neuen Snapshot; mit ``previous`` werden nur neue Votes aus der DB gelesen."""
+    state = db_state(engine)
+    members = load_members(engine)
+
+    def build():
+        with engine.connect() as conn:
+            db_ids = np.asarray([row[0] for row in conn.execute(text("SELECT id FROM votes ORDER BY id"))], dtype=np.int64)
+        matrix = None
+        # Geänderte oder gelöschte Zeilen (auch ersetzte Shards, Re-Importe) → vollständiger Neuaufbau
+        if previous is not None and appended_only(previous.db_state, state):
+            old = previous.matrix
+            new_ids = np.setdiff1d(db_ids, old.vote_ids, assume_unique=True)
+            new_facts = load_member_positions(engine, vote_ids=new_ids) if len(new_ids) else np.zeros((0, 3), np.int64)
+            # Neue Stimmen zu alten Votes ebenfalls
+            if state[3] - len(new_facts) == previous.db_state[3]:
+                matrix = old.extended(load_vote_summaries(engine, vote_ids=new_ids), members, new_facts)
+        if matrix is None:
+            matrix = VoteMatrix(load_vote_summaries(engine), members, load_member_positions(engine))
+        return matrix, SearchIndex(matrix.votes)
+
+    if SHARED_DATA:
+        # Binär-Snapshot zum DB-Inhalt einbinden; fehlt er, baut ihn der erste Worker
+        data = shared_dataset(snapshot_key(state), build)
+        search_index = data.pop("search_index")
+        matrix = VoteMatrix.from_arrays(members=members, **data)
+    else:
+        matrix, search_index = build()
+
+    return DataSnapshot(
+        version,
+        state,
+        matrix,
+        search_index,
+        VoteDetailStore(engine, members, matrix.vote_index),
+    )
+
+
+class SnapshotManager:
+    """Hält den aktuellen Snapshot und tauscht ihn bei DB-Änderungen atomar aus."""
+
+    def __init__(self, engine, interval=RELOAD_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.current = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self, force=False):
+        """Baut einen neuen Snapshot, falls sich die DB geändert hat; True, wenn getauscht wurde."""
+        with self._lock:
+            previous = self.current
+            if not force and previous is not None and db_state(self.engine) == previous.db_state:
+                return False
+            started = time.time()
+            version = previous.version + 1 if previous is not None else 1
+            snapshot = build_snapshot(self.engine, previous=None if force else previous, version=version)
+            # Atomarer Austausch: neue Requests sehen ab hier den neuen Stand
+            self.current = snapshot
+            print(f"Datenstand v{snapshot.version} geladen: {len(snapshot.votes)} Votes "
+                  f"in {time.time() - started:.2f}s")
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # Alter Snapshot bleibt aktiv; nächster Versuch im nächsten Intervall
+                print(f"Hot-Reload fehlgeschlagen: {e}")
+
+    def start_watcher(self):
+        """Startet den Hintergrund-Thread, der votes.db auf Änderungen prüft."""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baut den Binär-Snapshot (shared_data/) offline aus votes.db.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--db", default=str(Path(__file__).parent / "votes.db"), help="Pfad zur SQLite-DB")
+    parser.add_argument("--dir", default=str(SHARED_DATA_DIR), help="Zielverzeichnis")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    started = time.time()
+    key = snapshot_key(db_state(engine))
+    members = load_members(engine)
+
+    def build():
+        matrix = VoteMatrix(load_vote_summaries(engine), members, load_member_positions(engine))
+        return matrix, SearchIndex(matrix.votes)
+
+    shared_dataset(key, build, root=args.dir)
+    print(f"Binär-Snapshot {Path(args.dir) / key} bereit in {time.time() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
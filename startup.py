@@ -0,0 +1,122 @@
+# startup.py
+"""Startablauf des Servers als Phasen mit Abhängigkeiten (für den FastAPI-Lifespan).
+
+Der Import von server.py richtet nur Objekte ein; alles, was die DB oder
+Dateien liest, läuft als Phase in ``Startup.run``. Jede Phase wartet nur auf
+ihre Abhängigkeiten und läuft in einem eigenen Thread, unabhängige Phasen
+(z.B. Snapshot und MEP-Liste) also parallel. Die Dauer jeder Phase wird
+ausgegeben und ist über /readyz abrufbar.
+
+Der Lifespan startet den Ablauf im Hintergrund, damit der Port sofort offen
+ist. Bis alle Phasen fertig sind, beantwortet ``ReadinessGate`` alle Requests
+außer Health-Checks, Metriken und statischen Dateien mit 503 und Retry-After.
+Schlägt eine Phase fehl, bleibt es bei 503, aber mit dem Fehler und ohne
+Retry-After; /healthz meldet den Prozess dann als nicht lebendig, damit ein
+Supervisor ihn neu startet.
+"""
+import asyncio
+import json
+import time
+
+# Pfade, die schon vor dem Ende des Starts bedient werden
+ALWAYS_OPEN = ("/healthz", "/readyz", "/metrics", "/static/")
+RETRY_AFTER_SECONDS = 5
+
+
+class Startup:
+    """Führt Startphasen aus und merkt sich Dauer, Status und Fehler."""
+
+    def __init__(self):
+        self.phases = {}
+        self.ready = False
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+        self._task = None
+
+    def add(self, name, func, after=()):
+        """Phase ``name``: ``func()`` (blockierend) nach den Phasen ``after``."""
+        self.phases[name] = {"func": func, "after": tuple(after), "seconds": None, "status": "pending"}
+
+    async def _run_phase(self, name, tasks):
+        phase = self.phases[name]
+        await asyncio.gather(*(tasks[dep] for dep in phase["after"]))
+        phase["status"] = "running"
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(phase["func"])
+        except asyncio.CancelledError:
+            # Eine andere Phase ist fehlgeschlagen (der Thread läuft ggf. noch zu Ende)
+            phase["status"] = "cancelled"
+            raise
+        except Exception:
+            phase["status"] = "failed"
+            raise
+        finally:
+            phase["seconds"] = round(time.perf_counter() - started, 3)
+        phase["status"] = "done"
+        print(f"Start: {name} in {phase['seconds']:.2f}s")
+
+    async def run(self):
+        """Alle Phasen ausführen; ``ready`` wird gesetzt, wenn alle erfolgreich waren."""
+        self.started_at = time.perf_counter()
+        tasks = {}
+        # Phasen in Einfügereihenfolge anlegen; Abhängigkeiten müssen vorher hinzugefügt sein
+        for name in self.phases:
+            tasks[name] = asyncio.ensure_future(self._run_phase(name, tasks))
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception as e:
+            for task in tasks.values():
+                task.cancel()
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Start fehlgeschlagen: {self.error}")
+            return
+        self.seconds = round(time.perf_counter() - self.started_at, 3)
+        self.ready = True
+        print(f"Start abgeschlossen in {self.seconds:.2f}s")
+
+    def start(self, on_ready=None):
+        """Startet ``run`` im Hintergrund; ``on_ready()`` läuft danach im Event-Loop."""
+        async def run_and_notify():
+            await self.run()
+            if self.ready and on_ready is not None:
+                on_ready()
+
+        self._task = asyncio.get_running_loop().create_task(run_and_notify())
+        return self._task
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "seconds": self.seconds,
+            "phases": {name: {"status": p["status"], "seconds": p["seconds"]} for name, p in self.phases.items()},
+        }
+
+
+class ReadinessGate:
+    """ASGI-Middleware: 503 für HTTP-Requests, solange der Start nicht abgeschlossen ist."""
+
+    def __init__(self, app, startup):
+        self.app = app
+        self.startup = startup
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.startup.ready or scope["path"].startswith(ALWAYS_OPEN):
+            return await self.app(scope, receive, send)
+        headers = [(b"content-type", b"application/json")]
+        if self.startup.error:
+            # Ein erneuter Versuch hilft nicht, erst ein Neustart des Prozesses
+            error = f"Start fehlgeschlagen: {self.startup.error}"
+        else:
+            error = "Server startet noch."
+            headers.append((b"retry-after", str(RETRY_AFTER_SECONDS).encode()))
+        body = json.dumps({"error": error, "startup": self.startup.status()}).encode()
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,253 @@
+# synthetic_data.py
+"""Synthetischer Parlamentsdatensatz im Format von howtheyvote.eu.
+
+Erzeugt reproduzierbar (``--seed``) Votes mit namentlichen Stimmen,
+Statistiken je Fraktion und Land sowie Geo-Areas, dazu eine passende
+MEP-Liste. Damit lassen sich Import, Startzeit und alle Server-Pfade ohne den
+echten Harvest messen (siehe benchmark.py).
+
+Die Stimmen sind nicht rein zufällig: Jede Fraktion hat je Vote eine Linie,
+der ihre Mitglieder überwiegend folgen; ein Teil der Mitglieder stimmt nicht
+ab. So ergeben Analysen (Kohäsion, Ähnlichkeit) plausible Werte.
+
+Aufruf:
+
+    python synthetic_data.py [--votes N] [--members M] [--groups G] [--countries C]
+                             [--geo-areas A] [--seed S] [--dir DIR] [--db]
+
+Schreibt vote_data.json und meps_cache.json nach DIR; mit ``--db`` werden die
+Votes zusätzlich in DIR/votes.db importiert (sonst beim ersten Serverstart).
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from importer import import_json_file
+from models import Base
+
+BASE_DIR = Path(__file__).parent
+
+DEFAULT_VOTES = 2000
+DEFAULT_MEMBERS = 705
+DEFAULT_GROUPS = 8
+DEFAULT_COUNTRIES = 27
+DEFAULT_GEO_AREAS = 20
+DEFAULT_SEED = 1
+# Erste Vote-ID und erste Member-ID (Größenordnung wie bei howtheyvote.eu)
+FIRST_VOTE_ID = 100000
+FIRST_MEMBER_ID = 1000
+START_DATE = datetime(2019, 7, 15, 12, 0)
+
+GROUPS = [
+    ("EPP", "Group of the European People's Party", "EPP"),
+    ("SD", "Group of the Progressive Alliance of Socialists and Democrats", "S&D"),
+    ("RENEW", "Renew Europe Group", "Renew"),
+    ("GREEN_EFA", "Group of the Greens/European Free Alliance", "Greens/EFA"),
+    ("ECR", "European Conservatives and Reformists Group", "ECR"),
+    ("ID", "Identity and Democracy Group", "ID"),
+    ("GUE_NGL", "The Left group in the European Parliament", "The Left"),
+    ("NI", "Non-attached Members", "Non-attached"),
+]
+COUNTRIES = [
+    ("AUT", "AT", "Austria"), ("BEL", "BE", "Belgium"), ("BGR", "BG", "Bulgaria"), ("HRV", "HR", "Croatia"),
+    ("CYP", "CY", "Cyprus"), ("CZE", "CZ", "Czechia"), ("DNK", "DK", "Denmark"), ("EST", "EE", "Estonia"),
+    ("FIN", "FI", "Finland"), ("FRA", "FR", "France"), ("DEU", "DE", "Germany"), ("GRC", "GR", "Greece"),
+    ("HUN", "HU", "Hungary"), ("IRL", "IE", "Ireland"), ("ITA", "IT", "Italy"), ("LVA", "LV", "Latvia"),
+    ("LTU", "LT", "Lithuania"), ("LUX", "LU", "Luxembourg"), ("MLT", "MT", "Malta"), ("NLD", "NL", "Netherlands"),
+    ("POL", "PL", "Poland"), ("PRT", "PT", "Portugal"), ("ROU", "RO", "Romania"), ("SVK", "SK", "Slovakia"),
+    ("SVN", "SI", "Slovenia"), ("ESP", "ES", "Spain"), ("SWE", "SE", "Sweden"),
+]
+GEO_AREAS = [
+    ("UKR", "Ukraine"), ("RUS", "Russia"), ("BLR", "Belarus"), ("CHN", "China"), ("USA", "United States"),
+    ("GBR", "United Kingdom"), ("TUR", "Türkiye"), ("SRB", "Serbia"), ("GEO", "Georgia"), ("MDA", "Moldova"),
+    ("ISR", "Israel"), ("PSE", "Palestine"), ("IRN", "Iran"), ("AFG", "Afghanistan"), ("SYR", "Syria"),
+    ("VEN", "Venezuela"), ("NIC", "Nicaragua"), ("MMR", "Myanmar"), ("HKG", "Hong Kong"), ("TWN", "Taiwan"),
+]
+TOPICS = [
+    "energy", "climate", "migration", "budget", "agriculture", "fisheries", "digital services", "artificial intelligence",
+    "human rights", "rule of law", "trade", "transport", "health", "medicines", "data protection", "banking union",
+    "defence", "sanctions", "humanitarian aid", "gender equality", "cohesion policy", "research", "taxation",
+]
+TITLE_PATTERNS = [
+    "Resolution on {topic}",
+    "Regulation on {topic}",
+    "Directive on {topic}",
+    "Amendment to the proposal on {topic}",
+    "Situation in {area}",
+    "{topic} and relations with {area}",
+]
+FIRST_NAMES = ["Anna", "Marco", "Sofia", "Jan", "Marie", "Luca", "Eva", "Peter", "Elena", "Tomas", "Ines", "Mikael"]
+LAST_NAMES = ["Müller", "Rossi", "García", "Novak", "Dubois", "Nowak", "Jensen", "Silva", "Horvat", "Kovacs",
+              "Berg", "Papadopoulos", "Schmidt", "Costa", "Murphy", "Lindqvist"]
+POSITIONS = ("FOR", "AGAINST", "ABSTENTION", "DID_NOT_VOTE")
+# Wahrscheinlichkeit, mit der ein Mitglied der Fraktionslinie folgt bzw. nicht abstimmt
+FOLLOW_GROUP = 0.88
+ABSENT = 0.08
+
+
+def pad(entries, count, make):
+    """Erste ``count`` Einträge der Liste, bei Bedarf mit ``make(i)`` aufgefüllt."""
+    return entries[:count] + [make(i) for i in range(len(entries), count)]
+
+
+def make_members(rng, n_members, n_groups, n_countries):
+    groups = [{"code": c, "label": l, "short_label": s}
+              for c, l, s in pad(GROUPS, n_groups, lambda i: (f"G{i}", f"Group {i}", f"G{i}"))]
+    countries = [{"code": c, "iso_alpha_2": a, "label": l}
+                 for c, a, l in pad(COUNTRIES, n_countries, lambda i: (f"C{i:02d}", f"{i:02d}", f"Country {i}"))]
+    # Größere Fraktionen und Länder zuerst, damit die Verteilung ungleich ist wie im Parlament
+    group_weights = [1.0 / (i + 1) for i in range(len(groups))]
+    country_weights = [1.0 / (i + 2) for i in range(len(countries))]
+    members = []
+    for i in range(n_members):
+        member_id = FIRST_MEMBER_ID + i
+        first_name, last_name = rng.choice(FIRST_NAMES), f"{rng.choice(LAST_NAMES)}-{i}"
+        members.append({
+            "id": member_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "date_of_birth": f"{rng.randint(1950, 1995)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "country": rng.choices(countries, country_weights)[0],
+            "group": rng.choices(groups, group_weights)[0],
+            "photo_url": f"https://www.europarl.europa.eu/mepphoto/{member_id}.jpg",
+            "thumb_url": f"/api/static/mep-photos/{member_id}-104.jpg",
+            "email": f"{first_name.lower()}.{member_id}@europarl.europa.eu",
+            "facebook": None,
+            "twitter": None,
+        })
+    return members, groups, countries
+
+
+def make_vote(rng, vote_id, timestamp, members, groups, countries, geo_areas):
+    areas = rng.sample(geo_areas, min(len(geo_areas), rng.choice((0, 0, 0, 1, 1, 2))))
+    topic = rng.choice(TOPICS)
+    pattern = rng.choice(TITLE_PATTERNS if areas else TITLE_PATTERNS[:4])
+    title = pattern.format(topic=topic, area=areas[0]["label"] if areas else "")
+    title = title[0].upper() + title[1:]
+
+    # Linie je Fraktion, Mitglieder folgen ihr überwiegend
+    lines = {g["code"]: rng.choices(POSITIONS[:3], (0.55, 0.35, 0.10))[0] for g in groups}
+    member_votes = []
+    for m in members:
+        r = rng.random()
+        if r < ABSENT:
+            position = "DID_NOT_VOTE"
+        elif r < ABSENT + FOLLOW_GROUP:
+            position = lines[m["group"]["code"]]
+        else:
+            position = rng.choice(POSITIONS[:3])
+        member_votes.append({"member": m, "position": position})
+
+    total = dict.fromkeys(POSITIONS, 0)
+    by_group = {g["code"]: dict.fromkeys(POSITIONS, 0) for g in groups}
+    by_country = {c["code"]: dict.fromkeys(POSITIONS, 0) for c in countries}
+    for mv in member_votes:
+        position = mv["position"]
+        total[position] += 1
+        by_group[mv["member"]["group"]["code"]][position] += 1
+        by_country[mv["member"]["country"]["code"]][position] += 1
+    return {
+        "id": vote_id,
+        "timestamp": timestamp.isoformat(),
+        "display_title": title,
+        "description": f"{title}. Plenary vote {vote_id} on {topic}.",
+        "reference": f"A9-{vote_id % 10000:04d}/{timestamp.year}",
+        "geo_areas": areas,
+        "result": "ADOPTED" if total["FOR"] > total["AGAINST"] else "REJECTED",
+        "stats": {
+            "total": total,
+            "by_group": [{"group": g, "stats": by_group[g["code"]]} for g in groups],
+            "by_country": [{"country": c, "stats": by_country[c["code"]]} for c in countries],
+        },
+        "member_votes": member_votes,
+    }
+
+
+def generate_votes(n_votes=DEFAULT_VOTES, n_members=DEFAULT_MEMBERS, n_groups=DEFAULT_GROUPS,
+                   n_countries=DEFAULT_COUNTRIES, n_geo_areas=DEFAULT_GEO_AREAS, seed=DEFAULT_SEED):
+    """Gibt (Mitglieder, Generator der Votes) zurück; Votes in aufsteigender Zeitfolge."""
+    rng = random.Random(seed)
+    members, groups, countries = make_members(rng, n_members, n_groups, n_countries)
+    geo_areas = [{"code": c, "label": l}
+                 for c, l in pad(GEO_AREAS, n_geo_areas, lambda i: (f"A{i:02d}", f"Area {i}"))]
+
+    def votes():
+        timestamp = START_DATE
+        for i in range(n_votes):
+            # Mehrere Votes je Sitzungstag, dann ein paar Tage Pause
+            timestamp += timedelta(minutes=rng.randint(1, 5))
+            if rng.random() < 0.03:
+                timestamp = timestamp.replace(hour=12, minute=0) + timedelta(days=rng.randint(1, 10))
+            yield make_vote(rng, FIRST_VOTE_ID + i, timestamp, members, groups, countries, geo_areas)
+
+    return members, votes()
+
+
+def mep_entries(members):
+    """Einträge für meps_cache.json (Format wie ``mep_registry.parse_meps_xml``)."""
+    return [{
+        "id": m["id"],
+        "first_name": m["first_name"],
+        "last_name": m["last_name"],
+        "full_name": f"{m['first_name']} {m['last_name']}",
+        "country": m["country"]["label"],
+        "political_group": m["group"]["label"],
+        "birth_date": m["date_of_birth"],
+        "url": f"https://www.europarl.europa.eu/meps/en/{m['id']}",
+    } for m in members]
+
+
+def write_dataset(directory, import_db=False, **params):
+    """Schreibt vote_data.json und meps_cache.json (optional votes.db); gibt Kennzahlen zurück."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    members, votes = generate_votes(**params)
+    started = time.perf_counter()
+    count = 0
+    with open(directory / "vote_data.json", "w", encoding="utf-8") as f:
+        f.write("[")
+        for vote in votes:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(vote, ensure_ascii=False))
+            count += 1
+        f.write("\n]\n")
+    # fetched_at = jetzt, damit der Server die Liste nicht sofort neu lädt
+    with open(directory / "meps_cache.json", "w", encoding="utf-8") as f:
+        json.dump({"etag": None, "last_modified": None, "fetched_at": time.time(),
+                   "meps": mep_entries(members)}, f, ensure_ascii=False)
+    result = {"votes": count, "members": len(members), "generate_seconds": round(time.perf_counter() - started, 3)}
+    if import_db:
+        engine = create_engine(f"sqlite:///{directory / 'votes.db'}")
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        import_json_file(engine, directory / "vote_data.json")
+        engine.dispose()
+        result["import_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erzeugt einen synthetischen Datensatz im Format von howtheyvote.eu.")
+    parser.add_argument("--votes", type=int, default=DEFAULT_VOTES, help="Anzahl Votes")
+    parser.add_argument("--members", type=int, default=DEFAULT_MEMBERS, help="Anzahl MEPs")
+    parser.add_argument("--groups", type=int, default=DEFAULT_GROUPS, help="Anzahl Fraktionen")
+    parser.add_argument("--countries", type=int, default=DEFAULT_COUNTRIES, help="Anzahl Länder")
+    parser.add_argument("--geo-areas", type=int, default=DEFAULT_GEO_AREAS, help="Anzahl Geo-Areas")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--dir", default=str(BASE_DIR), help="Zielverzeichnis")
+    parser.add_argument("--db", action="store_true", help="Votes direkt in votes.db importieren")
+    args = parser.parse_args()
+
+    result = write_dataset(args.dir, import_db=args.db, n_votes=args.votes, n_members=args.members,
+                           n_groups=args.groups, n_countries=args.countries, n_geo_areas=args.geo_areas,
+                           seed=args.seed)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# tests/stand_in_server.py
+"""Lokaler Stand-in für howtheyvote.eu: Listenseiten und /api/votes/<id> aus vorbereiteten Votes.
+
+Dazu die MEP-Liste des Parlaments unter MEPS_PATH (XML mit ETag und
+Last-Modified, bedingte Anfragen bekommen ein 304).
+
+Fehlerantworten lassen sich je Pfad einplanen (z.B. zweimal 503, einmal 429,
+danach 200), um Retry und Backoff des Harvesters zu prüfen. Als Skript mit
+synthetischen Votes (siehe synthetic_data.py):
+
+    python tests/stand_in_server.py [--port 8799] [--votes 300] [--error-rate 0.1]
+
+danach ``python main.py --base-url http://127.0.0.1:8799``.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 20
+MEPS_PATH = "/meps/en/full-list/xml"
+
+
+class StandInServer:
+    """HTTP-Server in einem Hintergrund-Thread; ``base_url`` ist nach ``start()`` gesetzt."""
+
+    def __init__(self, votes, page_size=PAGE_SIZE, error_rate=0.0, seed=1):
+        self.votes = {int(v["id"]): v for v in votes}
+        self.ids = sorted(self.votes, reverse=True)
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.failures = defaultdict(deque)  # Pfad → Statuscodes, die vor dem Erfolg geliefert werden
+        self.requests = Counter()            # Pfad → Anzahl Anfragen
+        self.lock = threading.Lock()
+        self.meps_xml = None                 # (XML, ETag, Last-Modified), siehe set_meps
+        self.httpd = None
+        self.base_url = None
+
+    def set_meps(self, xml, etag=None, last_modified=None):
+        """XML-Liste, die unter MEPS_PATH ausgeliefert wird."""
+        self.meps_xml = (xml, etag, last_modified)
+
+    def fail(self, path, *statuses):
+        """Die nächsten Anfragen an ``path`` mit ``statuses`` beantworten (429 mit Retry-After: 0)."""
+        self.failures[path].extend(statuses)
+
+    def _planned_status(self, path):
+        with self.lock:
+            self.requests[path] += 1
+            if self.failures[path]:
+                return self.failures[path].popleft()
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 503
+        return None
+
+    def start(self, port=0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body, content_type="application/json", headers=()):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status = server._planned_status(url.path)
+                if status == 429:
+                    return self.send(429, "{}", headers=[("Retry-After", "0")])
+                if status:
+                    return self.send(status, "{}")
+                if url.path == "/votes":
+                    page = int(parse_qs(url.query).get("page", ["1"])[0])
+                    chunk = server.ids[(page - 1) * server.page_size:page * server.page_size]
+                    links = "".join(f'<a href="/votes/{vote_id}">Vote</a>' for vote_id in chunk)
+                    return self.send(200, f"<html><body>{links}</body></html>", "text/html")
+                if url.path == MEPS_PATH and server.meps_xml is not None:
+                    xml, etag, last_modified = server.meps_xml
+                    headers = [(name, value) for name, value in (("ETag", etag), ("Last-Modified", last_modified))
+                               if value]
+                    if (etag and self.headers.get("If-None-Match") == etag) or \
+                            (last_modified and self.headers.get("If-Modified-Since") == last_modified):
+                        self.send_response(304)
+                        for name, value in headers:
+                            self.send_header(name, value)
+                        self.end_headers()
+                        return
+                    return self.send(200, xml, "application/xml", headers)
+                if url.path.startswith("/api/votes/"):
+                    vote = server.votes.get(int(url.path.rsplit("/", 1)[1]))
+                    if vote is not None:
+                        return self.send(200, json.dumps(vote))
+                self.send(404, "{}")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        return self.base_url
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def main():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from synthetic_data import generate_votes
+
+    parser = argparse.ArgumentParser(description="Stand-in für howtheyvote.eu mit synthetischen Votes.")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--votes", type=int, default=300)
+    parser.add_argument("--members", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil zufälliger 503-Antworten")
+    args = parser.parse_args()
+
+    _, votes = generate_votes(n_votes=args.votes, n_members=args.members)
+    server = StandInServer(list(votes), error_rate=args.error_rate)
+    print(f"Stand-in läuft auf {server.start(args.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Harvester (main.py) gegen den lokalen Stand-in-Server: Retry/Backoff und batchweises Speichern."""
+import json
+
+import pytest
+import requests
+from sqlalchemy import create_engine, text
+
+import main
+from models import Base
+from stand_in_server import StandInServer
+from synthetic_data import generate_votes
+
+
+@pytest.fixture
+def votes():
+    _, generated = generate_votes(n_votes=25, n_members=30, n_geo_areas=5)
+    return list(generated)
+
+
+@pytest.fixture
+def server(votes):
+    server = StandInServer(votes, page_size=10)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Wartezeiten aufzeichnen statt zu schlafen."""
+    recorded = []
+    monkeypatch.setattr(main.time, "sleep", recorded.append)
+    return recorded
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'votes.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_fetch_retries_5xx_with_exponential_backoff(server, sleeps):
+    vote_id = server.ids[0]
+    server.fail(f"/api/votes/{vote_id}", 503, 502, 500)
+    response = main.fetch(requests.Session(), main.TokenBucket(0), f"{server.base_url}/api/votes/{vote_id}", backoff=0.5)
+    assert response.json()["id"] == vote_id
+    assert server.requests[f"/api/votes/{vote_id}"] == 4
+    assert len(sleeps) == 3
+    for attempt, wait in enumerate(sleeps):
+        # backoff * 2^attempt mit Jitter-Faktor 0.5 bis 1.5
+        assert 0.25 * 2 ** attempt <= wait <= 0.75 * 2 ** attempt
+
+
+def test_fetch_honours_retry_after_on_429(server, sleeps):
+    vote_id = server.ids[0]
+    server.fail(f"/api/votes/{vote_id}", 429)
+    response = main.fetch(requests.Session(), main.TokenBucket(0), f"{server.base_url}/api/votes/{vote_id}")
+    assert response.status_code == 200
+    assert sleeps == [0]
+
+
+def test_fetch_gives_up_after_retries(server, sleeps):
+    vote_id = server.ids[0]
+    server.fail(f"/api/votes/{vote_id}", *[503] * 5)
+    with pytest.raises(requests.HTTPError):
+        main.fetch(requests.Session(), main.TokenBucket(0), f"{server.base_url}/api/votes/{vote_id}", retries=2)
+    assert server.requests[f"/api/votes/{vote_id}"] == 3
+
+
+def test_fetch_returns_none_for_404(server, sleeps):
+    assert main.fetch(requests.Session(), main.TokenBucket(0), f"{server.base_url}/api/votes/1") is None
+    assert sleeps == []
+
+
+def test_harvest_flushes_in_batches(server, engine, tmp_path, sleeps, monkeypatch):
+    # Vorübergehende Fehler auf Listen- und Detailseiten werden wiederholt
+    server.fail("/votes", 503)
+    for vote_id in server.ids[:3]:
+        server.fail(f"/api/votes/{vote_id}", 429, 503)
+    batches = []
+    append_votes = main.append_votes
+
+    def recording_append(items, directory):
+        batches.append(len(items))
+        return append_votes(items, directory)
+
+    monkeypatch.setattr(main, "append_votes", recording_append)
+    dataset_dir = tmp_path / "dataset"
+    count = main.harvest(engine, base_url=server.base_url, concurrency=4, rate=0, batch_size=10,
+                         dataset_dir=dataset_dir)
+
+    assert count == 25
+    assert batches == [10, 10, 5]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM votes")).scalar() == 25
+        assert conn.execute(text("SELECT COUNT(*) FROM dataset_shards")).scalar() > 0
+    manifest = json.loads((dataset_dir / "manifest.json").read_text())
+    assert sorted(i for shard in manifest["shards"] for i in shard["vote_ids"]) == sorted(server.ids)
+
+    # Zweiter Lauf: nur bekannte IDs auf der ersten Listenseite, nichts Neues
+    assert main.harvest(engine, base_url=server.base_url, concurrency=4, rate=0, batch_size=10,
+                        dataset_dir=dataset_dir) == 0
+    assert batches == [10, 10, 5]
+
+
+def test_harvest_bounds_in_flight_requests(server, engine, tmp_path, sleeps, monkeypatch):
+    submitted = []
+    peaks = []
+
+    class CountingExecutor(main.ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(super().submit(fn, *args, **kwargs))
+            peaks.append(sum(not future.done() for future in submitted))
+            return submitted[-1]
+
+    monkeypatch.setattr(main, "ThreadPoolExecutor", CountingExecutor)
+    monkeypatch.setattr(main, "IN_FLIGHT_PER_WORKER", 2)
+    assert main.harvest(engine, base_url=server.base_url, concurrency=2, rate=0, batch_size=10,
+                        dataset_dir=tmp_path / "dataset") == 25
+    assert len(submitted) == 25
+    assert max(peaks) <= 2 * 2
@@ -0,0 +1,118 @@
+"""MEP-Liste (mep_registry.py) gegen die XML-Liste des Stand-in-Servers: Parsen, bedingter Abruf, Ausfälle, Cache."""
+import json
+
+import pytest
+
+import mep_registry
+from mep_registry import MepRegistry, parse_meps_xml
+from stand_in_server import MEPS_PATH, StandInServer
+
+ETAG = '"meps-v1"'
+LAST_MODIFIED = "Mon, 03 Jun 2024 08:00:00 GMT"
+
+
+def meps_xml(*names):
+    entries = "".join(
+        f"<mep><fullName>{name}</fullName><country>Malta</country><politicalGroup>Group {i % 2}</politicalGroup>"
+        f"<id>{1000 + i}</id><nationalPoliticalGroup>Partei</nationalPoliticalGroup></mep>"
+        for i, name in enumerate(names)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><meps>{entries}</meps>'
+
+
+@pytest.fixture
+def server():
+    server = StandInServer([])
+    server.set_meps(meps_xml("Anna Adam", "Bernd Bauer"), ETAG, LAST_MODIFIED)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def registry(server, tmp_path):
+    return MepRegistry(url=server.base_url + MEPS_PATH, cache_path=tmp_path / "meps_cache.json",
+                       interval=0, legacy_xml_path=None)
+
+
+def test_parse_meps_xml_reads_fields_in_one_pass():
+    meps = parse_meps_xml(meps_xml("Anna Adam", "Bernd Bauer"))
+    assert [m["id"] for m in meps] == [1000, 1001]
+    assert meps[1]["full_name"] == "Bernd Bauer"
+    assert meps[1]["political_group"] == "Group 1"
+    # Nicht gelieferte Felder sind leer, unbekannte werden ignoriert
+    assert meps[0]["birth_date"] == ""
+    assert "nationalPoliticalGroup" not in meps[0]
+
+
+def test_refresh_fetches_and_parses_once(server, registry, monkeypatch):
+    calls = []
+    monkeypatch.setattr(mep_registry, "parse_meps_xml", lambda data: calls.append(data) or parse_meps_xml(data))
+    assert registry.refresh() is True
+    assert server.requests[MEPS_PATH] == 1
+    assert len(calls) == 1
+    assert [m["name"] for m in registry.current.meps_list] == ["Anna Adam", "Bernd Bauer"]
+    assert registry.current.etag == ETAG
+    assert registry.current.last_modified == LAST_MODIFIED
+
+
+@pytest.mark.parametrize("etag, last_modified", [(ETAG, None), (None, LAST_MODIFIED)])
+def test_refresh_keeps_data_on_304(server, registry, monkeypatch, etag, last_modified):
+    server.set_meps(meps_xml("Anna Adam", "Bernd Bauer"), etag, last_modified)
+    registry.refresh()
+    before = registry.current
+    monkeypatch.setattr(mep_registry, "parse_meps_xml", lambda data: pytest.fail("304 darf nicht geparst werden"))
+    assert registry.refresh() is False
+    assert server.requests[MEPS_PATH] == 2
+    assert registry.current.meps == before.meps
+    assert registry.current.version == before.version
+    assert registry.current.generation == before.generation
+    assert registry.current.fetched_at >= before.fetched_at
+
+
+def test_refresh_counts_generations_only_on_content_changes(server, registry):
+    registry.refresh()
+    generation = registry.current.generation
+    # Neuer ETag, gleicher Inhalt: keine neue Generation
+    server.set_meps(meps_xml("Anna Adam", "Bernd Bauer"), '"meps-v2"', None)
+    assert registry.refresh() is False
+    assert registry.current.generation == generation
+    server.set_meps(meps_xml("Anna Adam"), '"meps-v3"', None)
+    assert registry.refresh() is True
+    assert registry.current.generation == generation + 1
+
+
+def test_refresh_keeps_stale_data_when_upstream_fails(server, registry):
+    registry.refresh()
+    before = registry.current
+    server.fail(MEPS_PATH, 503)
+    assert registry.refresh() is False
+    assert registry.current is before
+    # Quelle gar nicht erreichbar
+    registry.url = "http://127.0.0.1:1" + MEPS_PATH
+    assert registry.refresh() is False
+    assert registry.current is before
+    assert len(registry.current.meps) == 2
+
+
+def test_cold_start_reads_cache_without_network(server, registry, tmp_path):
+    registry.refresh()
+    cached = json.loads((tmp_path / "meps_cache.json").read_text(encoding="utf-8"))
+    assert cached["etag"] == ETAG
+    assert len(cached["meps"]) == 2
+
+    cold = MepRegistry(url=server.base_url + MEPS_PATH, cache_path=tmp_path / "meps_cache.json",
+                       interval=0, legacy_xml_path=None)
+    assert server.requests[MEPS_PATH] == 1
+    assert cold.current.version == registry.current.version
+    assert [m["name"] for m in cold.current.meps_list] == ["Anna Adam", "Bernd Bauer"]
+    # Der nächste Abruf ist bedingt und bestätigt den Cache
+    assert cold.refresh() is False
+    assert server.requests[MEPS_PATH] == 2
+
+
+def test_cold_start_without_cache_is_empty(server, tmp_path):
+    cold = MepRegistry(url=server.base_url + MEPS_PATH, cache_path=tmp_path / "missing.json",
+                       interval=0, legacy_xml_path=None)
+    assert cold.current.meps == []
+    assert server.requests[MEPS_PATH] == 0
@@ -0,0 +1,155 @@
+"""Antwort-Cache (response_cache.py): Versionswechsel, Byte-Grenze, ETag/304 und der Cache-Schlüssel des Servers."""
+import gzip
+import json
+
+from fastapi.responses import Response
+from starlette.requests import Request
+
+import server
+from mep_registry import MepData, MepRegistry
+from response_cache import ResponseCache, etag_matches
+
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def renderer(body, status_code=200):
+    """render()-Funktion, die ihre Aufrufe zählt."""
+    def render():
+        render.calls += 1
+        return Response(body, status_code=status_code, media_type="text/plain")
+    render.calls = 0
+    return render
+
+
+def test_respond_renders_once_per_key():
+    cache = ResponseCache()
+    render = renderer(b"hallo")
+    for _ in range(3):
+        response = cache.respond(make_request(), 1, "a", render)
+        assert response.body == b"hallo"
+    assert render.calls == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_respond_serves_gzip_when_accepted():
+    cache = ResponseCache()
+    response = cache.respond(make_request(accept_encoding="gzip, br"), 1, "a", renderer(b"hallo"))
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == b"hallo"
+
+
+def test_respond_does_not_cache_errors():
+    cache = ResponseCache()
+    render = renderer(b"fehlt", status_code=404)
+    cache.respond(make_request(), 1, "a", render)
+    cache.respond(make_request(), 1, "a", render)
+    assert render.calls == 2
+    assert cache.stats() == (0, 0)
+
+
+def test_if_none_match_returns_304():
+    cache = ResponseCache()
+    etag = cache.respond(make_request(), 1, "a", renderer(b"hallo")).headers["etag"]
+    for header in (etag, f"W/{etag}", f'"anderer", {etag}', "*"):
+        response = cache.respond(make_request(if_none_match=header), 1, "a", renderer(b"hallo"))
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == etag
+    response = cache.respond(make_request(if_none_match='"anderer"'), 1, "a", renderer(b"hallo"))
+    assert response.status_code == 200
+
+
+def test_etag_matches():
+    assert etag_matches('"x", W/"y"', '"y"')
+    assert not etag_matches('"x"', '"y"')
+    assert not etag_matches(None, '"y"')
+
+
+def test_newer_version_clears_cache():
+    cache = ResponseCache()
+    cache.respond(make_request(), 1, "a", renderer(b"alt"))
+    render = renderer(b"neu")
+    assert cache.respond(make_request(), 2, "a", render).body == b"neu"
+    assert render.calls == 1
+    assert cache.version == 2
+    assert cache.stats()[0] == 1
+
+
+def test_older_version_neither_clears_nor_fills_cache():
+    cache = ResponseCache()
+    cache.respond(make_request(), 2, "a", renderer(b"neu"))
+    # Ein Request, der noch auf dem alten Snapshot läuft
+    assert cache.respond(make_request(), 1, "b", renderer(b"alt")).body == b"alt"
+    assert cache.version == 2
+    assert cache.stats()[0] == 1
+    render = renderer(b"neu")
+    cache.respond(make_request(), 2, "a", render)
+    assert render.calls == 0
+
+
+def test_evicts_least_recently_used_beyond_max_bytes():
+    body = bytes(range(256)) * 4  # schlecht komprimierbar
+    size = len(gzip.compress(body, compresslevel=6))
+    cache = ResponseCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.respond(make_request(), 1, key, renderer(body))
+    cache.respond(make_request(), 1, "a", renderer(body))  # a ist jetzt zuletzt benutzt
+    cache.respond(make_request(), 1, "d", renderer(body))
+    assert cache.stats() == (3, 3 * size)
+    render = renderer(body)
+    cache.respond(make_request(), 1, "a", render)
+    cache.respond(make_request(), 1, "b", render)
+    assert render.calls == 1  # nur b wurde verdrängt
+
+
+def test_skips_entries_larger_than_the_cache():
+    cache = ResponseCache(max_bytes=10)
+    cache.respond(make_request(), 1, "a", renderer(bytes(range(256))))
+    assert cache.stats() == (0, 0)
+
+
+def mep_list(*names):
+    return [{"id": 1000 + i, "full_name": name, "first_name": "", "last_name": "", "country": "",
+             "political_group": "", "birth_date": "", "url": ""} for i, name in enumerate(names)]
+
+
+def write_meps_cache(path, meps):
+    path.write_text(json.dumps({"etag": None, "last_modified": None, "fetched_at": 0.0, "meps": meps}),
+                    encoding="utf-8")
+
+
+def test_mep_change_invalidates_even_if_checksum_sorts_lower(tmp_path, monkeypatch):
+    class Snapshot:
+        version = 7
+
+    old = mep_list("Anna Adam")
+    # Eine neue Liste, deren Prüfsumme kleiner ist als die alte
+    new = next(meps for meps in (mep_list("Anna Adam", f"MEP {i}") for i in range(100))
+               if MepData(meps).version < MepData(old).version)
+
+    cache_path = tmp_path / "meps_cache.json"
+    registry = MepRegistry(cache_path=cache_path, interval=0, legacy_xml_path=None, load=False)
+    monkeypatch.setattr(server, "MEPS", registry)
+    cache = ResponseCache()
+    write_meps_cache(cache_path, old)
+    registry.load()
+    old_version = server.cache_version(Snapshot)
+    cache.respond(make_request(), old_version, "meps", renderer(b"OLD MEP LIST"))
+
+    write_meps_cache(cache_path, new)
+    registry.load()
+    new_version = server.cache_version(Snapshot)
+    assert new_version > old_version
+    assert cache.respond(make_request(), new_version, "meps", renderer(b"NEW MEP LIST")).body == b"NEW MEP LIST"
+    assert cache.version == new_version
+    # Der neue Stand wird auch wieder gecacht
+    render = renderer(b"NEW MEP LIST")
+    cache.respond(make_request(), new_version, "meps", render)
+    assert render.calls == 0
@@ -0,0 +1,69 @@
+"""Startablauf (startup.py) im Server: Readiness-Gate, /readyz und /healthz vor, nach und bei fehlgeschlagenem Start."""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from startup import Startup
+
+
+def fail():
+    raise RuntimeError("votes.db kaputt")
+
+
+@pytest.fixture
+def startup(monkeypatch):
+    """Ersetzt die Startphasen des Servers (das Gate hält dasselbe Startup-Objekt)."""
+    for name, value in Startup().__dict__.items():
+        monkeypatch.setattr(server.STARTUP, name, value)
+    return server.STARTUP
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Zeitüberschreitung"
+        time.sleep(0.01)
+
+
+def test_failed_phase_is_reported_and_not_retried(startup):
+    startup.add("schema", lambda: None)
+    startup.add("import", fail, after=["schema"])
+    startup.add("snapshot", lambda: None, after=["import"])
+    with TestClient(server.app) as client:
+        wait_for(lambda: startup.error is not None)
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        status = response.json()
+        assert status["ready"] is False
+        assert status["error"] == "RuntimeError: votes.db kaputt"
+        assert status["phases"]["schema"]["status"] == "done"
+        assert status["phases"]["import"]["status"] == "failed"
+        assert status["phases"]["snapshot"]["status"] != "done"
+
+        response = client.get("/votes/html")
+        assert response.status_code == 503
+        assert "retry-after" not in response.headers
+        assert response.json()["error"] == "Start fehlgeschlagen: RuntimeError: votes.db kaputt"
+
+        response = client.get("/healthz")
+        assert response.status_code == 503
+        assert response.json()["status"] == "failed"
+
+
+def test_gate_asks_to_retry_while_starting(startup):
+    release = threading.Event()
+    # Endet mit einem Fehler, damit nach dem Test keine Watcher gestartet werden
+    startup.add("snapshot", lambda: release.wait(5) and fail())
+    with TestClient(server.app) as client:
+        try:
+            response = client.get("/votes/html")
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "5"
+            assert response.json()["error"] == "Server startet noch."
+            assert client.get("/readyz").status_code == 503
+            assert client.get("/healthz").status_code == 200
+        finally:
+            release.set()
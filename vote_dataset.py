@@ -0,0 +1,305 @@
+# vote_dataset.py
+"""Append-only-Datensatz der Votes: gzip-komprimierte NDJSON-Shards je Monat mit Manifest.
+
+Layout von DATASET_DIR::
+
+    manifest.json
+    votes-2024-03-000007.ndjson.gz    (Monat des Zeitstempels, laufende Shard-Nummer)
+
+Ein Shard wird einmal geschrieben (temporär, dann umbenannt) und danach nicht
+mehr verändert; neue Votes eines Monats landen in einem weiteren Shard.
+manifest.json wird atomar ersetzt und listet je Shard Datei, Monat, Anzahl,
+SHA-256 und Vote-IDs, dazu die Hochwassermarke (höchste Vote-ID, neuester
+Zeitstempel, letzte Shard-Nummer). Anhängen und Importieren sind per
+Dateisperre serialisiert.
+
+Import: Die Tabelle dataset_shards merkt sich, welche Shards mit welcher
+Prüfsumme in der DB sind. Unveränderte Shards werden übersprungen, neue
+importiert; ein geänderter Shard ersetzt die Votes seiner alten Fassung
+(danach werden die Rollups neu aufgebaut). Worker-Prozesse lesen die Shards
+und zerlegen sie in Tabellenzeilen, geschrieben wird im Hauptprozess, eine
+Transaktion je Shard. Der Speicherbedarf ist durch Worker × Shard-Größe
+begrenzt, nicht durch die Größe des Datensatzes.
+
+Aufruf:
+
+    python vote_dataset.py import [--db votes.db] [--dir dataset] [--workers N]
+    python vote_dataset.py convert vote_data.json [--dir dataset]
+    python vote_dataset.py status [--dir dataset]
+"""
+import argparse
+import fcntl
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from importer import BATCH_SIZE, batch_rows, bulk_load, delete_votes, iter_json_array, write_rows
+from migrate_db import ensure_schema
+from rollups import rebuild_rollups
+
+BASE_DIR = Path(__file__).parent
+
+DATASET_DIR = Path(os.environ.get("DATASET_DIR", BASE_DIR / "dataset"))
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+GZIP_LEVEL = 6
+# Worker-Prozesse für den Import (1 = im eigenen Prozess)
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Votes je Shard beim Konvertieren einer großen vote_data.json (begrenzt den Puffer)
+CONVERT_CHUNK_SIZE = 2000
+
+
+def empty_manifest():
+    return {
+        "format": FORMAT_VERSION,
+        "high_water_mark": {"vote_id": None, "timestamp": None, "sequence": 0},
+        "shards": [],
+    }
+
+
+def load_manifest(directory=DATASET_DIR):
+    """Manifest des Datensatzes; leer, wenn noch keins existiert."""
+    try:
+        with open(Path(directory) / MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unbekanntes Datensatz-Format: {manifest.get('format')}")
+    return manifest
+
+
+def has_dataset(directory=DATASET_DIR):
+    return (Path(directory) / MANIFEST_NAME).exists()
+
+
+def known_vote_ids(directory=DATASET_DIR):
+    """Alle Vote-IDs im Datensatz (aus dem Manifest, ohne die Shards zu lesen)."""
+    return {vote_id for shard in load_manifest(directory)["shards"] for vote_id in shard["vote_ids"]}
+
+
+def _write_manifest(directory, manifest):
+    tmp = Path(directory) / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, Path(directory) / MANIFEST_NAME)
+
+
+@contextmanager
+def _dataset_lock(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def shard_month(vote):
+    return (vote.get("timestamp") or "")[:7] or "unknown"
+
+
+def append_votes(votes, directory=DATASET_DIR):
+    """Hängt die noch nicht enthaltenen Votes als neue Shards (einer je Monat) an; gibt deren Manifest-Einträge zurück."""
+    directory = Path(directory)
+    with _dataset_lock(directory):
+        manifest = load_manifest(directory)
+        known = {vote_id for shard in manifest["shards"] for vote_id in shard["vote_ids"]}
+        by_month = {}
+        for vote in votes:
+            vote_id = int(vote["id"])
+            if vote_id in known:
+                continue
+            known.add(vote_id)
+            by_month.setdefault(shard_month(vote), []).append(vote)
+        if not by_month:
+            return []
+
+        mark = manifest["high_water_mark"]
+        added = []
+        for month, month_votes in sorted(by_month.items()):
+            month_votes.sort(key=lambda v: int(v["id"]))
+            mark["sequence"] += 1
+            name = f"votes-{month}-{mark['sequence']:06d}.ndjson.gz"
+            lines = "".join(json.dumps(v, ensure_ascii=False, separators=(",", ":")) + "\n" for v in month_votes)
+            data = gzip.compress(lines.encode("utf-8"), compresslevel=GZIP_LEVEL, mtime=0)
+            tmp = directory / (name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, directory / name)
+            shard = {
+                "file": name,
+                "month": month,
+                "votes": len(month_votes),
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "vote_ids": [int(v["id"]) for v in month_votes],
+            }
+            manifest["shards"].append(shard)
+            added.append(shard)
+            timestamps = [v["timestamp"] for v in month_votes if v.get("timestamp")]
+            mark["vote_id"] = max([mark["vote_id"] or 0] + shard["vote_ids"])
+            if timestamps:
+                mark["timestamp"] = max(filter(None, [mark["timestamp"], max(timestamps)]))
+        # Das Manifest zuletzt: Shards ohne Eintrag werden ignoriert und beim nächsten Mal überschrieben
+        _write_manifest(directory, manifest)
+        return added
+
+
+def read_shard(path, sha256, batch_size=BATCH_SIZE, skip_ids=()):
+    """Liest einen Shard, prüft die Prüfsumme und gibt die Zeilen je Batch zurück (läuft im Worker-Prozess)."""
+    data = Path(path).read_bytes()
+    if hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"{path}: Prüfsumme passt nicht zum Manifest")
+    skip_ids = set(skip_ids)
+    votes = [vote for vote in map(json.loads, gzip.decompress(data).splitlines())
+             if int(vote["id"]) not in skip_ids]
+    return [batch_rows(votes[start:start + batch_size]) for start in range(0, len(votes), batch_size)]
+
+
+def imported_shards(engine):
+    """Datei → (Prüfsumme, Vote-IDs) der bereits importierten Shards."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT file, sha256, vote_ids FROM dataset_shards")).fetchall()
+    return {file: (sha256, json.loads(vote_ids)) for file, sha256, vote_ids in rows}
+
+
+def ids_in_db(engine, vote_ids):
+    found = set()
+    vote_ids = list(vote_ids)
+    with engine.connect() as conn:
+        for start in range(0, len(vote_ids), 500):
+            chunk = vote_ids[start:start + 500]
+            params = {f"id{i}": v for i, v in enumerate(chunk)}
+            sql = f"SELECT id FROM votes WHERE id IN ({', '.join(':' + k for k in params)})"
+            found.update(row[0] for row in conn.execute(text(sql), params))
+    return found
+
+
+def import_dataset(engine, directory=DATASET_DIR, workers=DEFAULT_WORKERS, batch_size=BATCH_SIZE, progress=print):
+    """Importiert neue und geänderte Shards in die DB; gibt die Anzahl importierter Votes zurück."""
+    directory = Path(directory)
+    started = time.time()
+    with _dataset_lock(directory):
+        manifest = load_manifest(directory)
+        imported = imported_shards(engine)
+        todo = [s for s in manifest["shards"] if imported.get(s["file"], (None,))[0] != s["sha256"]]
+        if not todo:
+            return 0
+        replaced = any(s["file"] in imported for s in todo)
+
+        def skip_ids(shard):
+            # Schon in der DB (z.B. aus einer früheren vote_data.json), aber nicht über diesen Shard
+            previous = set(imported.get(shard["file"], (None, []))[1])
+            return sorted(ids_in_db(engine, shard["vote_ids"]) - previous)
+
+        pool = None
+        if workers > 1 and len(todo) > 1:
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        count = 0
+        try:
+            pending = deque()
+            shards = iter(todo)
+
+            def submit():
+                shard = next(shards, None)
+                if shard is None:
+                    return
+                args = (directory / shard["file"], shard["sha256"], batch_size, skip_ids(shard))
+                pending.append((shard, pool.submit(read_shard, *args) if pool else args))
+
+            # Höchstens workers + 1 Shards gleichzeitig im Speicher; geschrieben wird in Manifest-Reihenfolge
+            for _ in range(workers + 1):
+                submit()
+            with bulk_load(engine) as conn:
+                while pending:
+                    shard, job = pending.popleft()
+                    batches = job.result() if pool else read_shard(*job)
+                    submit()
+                    if shard["file"] in imported:
+                        delete_votes(conn, imported[shard["file"]][1])
+                    for batch in batches:
+                        write_rows(conn, batch)
+                    conn.execute(text("INSERT OR REPLACE INTO dataset_shards (file, sha256, votes, vote_ids, imported_at) "
+                                      "VALUES (:file, :sha256, :votes, :vote_ids, :imported_at)"),
+                                 {"file": shard["file"], "sha256": shard["sha256"], "votes": shard["votes"],
+                                  "vote_ids": json.dumps(shard["vote_ids"]), "imported_at": time.time()})
+                    conn.commit()
+                    count += sum(len(batch["votes"]) for batch in batches)
+                    if progress:
+                        progress(f"Import: {shard['file']} ({count} Votes, {count / (time.time() - started):.0f}/s)")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if replaced:
+            # Rollups sind additiv; nach dem Ersetzen von Votes einmal neu aufbauen
+            rebuild_rollups(engine)
+    if progress:
+        progress(f"Import abgeschlossen: {len(todo)} Shards, {count} Votes in {time.time() - started:.1f}s")
+    return count
+
+
+def convert_json_file(path, directory=DATASET_DIR, chunk_size=CONVERT_CHUNK_SIZE):
+    """Übernimmt eine vote_data.json streamend in den Datensatz; gibt die Anzahl neuer Shards zurück."""
+    added = 0
+    chunk = []
+    for vote in iter_json_array(path):
+        chunk.append(vote)
+        if len(chunk) >= chunk_size:
+            added += len(append_votes(chunk, directory))
+            chunk = []
+    if chunk:
+        added += len(append_votes(chunk, directory))
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NDJSON-Datensatz der Votes verwalten.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Neue und geänderte Shards in die DB importieren")
+    import_parser.add_argument("--db", default=str(BASE_DIR / "votes.db"), help="Pfad zur SQLite-DB")
+    import_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker-Prozesse")
+    convert_parser = commands.add_parser("convert", help="vote_data.json in Shards übernehmen")
+    convert_parser.add_argument("json", help="Pfad zur vote_data.json")
+    status_parser = commands.add_parser("status", help="Manifest zusammenfassen")
+    for sub in (import_parser, convert_parser, status_parser):
+        sub.add_argument("--dir", default=str(DATASET_DIR), help="Datensatz-Verzeichnis")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        engine = create_engine(f"sqlite:///{args.db}")
+        try:
+            ensure_schema(engine)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        import_dataset(engine, args.dir, workers=args.workers)
+        engine.dispose()
+    elif args.command == "convert":
+        print(f"{convert_json_file(args.json, args.dir)} Shards angelegt.")
+    else:
+        manifest = load_manifest(args.dir)
+        print(json.dumps({
+            "shards": len(manifest["shards"]),
+            "votes": sum(s["votes"] for s in manifest["shards"]),
+            "bytes": sum(s["bytes"] for s in manifest["shards"]),
+            "high_water_mark": manifest["high_water_mark"],
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+# vote_store.py
+"""Spaltenorientierter In-Memory-Speicher für die Abstimmungsdaten.
+
+Im Speicher liegen nur schlanke Zusammenfassungen je Vote (für die
+Listenansichten), eine kompakte Positionsmatrix (vote_idx × member_idx) und
+die Mitglieder-Dimension. Die vollständigen Vote-Details inklusive aller
+member_votes werden bei Bedarf aus SQLite geladen und in einem LRU-Cache
+gehalten (``VoteDetailStore``).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+import numpy as np
+from sqlalchemy import text
+
+from models import POSITION_CODES, POSITION_NAMES
+
+# Positionen in der Matrix wie in member_votes.position_code; 0 = kein Eintrag für dieses Mitglied
+NO_ENTRY = 0
+
+# Größe des Detail-Caches (Anzahl Votes bzw. geschätzte Bytes), per Umgebungsvariable anpassbar
+DETAIL_CACHE_SIZE = int(os.environ.get("DETAIL_CACHE_SIZE", "256"))
+DETAIL_CACHE_BYTES = int(os.environ.get("DETAIL_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+SUMMARY_SQL = """
+    SELECT v.id, v.timestamp, v.display_title, v.description, v.reference, v.position,
+           json_extract(v.raw_json, '$.geo_areas'),
+           s.total_for, s.total_against, s.total_abstention, s.total_did_not_vote
+    FROM votes v LEFT JOIN stats s ON s.vote_id = v.id
+"""
+
+# Maximale Anzahl IDs pro IN-Liste (SQLite-Parametergrenze)
+ID_CHUNK_SIZE = 500
+
+
+def _id_chunks(vote_ids):
+    vote_ids = [int(v) for v in vote_ids]
+    for start in range(0, len(vote_ids), ID_CHUNK_SIZE):
+        yield vote_ids[start:start + ID_CHUNK_SIZE]
+
+
+def load_members(engine):
+    """Lädt die Mitglieder-Dimension als {id: Member-Dict} (sortiert nach ID).
+
+    Fraktions- und Länder-Dicts werden interniert, d.h. alle Mitglieder einer
+    Fraktion teilen sich ein Objekt. Die Dicts dürfen nicht verändert werden.
+    """
+    interned = {}
+
+    def shared(d):
+        return interned.setdefault(tuple(d.items()), d)
+
+    members = {}
+    with engine.connect() as conn:
+        for row in conn.execute(text("SELECT * FROM members ORDER BY id")).mappings():
+            members[row["id"]] = {
+                "id": row["id"],
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "date_of_birth": row["date_of_birth"],
+                "country": shared({
+                    "code": row["country_code"],
+                    "iso_alpha_2": row["country_iso_alpha_2"],
+                    "label": row["country_label"],
+                }),
+                "group": shared({
+                    "code": row["group_code"],
+                    "label": row["group_label"],
+                    "short_label": row["group_short_label"],
+                }),
+                "photo_url": row["photo_url"],
+                "thumb_url": row["thumb_url"],
+                "email": row["email"],
+                "facebook": row["facebook"],
+                "twitter": row["twitter"],
+            }
+    return members
+
+
+def summary_from_row(row):
+    """Baut die schlanke Vote-Zusammenfassung aus einer Zeile von SUMMARY_SQL."""
+    vote_id, timestamp, title, description, reference, result, geo_json, t_for, t_against, t_abst, t_dnv = row
+    return {
+        "id": vote_id,
+        "timestamp": timestamp or "",
+        "display_title": title or "",
+        "description": description or "",
+        "reference": reference or "",
+        "result": result,
+        "geo_areas": json.loads(geo_json) if geo_json else [],
+        "chart_data": {
+            "FOR": t_for or 0,
+            "AGAINST": t_against or 0,
+            "ABSTENTION": t_abst or 0,
+            "DID_NOT_VOTE": t_dnv or 0,
+        },
+    }
+
+
+def load_vote_summaries(engine, vote_ids=None):
+    """Lädt die Zusammenfassungen aller (bzw. der angegebenen) Votes ohne member_votes, sortiert nach ID."""
+    with engine.connect() as conn:
+        if vote_ids is None:
+            return [summary_from_row(row) for row in conn.execute(text(SUMMARY_SQL + " ORDER BY v.id"))]
+        summaries = []
+        for chunk in _id_chunks(vote_ids):
+            placeholders = ", ".join(str(v) for v in chunk)
+            rows = conn.execute(text(SUMMARY_SQL + f" WHERE v.id IN ({placeholders})"))
+            summaries.extend(summary_from_row(row) for row in rows)
+    summaries.sort(key=lambda v: v["id"])
+    return summaries
+
+
+def load_member_positions(engine, vote_ids=None):
+    """Lädt alle (bzw. die zu vote_ids gehörenden) (vote_id, member_id, position_code)-Tripel als Array (n, 3)."""
+    sql = "SELECT vote_id, member_id, position_code FROM member_votes"
+    with engine.connect() as conn:
+        if vote_ids is None:
+            rows = conn.exec_driver_sql(sql).fetchall()
+        else:
+            rows = []
+            for chunk in _id_chunks(vote_ids):
+                placeholders = ", ".join(str(v) for v in chunk)
+                rows.extend(conn.exec_driver_sql(f"{sql} WHERE vote_id IN ({placeholders})").fetchall())
+    if not rows:
+        return np.zeros((0, 3), dtype=np.int64)
+    return np.asarray(rows, dtype=np.int64)
+
+
+class SortedIdIndex:
+    """Mapping ID → Zeilenindex über ein aufsteigend sortiertes ID-Array (Binärsuche, kein Dict)."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def get(self, vote_id, default=None):
+        pos = int(np.searchsorted(self.ids, vote_id))
+        if pos < len(self.ids) and self.ids[pos] == vote_id:
+            return pos
+        return default
+
+    def __contains__(self, vote_id):
+        return self.get(vote_id) is not None
+
+    def __getitem__(self, vote_id):
+        pos = self.get(vote_id)
+        if pos is None:
+            raise KeyError(vote_id)
+        return pos
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class VoteMatrix:
+    """Int8-Positionsmatrix plus Vote- und Mitglieder-Dimension.
+
+    Zeilen entsprechen der Reihenfolge der übergebenen Vote-Liste (nach ID
+    sortiert), Spalten der Reihenfolge der Mitglieder-Dimension. ``votes``
+    kann eine Liste von Dicts oder eine gleichwertige Sequenz sein (z.B. die
+    speicherabgebildeten Zusammenfassungen aus shared_data.py).
+    """
+
+    def __init__(self, votes, members, facts):
+        vote_ids = np.fromiter((int(v["id"]) for v in votes), dtype=np.int64, count=len(votes))
+        member_ids = np.fromiter(members.keys(), dtype=np.int64, count=len(members))
+
+        # Positionsmatrix vektorisiert aus den Fakten befüllen (IDs → Zeilen/Spalten per Binärsuche)
+        positions = np.zeros((len(votes), len(members)), dtype=np.int8)
+        if len(facts) and len(votes) and len(members):
+            rows = np.searchsorted(vote_ids, facts[:, 0])
+            cols = np.searchsorted(member_ids, facts[:, 1])
+            rows_ok = rows < len(vote_ids)
+            cols_ok = cols < len(member_ids)
+            valid = rows_ok & cols_ok
+            valid[valid] &= vote_ids[rows[valid]] == facts[valid, 0]
+            valid[valid] &= member_ids[cols[valid]] == facts[valid, 1]
+            positions[rows[valid], cols[valid]] = facts[valid, 2].astype(np.int8)
+
+        self._setup(votes, members, vote_ids, member_ids, positions)
+
+    @classmethod
+    def from_arrays(cls, votes, members, vote_ids, member_ids, positions, time_order=None, sorted_dates=None):
+        """Matrix aus fertigen (z.B. speicherabgebildeten) Arrays, ohne sie zu kopieren."""
+        matrix = cls.__new__(cls)
+        matrix._setup(votes, members, vote_ids, member_ids, positions, time_order, sorted_dates)
+        return matrix
+
+    def _setup(self, votes, members, vote_ids, member_ids, positions, time_order=None, sorted_dates=None):
+        # Vote-Dimension
+        self.votes = votes
+        self.vote_ids = vote_ids
+        self.vote_index = SortedIdIndex(vote_ids)
+        # Zeitliche Reihenfolge: time_order[k] = Zeilenindex des k-ältesten Votes,
+        # time_rank[idx] = Position eines Votes in dieser Reihenfolge
+        if time_order is None:
+            timestamps = np.array([v["timestamp"] for v in votes], dtype=object)
+            time_order = np.argsort(timestamps, kind="stable") if len(votes) else np.zeros(0, dtype=np.int64)
+        self.time_order = time_order
+        self.time_rank = np.empty(len(votes), dtype=np.int64)
+        self.time_rank[self.time_order] = np.arange(len(votes))
+        # Datumsanteil (YYYY-MM-DD) in zeitlicher Reihenfolge, für Bereichsabfragen per Binärsuche
+        if sorted_dates is None:
+            sorted_dates = np.array([votes[int(i)]["timestamp"][:10].encode() for i in time_order], dtype="S10")
+        self.sorted_dates = sorted_dates
+
+        # Geo-Index: Label → aufsteigend sortierte Zeilenindizes
+        geo_rows = {}
+        for idx, geo_areas in enumerate(self._geo_areas(votes)):
+            for ga in geo_areas:
+                label = ga.get("label")
+                if label:
+                    geo_rows.setdefault(label, []).append(idx)
+        self.geo_index = {label: np.asarray(rows, dtype=np.int64) for label, rows in geo_rows.items()}
+        self.geo_options = [{"code": label, "label": label} for label in sorted(self.geo_index)]
+
+        # Mitglieder-Dimension (Profile aus der DB, Reihenfolge wie die Matrixspalten)
+        self.member_ids = member_ids
+        self.member_profiles = [members.get(int(m_id)) or {"id": int(m_id)} for m_id in member_ids]
+        self.member_index = {int(m_id): col for col, m_id in enumerate(member_ids)}
+
+        self.positions = positions
+        # Anzahl Votes mit Eintrag je Mitglied
+        self.member_vote_counts = np.count_nonzero(self.positions, axis=0)
+
+    @staticmethod
+    def _geo_areas(votes):
+        geo_column = getattr(votes, "geo_areas_column", None)
+        if geo_column is not None:
+            return geo_column()
+        return (vote.get("geo_areas", []) for vote in votes)
+
+    def extended(self, new_votes, members, new_facts):
+        """Neue Matrix mit zusätzlichen Votes (und ggf. neuen Mitgliedern).
+
+        Nur die Fakten der neuen Votes werden übergeben; die bisherigen Zeilen
+        werden blockweise aus dieser Matrix übernommen. Die alte Matrix bleibt
+        unverändert.
+        """
+        votes = sorted(list(self.votes) + list(new_votes), key=lambda v: v["id"])
+        matrix = VoteMatrix(votes, members, new_facts)
+        rows = np.searchsorted(matrix.vote_ids, self.vote_ids)
+        cols = np.searchsorted(matrix.member_ids, self.member_ids)
+        # Mitglieder, die es nicht mehr gibt, fallen weg
+        keep = cols < len(matrix.member_ids)
+        keep[keep] &= matrix.member_ids[cols[keep]] == self.member_ids[keep]
+        if len(rows) and keep.any():
+            matrix.positions[np.ix_(rows, cols[keep])] = self.positions[:, keep]
+        matrix.member_vote_counts = np.count_nonzero(matrix.positions, axis=0)
+        return matrix
+
+    def time_slice(self, start_date=None, end_date=None):
+        """Grenzen (lo, hi) in time_order für Votes mit start_date <= Datum <= end_date (ISO-Daten)."""
+        lo = int(np.searchsorted(self.sorted_dates, start_date.encode(), "left")) if start_date else 0
+        hi = int(np.searchsorted(self.sorted_dates, end_date.encode(), "right")) if end_date else len(self.sorted_dates)
+        return lo, max(lo, hi)
+
+    def rows_in_date_range(self, start_date=None, end_date=None):
+        """Aufsteigend sortierte Zeilenindizes aller Votes im Datumsbereich."""
+        lo, hi = self.time_slice(start_date, end_date)
+        return np.sort(self.time_order[lo:hi])
+
+    def time_key(self, row):
+        """Sortierschlüssel (timestamp, id) eines Votes; dient als Cursor beim Nachladen."""
+        return self.votes[int(row)]["timestamp"], int(self.vote_ids[row])
+
+    def time_rank_of(self, key):
+        """Anzahl der Votes, deren (timestamp, id) kleiner als ``key`` ist (Binärsuche in time_order)."""
+        lo, hi = 0, len(self.time_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time_key(self.time_order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def newest_first(self, rows, before=None, limit=50):
+        """Keyset-Pagination: bis zu ``limit`` der Zeilen ``rows``, neueste zuerst.
+
+        Berücksichtigt nur Votes, deren (timestamp, id) kleiner als der Cursor
+        ``before`` ist. Gibt (Zeilen, Cursor für den nächsten Block oder None)
+        zurück; neu hinzugekommene Votes verschieben die Blöcke nicht.
+        """
+        ranks = self.time_rank[rows]
+        if before is not None:
+            ranks = ranks[ranks < self.time_rank_of(before)]
+        more = len(ranks) > limit
+        if more:
+            ranks = np.partition(ranks, len(ranks) - limit)[len(ranks) - limit:]
+        page = self.time_order[np.sort(ranks)[::-1]]
+        return page, (self.time_key(page[-1]) if more else None)
+
+    def rows_with_geo(self, labels):
+        """Aufsteigend sortierte Zeilenindizes aller Votes, die eines der Geo-Labels tragen."""
+        parts = [self.geo_index[label] for label in labels if label in self.geo_index]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def positions_of(self, member_id):
+        """Gibt die Positionscodes eines Mitglieds für alle Votes zurück (0 = kein Eintrag)."""
+        col = self.member_index.get(member_id)
+        if col is None:
+            return np.zeros(len(self.vote_ids), dtype=np.int8)
+        return self.positions[:, col]
+
+    def vote_indexes_of(self, member_id):
+        """Gibt die Zeilenindizes aller Votes zurück, an denen das Mitglied beteiligt war."""
+        return np.flatnonzero(self.positions_of(member_id))
+
+    def vote_count(self, member_id):
+        """Anzahl der Votes mit Eintrag für das Mitglied."""
+        col = self.member_index.get(member_id)
+        if col is None:
+            return 0
+        return int(self.member_vote_counts[col])
+
+
+class VoteView:
+    """Request-lokale Sicht auf eine Vote-Zusammenfassung plus Position eines Mitglieds.
+
+    Die geteilte Zusammenfassung wird nie verändert; ``position`` existiert nur
+    in der Sicht. Attribut- und Schlüsselzugriff (für Jinja) gehen an die
+    Zusammenfassung durch.
+    """
+    __slots__ = ("summary", "position")
+
+    def __init__(self, summary, position=None):
+        self.summary = summary
+        self.position = position
+
+    def __getattr__(self, name):
+        try:
+            return self.summary[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, key):
+        if key == "position":
+            return self.position
+        return self.summary[key]
+
+
+def calculate_age(birthdate_str):
+    """Berechnet das Alter aus einem ISO-Geburtsdatum (None bei ungültigem Datum)."""
+    try:
+        bd = datetime.strptime(birthdate_str, "%Y-%m-%d").date()
+        today = date.today()
+        return today.year - bd.year - ((today.month, today.day) < (bd.month, bd.day))
+    except Exception:
+        return None
+
+
+class MemberRegistry:
+    """Einmalig aufgebautes Mitgliederverzeichnis auf Basis einer VoteMatrix.
+
+    Enthält die deduplizierte, nach Namen sortierte Mitgliederliste sowie je
+    Mitglied Profil und Anzahl der Votes. Die Vote-Indizes eines Mitglieds
+    liefert ``VoteMatrix.vote_indexes_of`` bei Bedarf aus der geteilten Matrix,
+    damit kein Worker eigene Kopien davon hält.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.raw_members = {}
+        self.profiles = {}
+        self.vote_counts = {}
+
+        for m_id, col in matrix.member_index.items():
+            m = matrix.member_profiles[col]
+            self.raw_members[m_id] = m
+            self.profiles[m_id] = {
+                "name": f"{m.get('first_name','')} {m.get('last_name','')}",
+                "photo_url": m.get("photo_url", ""),
+                "country": m.get("country", {}).get("label", ""),
+                "group": m.get("group", {}).get("short_label", ""),
+                "date_of_birth": m.get("date_of_birth", ""),
+            }
+            self.vote_counts[m_id] = int(matrix.member_vote_counts[col])
+
+        # Dropdown-Liste und /members-Antwort, sortiert nach Namen
+        sorted_ids = sorted(self.profiles, key=lambda m_id: self.profiles[m_id]["name"])
+        self.members = [{"id": m_id, "name": self.profiles[m_id]["name"]} for m_id in sorted_ids]
+        self.member_summaries = [
+            {
+                "id": m_id,
+                "first_name": self.raw_members[m_id].get("first_name"),
+                "last_name": self.raw_members[m_id].get("last_name"),
+                "country": self.profiles[m_id]["country"] or None,
+                "group": self.profiles[m_id]["group"] or None,
+            }
+            for m_id in sorted_ids
+        ]
+
+    def __contains__(self, member_id):
+        return member_id in self.profiles
+
+    def member_info(self, member_id):
+        """Gibt Foto, Land, Fraktion und Alter eines Mitglieds zurück (None, wenn unbekannt)."""
+        profile = self.profiles.get(member_id)
+        if profile is None:
+            return None
+        return {
+            "photo_url": profile["photo_url"],
+            "country": profile["country"],
+            "group": profile["group"],
+            "age": calculate_age(profile["date_of_birth"]),
+        }
+
+    def search_by_last_name(self, last_name):
+        """Gibt alle (deduplizierten) Mitglieder zurück, deren Nachname den Suchbegriff enthält."""
+        needle = last_name.lower()
+        return [
+            self.raw_members[m["id"]]
+            for m in self.member_summaries
+            if needle in (m["last_name"] or "").lower()
+        ]
+
+
+POSITION_KEYS = ("FOR", "AGAINST", "ABSTENTION", "DID_NOT_VOTE")
+
+
+def normalize_breakdown(entries, key):
+    """Kopiert by_group/by_country-Einträge mit vollständigen Zählern (fehlende = 0)."""
+    normalized = []
+    for entry in entries or []:
+        st = entry.get("stats", {}) or {}
+        counts = {k: st.get(k, 0) or 0 for k in POSITION_KEYS}
+        normalized.append({
+            key: entry.get(key, {}),
+            "stats": counts,
+            "for_count": counts["FOR"],
+            "against_count": counts["AGAINST"],
+            "abstention_count": counts["ABSTENTION"],
+            "did_not_vote_count": counts["DID_NOT_VOTE"],
+        })
+    return normalized
+
+
+class VoteDetailStore:
+    """Liefert vorberechnete Detail-Payloads je Vote, bei Bedarf aus SQLite geladen, mit LRU-Cache.
+
+    Ein Payload enthält den Vote, normalisierte Fraktions-/Länderstatistiken und
+    die nach Namen sortierten member_votes. Payloads werden nach dem Aufbau nicht
+    mehr verändert. Der Cache ist sowohl durch die Anzahl der Einträge als auch
+    durch eine geschätzte Bytegröße begrenzt.
+    """
+
+    def __init__(self, engine, members, vote_index, max_entries=DETAIL_CACHE_SIZE, max_bytes=DETAIL_CACHE_BYTES):
+        self.engine = engine
+        self.members = members
+        self.vote_index = vote_index
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Gemeinsam genutzte (Mitglied, Position)-Einträge
+        self._entries = {}
+
+    def _load(self, vote_id):
+        with self.engine.connect() as conn:
+            raw = conn.execute(text("SELECT raw_json FROM votes WHERE id = :id"), {"id": vote_id}).scalar()
+            if raw is None:
+                return None, 0
+            facts = conn.execute(
+                text("SELECT member_id, position_code FROM member_votes WHERE vote_id = :id"), {"id": vote_id}
+            ).fetchall()
+        vote = json.loads(raw)
+        vote["chart_data"] = vote.get("stats", {}).get("total", {})
+        member_votes = []
+        for member_id, code in facts:
+            member = self.members.get(member_id)
+            if member is None:
+                continue
+            entry = self._entries.get((member_id, code))
+            if entry is None:
+                entry = self._entries[(member_id, code)] = {"member": member, "position": POSITION_NAMES.get(code, "")}
+            member_votes.append(entry)
+        member_votes.sort(key=lambda mv: (mv["member"]["last_name"] or "", mv["member"]["first_name"] or ""))
+        vote["member_votes"] = member_votes
+        stats = vote.get("stats", {})
+        payload = {
+            "vote": vote,
+            "by_group": normalize_breakdown(stats.get("by_group"), "group"),
+            "by_country": normalize_breakdown(stats.get("by_country"), "country"),
+            "member_votes": member_votes,
+        }
+        # Grobe Schätzung: JSON-Text plus Listenplatz je member_vote
+        return payload, len(raw) + 8 * len(member_votes)
+
+    def get(self, vote_id):
+        """Gibt den Detail-Payload eines Votes zurück (None, wenn unbekannt)."""
+        # Unbekannte IDs ohne DB-Zugriff abweisen
+        if vote_id not in self.vote_index:
+            return None
+        with self._lock:
+            cached = self._cache.get(vote_id)
+            if cached is not None:
+                self._cache.move_to_end(vote_id)
+                return cached[0]
+        payload, size = self._load(vote_id)
+        if payload is None:
+            return None
+        with self._lock:
+            if vote_id not in self._cache:
+                self._cache[vote_id] = (payload, size)
+                self._bytes += size
+                while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+                    _, (_, old_size) = self._cache.popitem(last=False)
+                    self._bytes -= old_size
+        return payload